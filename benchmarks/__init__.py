@@ -0,0 +1 @@
+"""Benchmarks and load-test harness (run with python -m benchmarks.<name>)."""
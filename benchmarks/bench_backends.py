@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Threaded (paramiko) vs asyncio (asyncssh) SSH execution backends at growing fleet sizes.
+
+Simulated hosts run in a separate process (so their handshakes do not compete with the
+client for the GIL) and answer every command with --output-bytes after --latency-ms. For
+each host count, execute_on_servers is called once per backend, and the report shows wall
+time, hosts/s, per-host duration percentiles, failures, and the peak thread count and RSS
+of the client process during the call. Outputs are checked to be identical across backends.
+
+Usage (from the repository root; the asyncio backend needs `pip install asyncssh`):
+    python -m benchmarks.bench_backends --hosts 10,100,1000 --latency-ms 500
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from src.stats import percentile
+
+from .mock_ssh import MockSSHFleet
+
+
+def _serve_fleet(conn, hosts, latency_ms, output_bytes):
+    """Child process: run the paramiko MockSSHFleet until the parent asks for its counters."""
+    with MockSSHFleet(hosts=hosts, latency_ms=latency_ms, output_bytes=output_bytes) as fleet:
+        conn.send(fleet.servers)
+        conn.recv()
+        conn.send({'connections': fleet.connections_accepted, 'commands': fleet.commands_served})
+
+
+def _serve_async_fleet(conn, hosts, latency_ms, output_bytes):
+    """
+    Child process: the same simulated hosts served by asyncssh on one event loop. MockSSHFleet
+    needs a few threads per host, so on small machines it, not the client, limits a
+    1000-host run.
+    """
+    import asyncio
+    import asyncssh
+
+    line = b'mock output line 0123456789 abcdefghijklmnopqrstuvwxyz\n'
+    payload = (line * (output_bytes // len(line) + 1))[:output_bytes]
+    counters = {'connections': 0, 'commands': 0}
+
+    class Server(asyncssh.SSHServer):
+        def connection_made(self, _conn):
+            counters['connections'] += 1
+
+        def begin_auth(self, username):
+            return True
+
+        def password_auth_supported(self):
+            return True
+
+        def validate_password(self, username, password):
+            return True
+
+    async def handle(process):
+        await asyncio.sleep(latency_ms / 1000.0)
+        process.stdout.write(payload)
+        counters['commands'] += 1
+        process.exit(0)
+
+    async def serve():
+        key = asyncssh.generate_private_key('ssh-ed25519')
+        listeners = [
+            await asyncssh.listen(
+                '127.0.0.1', 0, server_host_keys=[key], server_factory=Server,
+                process_factory=handle, encoding=None, backlog=128,
+            )
+            for _ in range(hosts)
+        ]
+        conn.send([f"127.0.0.1:{listener.get_port()}" for listener in listeners])
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        conn.send(counters)
+
+    asyncio.run(serve())
+
+
+class _Sampler:
+    """Peak thread count and RSS of this process while a call runs."""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _rss_mb():
+        try:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return 0.0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss_mb = max(self.peak_rss_mb, self._rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def run_backend(app, executor, servers, command):
+    with app.app_context(), _Sampler() as sampler:
+        started = time.perf_counter()
+        results = executor.execute_on_servers(command, servers, 'bench', user_id=1)
+        wall = time.perf_counter() - started
+    durations = [r['duration_ms'] for r in results.values()]
+    failed = [r for r in results.values() if not r.get('success')]
+    digest = hashlib.sha256(
+        ''.join(results[s].get('stdout', '') for s in servers).encode()
+    ).hexdigest()
+    return {
+        'wall_s': round(wall, 2),
+        'hosts_per_s': round(len(servers) / wall, 1),
+        'host_ms_p50': percentile(durations, 50),
+        'host_ms_p95': percentile(durations, 95),
+        'failed': len(failed),
+        'first_error': failed[0].get('error') if failed else None,
+        'peak_threads': sampler.peak_threads,
+        'peak_rss_mb': round(sampler.peak_rss_mb, 1),
+        'digest': digest,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Threaded vs asyncio SSH backend benchmark')
+    parser.add_argument('--hosts', default='10,100,1000', help='comma-separated fleet sizes')
+    parser.add_argument('--latency-ms', type=float, default=500.0, help='delay before each command answers')
+    parser.add_argument('--output-bytes', type=int, default=2048)
+    parser.add_argument('--threads', type=int, default=None,
+                        help='SSH_MAX_PARALLEL_HOSTS for the threaded backend (default: config)')
+    parser.add_argument('--backends', default='threads,asyncio')
+    parser.add_argument('--fleet', choices=('asyncssh', 'paramiko'), default=None,
+                        help='simulated hosts served by asyncssh (default when installed) or MockSSHFleet')
+    parser.add_argument('--json', dest='json_out', help='also write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='shellsentry-backends-')
+    # Config reads the environment at import time
+    os.environ.update({
+        'LOG_FILE': os.path.join(workdir, 'bench.log'),
+        'LOG_LEVEL': 'ERROR',
+        'SSH_USER': 'bench',
+        'SSH_PASSWORD': 'bench',
+        'SSH_KEY_PATH': os.path.join(workdir, 'no-such-key'),
+        # Each backend must see every host, not a circuit opened by the previous run
+        'CIRCUIT_BREAKER_ENABLED': 'false',
+    })
+    if args.threads:
+        os.environ['SSH_MAX_PARALLEL_HOSTS'] = str(args.threads)
+
+    from flask import Flask
+    from src.config import Config
+    from src.models import db
+    from src.ssh_executor import SSHExecutor
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+
+    executors = {}
+    for name in [b.strip() for b in args.backends.split(',') if b.strip()]:
+        if name == 'asyncio':
+            from src.async_ssh_executor import AsyncSSHExecutor, asyncssh
+            if asyncssh is None:
+                print("asyncssh is not installed; skipping the asyncio backend")
+                continue
+            executors[name] = AsyncSSHExecutor()
+        else:
+            executors[name] = SSHExecutor()
+
+    fleet = args.fleet
+    if fleet is None:
+        from src.async_ssh_executor import asyncssh
+        fleet = 'asyncssh' if asyncssh is not None else 'paramiko'
+    serve = _serve_async_fleet if fleet == 'asyncssh' else _serve_fleet
+
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+    for hosts in [int(h) for h in args.hosts.split(',') if h.strip()]:
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=serve, args=(child, hosts, args.latency_ms, args.output_bytes), daemon=True)
+        proc.start()
+        servers = parent.recv()
+        for name, executor in executors.items():
+            row = {'hosts': hosts, 'backend': name}
+            row.update(run_backend(app, executor, servers, 'df -h'))
+            rows.append(row)
+        parent.send('stop')
+        parent.recv()
+        proc.join(10)
+
+    print(
+        f"fleet={fleet} latency={args.latency_ms:g} ms output={args.output_bytes} B "
+        f"threads={Config.SSH_MAX_PARALLEL_HOSTS} async sessions={Config.SSH_ASYNC_MAX_SESSIONS}"
+    )
+    print(
+        f"{'hosts':>6} {'backend':<9}{'wall s':>8}{'hosts/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'failed':>8}{'threads':>9}{'RSS MB':>8}"
+    )
+    for r in rows:
+        print(
+            f"{r['hosts']:>6} {r['backend']:<9}{r['wall_s']:>8}{r['hosts_per_s']:>9}{r['host_ms_p50']:>9}"
+            f"{r['host_ms_p95']:>9}{r['failed']:>8}{r['peak_threads']:>9}{r['peak_rss_mb']:>8}"
+        )
+        if r['first_error']:
+            print(f"       first error: {r['first_error']}")
+
+    mismatched = sorted({
+        r['hosts'] for r in rows
+        if len({o['digest'] for o in rows if o['hosts'] == r['hosts']}) != 1
+    })
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump({'config': vars(args), 'results': rows}, f, indent=2)
+    if mismatched:
+        print(f"\nOUTPUT MISMATCH between backends at {mismatched} hosts")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
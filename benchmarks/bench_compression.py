@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Bytes transferred and client parse time of /api/execute-style payloads per content coding.
+
+For each host count a realistic payload is built with the real formatter (per-host `df -h`
+output that differs slightly between hosts, a shared uname, probe context and the formatted
+report). It is served through a Flask app using the same compression hook as the
+application, once as JSON and once as a streamed (chunked) plain-text report. For every
+coding the report shows the bytes on the wire, server-side time (serialize + compress), the
+client's decode + json.loads time and the transfer time at --link-mbps.
+
+Usage (from the repository root; the file can also be run directly):
+    python -m benchmarks.bench_compression --hosts 100,1000 --link-mbps 20
+    python benchmarks/bench_compression.py --hosts 100
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+
+# The src package lives in the repository root, which is not on sys.path when run as a file
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_payload(hosts, seed=7):
+    from src.result_formatter import format_execution_payload
+    from src.result_groups import grouped_results
+
+    rng = random.Random(seed)
+    results, context = {}, {}
+    for i in range(hosts):
+        host = f"web-{i:04d}.prod.example.internal"
+        used = rng.randint(8, 46)
+        stdout = (
+            "Filesystem      Size  Used Avail Use% Mounted on\n"
+            f"/dev/nvme0n1p1   50G  {used}G  {50 - used}G  {used * 2}% /\n"
+            "tmpfs           7.8G     0  7.8G   0% /dev/shm\n"
+            f"/dev/nvme1n1    500G  {rng.randint(10, 480)}G  {rng.randint(10, 480)}G  {rng.randint(2, 96)}% /var/lib/data\n"
+            "tmpfs           1.6G   24K  1.6G   1% /run/user/1000\n"
+        )
+        results[host] = {
+            'success': True, 'exit_code': 0, 'stdout': stdout, 'stderr': '', 'error': None,
+            'duration_ms': rng.randint(80, 400),
+        }
+        context[host] = {
+            'uname_line': 'Linux web 6.1.0-18-amd64 #1 SMP PREEMPT_DYNAMIC Debian 6.1.76-1 x86_64 GNU/Linux',
+            'running_services': 'nginx.service\nsshd.service\ncron.service\nnode_exporter.service',
+            'listening_tcp': 'LISTEN 0 511 0.0.0.0:80 0.0.0.0:*\nLISTEN 0 128 0.0.0.0:22 0.0.0.0:*',
+        }
+    formatted = format_execution_payload('How full are the disks?', 'df -h', results, context)
+    payload = {
+        'success': True,
+        'original_request': 'How full are the disks?',
+        'remote_host_context': context,
+        'generated_command': 'df -h',
+        'result_groups': grouped_results(results)['groups'],
+        'natural_language_summary': formatted['natural_language_summary'],
+        'formatted_report': formatted['formatted_report'],
+    }
+    return payload, formatted['formatted_report']
+
+
+def make_app(payload, report):
+    from flask import Flask, Response, jsonify
+    from src.compression import init_compression
+
+    app = Flask(__name__)
+    init_compression(app)
+
+    @app.route('/payload')
+    def serve_payload():
+        return jsonify(payload)
+
+    @app.route('/report')
+    def serve_report():
+        return Response((line + '\n' for line in report.split('\n')), mimetype='text/plain')
+
+    return app
+
+
+def decode(body, encoding):
+    if encoding in ('gzip', 'deflate'):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS)
+    if encoding == 'br':
+        import brotli
+        return brotli.decompress(body)
+    return body
+
+
+def measure(client, path, encoding, runs, parse_json):
+    wire, server_ms, client_ms = 0, [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(path, headers={'Accept-Encoding': encoding})
+        body = response.get_data()
+        server_ms.append((time.perf_counter() - started) * 1000)
+        got = response.headers.get('Content-Encoding', 'identity')
+        if got != encoding:
+            raise RuntimeError(f"{path}: asked for {encoding}, got {got}")
+        started = time.perf_counter()
+        raw = decode(body, got)
+        if parse_json:
+            json.loads(raw)
+        client_ms.append((time.perf_counter() - started) * 1000)
+        wire = len(body)
+    return wire, sorted(server_ms)[runs // 2], sorted(client_ms)[runs // 2], len(raw)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Response compression benchmark')
+    parser.add_argument('--hosts', default='100,1000', help='comma-separated host counts')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--link-mbps', type=float, default=20.0, help='link speed for the transfer estimate')
+    parser.add_argument('--json', dest='json_out', help='also write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='shellsentry-compression-')
+    # Config reads the environment at import time
+    os.environ.update({
+        'LOG_FILE': os.path.join(workdir, 'bench.log'),
+        'LOG_LEVEL': 'ERROR',
+        'RESPONSE_COMPRESSION_ENABLED': 'true',
+    })
+    from src.compression import brotli
+
+    encodings = ['identity', 'gzip', 'deflate'] + (['br'] if brotli is not None else [])
+    rows = []
+    for hosts in [int(h) for h in args.hosts.split(',') if h.strip()]:
+        payload, report = build_payload(hosts)
+        client = make_app(payload, report).test_client()
+        for path, parse_json in (('/payload', True), ('/report', False)):
+            for encoding in encodings:
+                wire, server_ms, client_ms, raw = measure(client, path, encoding, args.runs, parse_json)
+                rows.append({
+                    'hosts': hosts,
+                    'response': path.strip('/'),
+                    'encoding': encoding,
+                    'wire_bytes': wire,
+                    'raw_bytes': raw,
+                    'ratio': round(raw / wire, 1),
+                    'server_ms': round(server_ms, 1),
+                    'client_ms': round(client_ms, 1),
+                    'transfer_ms': round(wire * 8 / (args.link_mbps * 1e6) * 1000, 1),
+                })
+
+    print(f"runs={args.runs} link={args.link_mbps:g} Mbit/s (brotli {'available' if brotli else 'not installed'})")
+    print(
+        f"{'hosts':>6} {'response':<9}{'coding':<10}{'wire bytes':>12}{'ratio':>7}"
+        f"{'server ms':>11}{'client ms':>11}{'xfer ms':>9}"
+    )
+    for r in rows:
+        print(
+            f"{r['hosts']:>6} {r['response']:<9}{r['encoding']:<10}{r['wire_bytes']:>12}{r['ratio']:>7}"
+            f"{r['server_ms']:>11}{r['client_ms']:>11}{r['transfer_ms']:>9}"
+        )
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump({'config': vars(args), 'results': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
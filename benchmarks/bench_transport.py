@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Bytes-on-wire and latency of large command outputs under each SSH transport profile.
+
+A single MockSSHFleet host runs a real shell command (run_commands=True) that prints
+journal-like lines, behind a throttled link (--link-kbps). For every profile the same
+command is executed through SSHExecutor, and the report shows end-to-end latency, the
+bytes the host sent on the wire and the compression ratio against the raw output.
+Outputs are checked to be identical across profiles.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_transport --lines 20000 --link-kbps 10000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+from .mock_ssh import MockSSHFleet
+
+PROFILES = ('default', 'wan', 'bulk')
+
+
+def journal_command(lines):
+    """Shell command printing `lines` journal-style log lines (about 110 bytes each)."""
+    return (
+        f"seq 1 {lines} | sed 's/.*/Oct 19 14:07:09 web-01 sshd[&]: Accepted publickey for deploy "
+        f"from 10.0.3.7 port 5&2 ssh2: ED25519 SHA256:Zk3qv9yT0mWc/'"
+    )
+
+
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def run_profile(fleet, server, profile, command, runs, workdir):
+    from src.credentials import CredentialProvider
+    from src.inventory import Inventory
+    from src.ssh_executor import SSHExecutor
+
+    inventory_path = os.path.join(workdir, f'inventory-{profile}.json')
+    with open(inventory_path, 'w') as f:
+        json.dump({'hosts': {server: {'transport': profile}}}, f)
+    executor = SSHExecutor(credentials=CredentialProvider(Inventory(inventory_path)))
+
+    latencies, wire, digests, output_bytes = [], [], set(), 0
+    for _ in range(runs):
+        sent_before = fleet.bytes_sent
+        started = time.perf_counter()
+        result = executor._execute_on_server(server, command)
+        latencies.append((time.perf_counter() - started) * 1000)
+        wire.append(fleet.bytes_sent - sent_before)
+        if not result.get('success'):
+            raise RuntimeError(f"{profile}: command failed: {result.get('error') or result.get('stderr')}")
+        output_bytes = len(result['stdout'].encode())
+        digests.add(hashlib.sha256(result['stdout'].encode()).hexdigest())
+    return {
+        'profile': profile,
+        'latency_ms_p50': round(_median(latencies), 1),
+        'latency_ms_max': round(max(latencies), 1),
+        'wire_bytes': _median(wire),
+        'output_bytes': output_bytes,
+        'ratio': round(output_bytes / _median(wire), 2) if wire and _median(wire) else None,
+        'digest': digests.pop() if len(digests) == 1 else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='SSH transport profile benchmark for large outputs')
+    parser.add_argument('--lines', type=int, default=20000, help='output lines (~110 bytes each)')
+    parser.add_argument('--link-kbps', type=float, default=10000.0, help='host->client link speed (0 = unthrottled)')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--json', dest='json_out', help='also write the results as JSON to this path')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='shellsentry-transport-')
+    # Config reads the environment at import time
+    os.environ.update({
+        'LOG_FILE': os.path.join(workdir, 'bench.log'),
+        'LOG_LEVEL': 'ERROR',
+        'SSH_USER': 'bench',
+        'SSH_PASSWORD': 'bench',
+        'SSH_KEY_PATH': os.path.join(workdir, 'no-such-key'),
+    })
+
+    command = journal_command(args.lines)
+    results = []
+    with MockSSHFleet(hosts=1, run_commands=True, compression=True, link_kbps=args.link_kbps or None) as fleet:
+        server = fleet.servers[0]
+        for profile in [p.strip() for p in args.profiles.split(',') if p.strip()]:
+            results.append(run_profile(fleet, server, profile, command, args.runs, workdir))
+
+    print(f"lines={args.lines} link={args.link_kbps:g} kbit/s runs={args.runs}")
+    print(f"{'profile':<10}{'p50 ms':>10}{'max ms':>10}{'wire bytes':>14}{'output bytes':>14}{'ratio':>8}")
+    for r in results:
+        print(
+            f"{r['profile']:<10}{r['latency_ms_p50']:>10}{r['latency_ms_max']:>10}"
+            f"{r['wire_bytes']:>14}{r['output_bytes']:>14}{r['ratio']:>8}"
+        )
+
+    digests = {r['digest'] for r in results}
+    if None in digests or len(digests) != 1:
+        print("\nOUTPUT MISMATCH between runs or profiles")
+        return 1
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
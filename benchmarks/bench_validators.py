@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Latency, throughput and verdict-stability benchmark for the two validators on every
+request: SecurityLayer.validate_input (prompts) and CommandValidator.validate (commands).
+
+Each validator runs over the corpus from validator_corpus.build_corpus() for several
+rounds. The benchmark fails (exit 1) when:
+- a verdict differs between rounds (non-deterministic validation),
+- verdicts differ from the saved baseline (a behavior change; re-save to accept it), or
+- p95 latency or throughput regresses by more than --threshold against the baseline.
+
+Baselines are machine-specific; save one on the machine that compares against it.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_validators --save-baseline
+    python -m benchmarks.bench_validators                # compare against the baseline
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+# Rejections log a warning each; keep the console quiet (the enqueue cost is still measured)
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+
+from src.command_validator import CommandValidator  # noqa: E402
+from src.security import SecurityLayer  # noqa: E402
+from src.stats import percentile  # noqa: E402
+
+from .validator_corpus import build_corpus  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'validators.json')
+
+
+def _verdict(result):
+    return [bool(result.get('valid')), result.get('reason') or '']
+
+
+def bench(name, func, inputs, rounds, warmup=1):
+    """Time func over inputs for `rounds` rounds; return stats plus the verdict list."""
+    for _ in range(warmup):
+        for item in inputs:
+            func(item)
+
+    latencies_ns = []
+    verdict_runs = []
+    total_ns = 0
+    for _ in range(rounds):
+        verdicts = []
+        round_start = time.perf_counter_ns()
+        for item in inputs:
+            t0 = time.perf_counter_ns()
+            result = func(item)
+            latencies_ns.append(time.perf_counter_ns() - t0)
+            verdicts.append(_verdict(result))
+        total_ns += time.perf_counter_ns() - round_start
+        verdict_runs.append(verdicts)
+
+    stable = all(run == verdict_runs[0] for run in verdict_runs[1:])
+    digest = hashlib.sha256(json.dumps(verdict_runs[0]).encode()).hexdigest()
+    calls = len(inputs) * rounds
+    return {
+        'name': name,
+        'calls': calls,
+        'accepted': sum(1 for v in verdict_runs[0] if v[0]),
+        'rejected': sum(1 for v in verdict_runs[0] if not v[0]),
+        'p50_us': round(percentile(latencies_ns, 50) / 1000, 2),
+        'p95_us': round(percentile(latencies_ns, 95) / 1000, 2),
+        'p99_us': round(percentile(latencies_ns, 99) / 1000, 2),
+        'max_us': round(max(latencies_ns) / 1000, 2),
+        'calls_per_second': round(calls / (total_ns / 1e9), 1),
+        'verdicts_stable': stable,
+        'verdict_digest': digest,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Return a list of failure messages (empty when within budget)."""
+    failures = []
+    for name, stats in current.items():
+        if not stats['verdicts_stable']:
+            failures.append(f"{name}: verdicts differ between rounds")
+        base = (baseline or {}).get(name)
+        if not base:
+            continue
+        if base['verdict_digest'] != stats['verdict_digest']:
+            failures.append(f"{name}: verdicts changed since the baseline (re-save it if intended)")
+        if stats['p95_us'] > base['p95_us'] * (1 + threshold):
+            failures.append(
+                f"{name}: p95 {stats['p95_us']}us vs baseline {base['p95_us']}us (> {threshold:.0%} slower)"
+            )
+        if stats['calls_per_second'] < base['calls_per_second'] * (1 - threshold):
+            failures.append(
+                f"{name}: {stats['calls_per_second']} calls/s vs baseline {base['calls_per_second']} "
+                f"(> {threshold:.0%} lower)"
+            )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validator latency/throughput benchmark')
+    parser.add_argument('--size', type=int, default=4000, help='corpus entries per validator')
+    parser.add_argument('--rounds', type=int, default=3, help='timed passes over the corpus')
+    parser.add_argument('--seed', type=int, default=1337)
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed regression (0.25 = 25%%)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write results as the new baseline')
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(size=args.size, seed=args.seed)
+    security_layer = SecurityLayer()
+    command_validator = CommandValidator()
+
+    results = {
+        'validate_input': bench('validate_input', security_layer.validate_input, corpus['prompts'], args.rounds),
+        'validate_command': bench('validate_command', command_validator.validate, corpus['commands'], args.rounds),
+    }
+
+    print(f"{'validator':<18}{'calls':>8}{'ok/rej':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}{'calls/s':>12}  stable")
+    for name, s in results.items():
+        print(
+            f"{name:<18}{s['calls']:>8}{s['accepted']:>6}/{s['rejected']:<5}{s['p50_us']:>10}"
+            f"{s['p95_us']:>10}{s['p99_us']:>10}{s['calls_per_second']:>12}  {s['verdicts_stable']}"
+        )
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('corpus') != {'size': args.size, 'seed': args.seed}:
+            print(f"\nBaseline corpus {baseline.get('corpus')} does not match this run; not comparing.")
+            baseline = None
+
+    failures = compare(results, (baseline or {}).get('results'), args.threshold)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'corpus': {'size': args.size, 'seed': args.seed}, 'results': results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif baseline is None:
+        print("\nNo baseline to compare against (run with --save-baseline first).")
+
+    if failures:
+        print("\nREGRESSION:")
+        for msg in failures:
+            print(f"  - {msg}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for /api/execute with local SSH and LLM stand-ins.
+
+Starts a MockSSHFleet (N hosts on loopback) and a MockLLMServer, points the app at
+them through environment variables, serves the Flask app in-process on a threaded
+WSGI server, then fires requests at a fixed concurrency from logged-in sessions.
+
+Reports requests/s, p50/p95/p99 of end-to-end latency and of every stage the app
+reports in its Server-Timing header, and peak RSS of this process (which also hosts
+the mock servers).
+
+Usage (from the repository root):
+    python -m benchmarks.loadtest --hosts 20 --concurrency 8 --requests 200
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.stats import percentile
+
+from .mock_llm import MockLLMServer
+from .mock_ssh import MockSSHFleet
+
+BENCH_USER = 'loadtest'
+BENCH_PASSWORD = 'LoadTest1234'
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'mean': round(statistics.fmean(values), 2) if values else None,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+    }
+
+
+def parse_server_timing(header):
+    """'probe;dur=12.3, rag;dur=0.4' -> {'probe': 12.3, 'rag': 0.4}"""
+    stages = {}
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'dur' and name:
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def configure_environment(workdir, llm_base_url, extra_env=None):
+    """Must run before src.app is imported: Config reads the environment at import time."""
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        'LOG_FILE': os.path.join(workdir, 'loadtest.log'),
+        'LOG_LEVEL': 'WARNING',
+        'LLM_API_KEY': 'mock-key',
+        'LLM_API_BASE_URL': llm_base_url,
+        'LLM_API_TYPE': 'openai',
+        'SSH_USER': 'bench',
+        'SSH_PASSWORD': 'bench',
+        'SSH_KEY_PATH': os.path.join(workdir, 'no-such-key'),
+        'EXECUTION_RETENTION_DAYS': '0',
+        'EXECUTION_ARCHIVE_DIR': os.path.join(workdir, 'archive'),
+        # Every request comes from BENCH_USER; per-user admission limits would turn most of
+        # them into 429s and measure the limiter instead of the request path
+        'ADMISSION_ENABLED': 'false',
+    })
+    os.environ.update(extra_env or {})
+
+
+def start_app_server():
+    """Import the app, create the benchmark user and serve it on a free loopback port."""
+    from werkzeug.serving import make_server
+    from src.app import app
+    from src.models import db, User
+
+    with app.app_context():
+        if not User.query.filter_by(username=BENCH_USER).first():
+            user = User(username=BENCH_USER, email=f'{BENCH_USER}@example.invalid')
+            user.set_password(BENCH_PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def login(base_url):
+    session = requests.Session()
+    resp = session.post(
+        f"{base_url}/login",
+        data={'username': BENCH_USER, 'password': BENCH_PASSWORD},
+        allow_redirects=False,
+        timeout=30,
+    )
+    if resp.status_code not in (302, 303):
+        raise RuntimeError(f"login failed: HTTP {resp.status_code}")
+    return session
+
+
+def run_load(base_url, servers, prompt, concurrency, total_requests, payload_extra=None):
+    """Drive /api/execute; return per-request records."""
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def one(_i):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = login(base_url)
+            with sessions_lock:
+                sessions.append(session)
+        body = {'command': prompt, 'servers': servers}
+        body.update(payload_extra or {})
+        started = time.perf_counter()
+        resp = session.post(f"{base_url}/api/execute", json=body, timeout=600)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return {
+            'status': resp.status_code,
+            'latency_ms': elapsed_ms,
+            'bytes': len(resp.content),
+            'stages': parse_server_timing(resp.headers.get('Server-Timing')),
+        }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        records = list(pool.map(one, range(total_requests)))
+    for session in sessions:
+        session.close()
+    return records
+
+
+def build_report(records, wall_seconds, args):
+    ok = [r for r in records if r['status'] == 200]
+    stages = defaultdict(list)
+    for r in ok:
+        for name, ms in r['stages'].items():
+            stages[name].append(ms)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+    return {
+        'config': {
+            'hosts': args.hosts,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'ssh_latency_ms': args.ssh_latency_ms,
+            'output_bytes': args.output_bytes,
+            'llm_latency_ms': args.llm_latency_ms,
+        },
+        'requests_ok': len(ok),
+        'requests_failed': len(records) - len(ok),
+        'status_codes': dict(sorted(
+            (str(code), sum(1 for r in records if r['status'] == code))
+            for code in {r['status'] for r in records}
+        )),
+        'wall_seconds': round(wall_seconds, 3),
+        'requests_per_second': round(len(records) / wall_seconds, 2) if wall_seconds else None,
+        'latency_ms': summarize([r['latency_ms'] for r in ok]),
+        'stage_latency_ms': {name: summarize(values) for name, values in sorted(stages.items())},
+        'mean_response_bytes': round(statistics.fmean([r['bytes'] for r in ok]), 1) if ok else None,
+        'peak_rss_mb': round(peak_rss_mb, 1),
+    }
+
+
+def print_report(report):
+    cfg = report['config']
+    print('=' * 72)
+    print('ShellSentry /api/execute load test')
+    print('=' * 72)
+    print(
+        f"hosts={cfg['hosts']} concurrency={cfg['concurrency']} requests={cfg['requests']} "
+        f"ssh_latency={cfg['ssh_latency_ms']}ms output={cfg['output_bytes']}B llm_latency={cfg['llm_latency_ms']}ms"
+    )
+    print(f"ok={report['requests_ok']} failed={report['requests_failed']} codes={report['status_codes']}")
+    print(f"throughput: {report['requests_per_second']} req/s over {report['wall_seconds']}s")
+    print(f"peak RSS: {report['peak_rss_mb']} MB   mean response: {report['mean_response_bytes']} B")
+    print()
+    print(f"{'stage':<18}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    rows = [('end-to-end', report['latency_ms'])] + list(report['stage_latency_ms'].items())
+    for name, s in rows:
+        fmt = lambda v: f"{v:.1f}" if v is not None else '-'
+        print(f"{name:<18}{fmt(s['p50']):>12}{fmt(s['p95']):>12}{fmt(s['p99']):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--hosts', type=int, default=10, help='simulated SSH hosts')
+    parser.add_argument('--ssh-latency-ms', type=float, default=20.0, help='delay before each remote command answers')
+    parser.add_argument('--output-bytes', type=int, default=2048, help='stdout size of the executed command')
+    parser.add_argument('--llm-latency-ms', type=float, default=150.0, help='mock LLM response delay')
+    parser.add_argument('--concurrency', type=int, default=4, help='parallel client sessions')
+    parser.add_argument('--requests', type=int, default=50, help='total /api/execute calls')
+    parser.add_argument('--prompt', default='Show disk usage', help='natural-language request to send')
+    parser.add_argument('--command', default='df -h', help='command the mock LLM returns')
+    parser.add_argument('--json', dest='json_out', help='also write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='shellsentry-loadtest-')
+    with MockLLMServer(command=args.command, latency_ms=args.llm_latency_ms) as llm, \
+            MockSSHFleet(hosts=args.hosts, latency_ms=args.ssh_latency_ms, output_bytes=args.output_bytes) as fleet:
+        configure_environment(workdir, llm.base_url)
+        server, base_url = start_app_server()
+        try:
+            started = time.perf_counter()
+            records = run_load(base_url, fleet.servers, args.prompt, args.concurrency, args.requests)
+            wall = time.perf_counter() - started
+        finally:
+            server.shutdown()
+
+    report = build_report(records, wall, args)
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['requests_failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
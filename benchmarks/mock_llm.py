@@ -0,0 +1,100 @@
+"""
+Minimal OpenAI-compatible `POST /chat/completions` server for benchmarks.
+
+Command-generation prompts get `command` back; anything else (report summaries)
+gets a short canned explanation. Responses include a `usage` block estimated
+from message sizes, and are delayed by `latency_ms`.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockLLMServer:
+    """Threaded HTTP server on 127.0.0.1; use .base_url as LLM_API_BASE_URL."""
+
+    def __init__(self, command='df -h', latency_ms=0.0, summary_latency_ms=None):
+        self.command = command
+        self.latency_ms = latency_ms
+        self.summary_latency_ms = latency_ms if summary_latency_ms is None else summary_latency_ms
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                status, reply = server._reply(body)
+                data = json.dumps(reply).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _reply(self, body):
+        messages = body.get('messages') or []
+        system = next((m.get('content', '') for m in messages if m.get('role') == 'system'), '')
+        generating = 'command generator' in system
+        delay = self.latency_ms if generating else self.summary_latency_ms
+        if delay:
+            time.sleep(delay / 1000.0)
+        content = self.command if generating else (
+            'The command finished on every computer. The numbers look normal.'
+        )
+        prompt_chars = sum(len(m.get('content', '')) for m in messages)
+        with self._lock:
+            self.requests_served += 1
+        return 200, {
+            'id': f'mock-{self.requests_served}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_chars // 4,
+                'completion_tokens': len(content) // 4,
+                'total_tokens': prompt_chars // 4 + len(content) // 4,
+            },
+        }
@@ -0,0 +1,306 @@
+"""
+In-process paramiko SSH server that simulates a fleet of N hosts on 127.0.0.1.
+
+Each simulated host listens on its own port; targets look like "127.0.0.1:<port>",
+which SSHExecutor accepts. Any username/password is accepted. Commands are not run:
+the probe commands (uname, systemctl, ss) get small canned answers and every other
+command gets `output_bytes` of text after `latency_ms`, with exit status 0.
+Pass run_commands=True to run commands with the local /bin/sh instead, and
+forwarding=True to let a host act as a bastion (direct-tcpip channels are relayed
+to their destination, e.g. other hosts of the fleet).
+
+Bytes sent and received on the wire are counted (bytes_sent / bytes_received), and
+link_kbps throttles what the hosts send to emulate a slow link.
+"""
+
+import logging
+import select
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+import paramiko
+
+# Server-side transports log every client disconnect as an error; keep them quiet
+logging.getLogger('benchmarks.mock_ssh.transport').setLevel(logging.CRITICAL)
+
+_PROBE_REPLIES = {
+    'uname': 'Linux mockhost 6.1.0-mock #1 SMP x86_64 GNU/Linux\n',
+    'systemctl': (
+        '  UNIT             LOAD   ACTIVE SUB     DESCRIPTION\n'
+        '  cron.service     loaded active running Regular background program processing daemon\n'
+        '  nginx.service    loaded active running A high performance web server\n'
+        '  ssh.service      loaded active running OpenBSD Secure Shell server\n'
+    ),
+    'ss -t': (
+        'State  Recv-Q Send-Q Local Address:Port Peer Address:Port Process\n'
+        'LISTEN 0      128          0.0.0.0:22        0.0.0.0:*     users:(("sshd",pid=1,fd=3))\n'
+        'LISTEN 0      511          0.0.0.0:80        0.0.0.0:*     users:(("nginx",pid=2,fd=6))\n'
+    ),
+    'ss -u': (
+        'State  Recv-Q Send-Q Local Address:Port Peer Address:Port Process\n'
+        'UNCONN 0      0          127.0.0.1:323       0.0.0.0:*     users:(("chronyd",pid=3,fd=5))\n'
+    ),
+}
+
+
+def _canned_reply(command):
+    c = command.strip()
+    if c.startswith('uname'):
+        return _PROBE_REPLIES['uname']
+    if c.startswith('systemctl list-units'):
+        return _PROBE_REPLIES['systemctl']
+    if c.startswith('ss -tlnp'):
+        return _PROBE_REPLIES['ss -t']
+    if c.startswith('ss -ulnp'):
+        return _PROBE_REPLIES['ss -u']
+    return None
+
+
+class _MeteredSocket:
+    """Socket proxy that counts bytes and optionally paces sends to link_kbps."""
+
+    def __init__(self, sock, fleet):
+        self._sock = sock
+        self._fleet = fleet
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+    def _pace(self, nbytes):
+        if self._fleet.link_kbps:
+            time.sleep(nbytes * 8 / (self._fleet.link_kbps * 1000.0))
+
+    def send(self, data):
+        sent = self._sock.send(data)
+        self._pace(sent)
+        with self._fleet._lock:
+            self._fleet.bytes_sent += sent
+        return sent
+
+    def sendall(self, data):
+        self._sock.sendall(data)
+        self._pace(len(data))
+        with self._fleet._lock:
+            self._fleet.bytes_sent += len(data)
+
+    def recv(self, bufsize):
+        data = self._sock.recv(bufsize)
+        with self._fleet._lock:
+            self._fleet.bytes_received += len(data)
+        return data
+
+
+def _drop_duplicate_exec_replies(transport):
+    """
+    Swallow paramiko's automatic exec reply for channels already answered early: paramiko
+    clients ignore a second CHANNEL_SUCCESS, stricter clients (asyncssh) fail the channel.
+    """
+    send = transport._send_user_message
+    transport.answered_exec_requests = set()
+
+    def send_user_message(message):
+        data = message.asbytes()
+        if len(data) == 5 and data[0] == paramiko.common.MSG_CHANNEL_SUCCESS:
+            chanid = struct.unpack('>I', data[1:])[0]
+            if chanid in transport.answered_exec_requests:
+                transport.answered_exec_requests.discard(chanid)
+                return
+        send(message)
+
+    transport._send_user_message = send_user_message
+
+
+class _MockServer(paramiko.ServerInterface):
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return 'password,publickey'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        if not self.fleet.forwarding:
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+        try:
+            upstream = socket.create_connection(destination, timeout=5)
+        except OSError:
+            return paramiko.OPEN_FAILED_CONNECT_FAILED
+        with self.fleet._lock:
+            self.fleet._pending_forwards[chanid] = upstream
+            self.fleet.channels_forwarded += 1
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        # paramiko only sends the exec reply after this returns; a fast worker could
+        # close the channel first and the client would see "Channel closed". Send the
+        # success reply now (the automatic duplicate is dropped, see
+        # _drop_duplicate_exec_replies) before starting work.
+        reply = paramiko.Message()
+        reply.add_byte(paramiko.common.cMSG_CHANNEL_SUCCESS)
+        reply.add_int(channel.remote_chanid)
+        channel.transport._send_user_message(reply)
+        channel.transport.answered_exec_requests.add(channel.remote_chanid)
+        threading.Thread(
+            target=self.fleet._serve_exec,
+            args=(channel, command.decode('utf-8', errors='replace')),
+            daemon=True,
+        ).start()
+        return True
+
+
+class MockSSHFleet:
+    """N simulated SSH hosts on loopback; use .servers as the execute target list."""
+
+    def __init__(self, hosts=10, latency_ms=0.0, output_bytes=256, run_commands=False, compression=False,
+                 forwarding=False, link_kbps=None):
+        self.host_count = hosts
+        self.latency_ms = latency_ms
+        self.output_bytes = output_bytes
+        self.run_commands = run_commands
+        self.compression = compression
+        self.forwarding = forwarding
+        self.link_kbps = link_kbps
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._pending_forwards = {}
+        self.channels_forwarded = 0
+        self.connections_accepted = 0
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.servers = []
+        self._sockets = []
+        self._transports = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.commands_served = 0
+
+    def start(self):
+        for _ in range(self.host_count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(('127.0.0.1', 0))
+            sock.listen(128)
+            self._sockets.append(sock)
+            self.servers.append(f"127.0.0.1:{sock.getsockname()[1]}")
+            threading.Thread(target=self._accept_loop, args=(sock,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for sock in self._sockets:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        with self._lock:
+            transports, self._transports = self._transports, []
+        for t in transports:
+            t.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _accept_loop(self, sock):
+        while not self._stop.is_set():
+            try:
+                client, _addr = sock.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections_accepted += 1
+            threading.Thread(target=self._serve_connection, args=(client,), daemon=True).start()
+
+    def _serve_connection(self, client):
+        transport = paramiko.Transport(_MeteredSocket(client, self))
+        transport.set_log_channel('benchmarks.mock_ssh.transport')
+        transport.use_compression(self.compression)
+        transport.add_server_key(self.host_key)
+        _drop_duplicate_exec_replies(transport)
+        with self._lock:
+            self._transports.append(transport)
+        try:
+            transport.start_server(server=_MockServer(self))
+            # Keep accepting channels until the client disconnects. The transport only
+            # holds weak references, so keep each channel alive until its exec finishes.
+            open_channels = set()
+            while transport.is_active() and not self._stop.is_set():
+                channel = transport.accept(timeout=1)
+                if channel is not None:
+                    open_channels.add(channel)
+                    with self._lock:
+                        upstream = self._pending_forwards.pop(channel.get_id(), None)
+                    if upstream is not None:
+                        threading.Thread(target=self._relay, args=(channel, upstream), daemon=True).start()
+                open_channels = {c for c in open_channels if not c.closed}
+        except Exception:
+            pass
+        finally:
+            transport.close()
+            with self._lock:
+                if transport in self._transports:
+                    self._transports.remove(transport)
+
+    def _relay(self, channel, upstream):
+        """Copy bytes both ways between a direct-tcpip channel and its destination socket."""
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([channel, upstream], [], [], 1)
+                if channel in readable:
+                    data = channel.recv(32768)
+                    if not data:
+                        break
+                    upstream.sendall(data)
+                if upstream in readable:
+                    data = upstream.recv(32768)
+                    if not data:
+                        break
+                    channel.sendall(data)
+        except Exception:
+            pass
+        finally:
+            upstream.close()
+            channel.close()
+
+    def _payload(self, command):
+        canned = _canned_reply(command)
+        if canned is not None:
+            return canned.encode(), b'', 0
+        if self.run_commands:
+            proc = subprocess.run(['/bin/sh', '-c', command], capture_output=True)
+            return proc.stdout, proc.stderr, proc.returncode
+        line = b'mock output line 0123456789 abcdefghijklmnopqrstuvwxyz\n'
+        reps = self.output_bytes // len(line) + 1
+        return (line * reps)[: self.output_bytes], b'', 0
+
+    def _serve_exec(self, channel, command):
+        try:
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000.0)
+            out, err, code = self._payload(command)
+            if out:
+                channel.sendall(out)
+            if err:
+                channel.sendall_stderr(err)
+            channel.send_exit_status(code)
+            with self._lock:
+                self.commands_served += 1
+        except Exception:
+            pass
+        finally:
+            channel.close()
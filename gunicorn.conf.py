@@ -0,0 +1,68 @@
+"""
+Gunicorn settings for production serving:
+
+    python run.py --production
+    gunicorn -c gunicorn.conf.py src.app:app
+
+With WEB_PRELOAD the parent imports the app once, including the RAG SentenceTransformer
+model and FAISS index, and forks the workers from it, so their pages are shared
+copy-on-write instead of loaded once per worker. Per-process state that does not survive a
+fork is rebuilt in post_fork: database connections and the retention thread. Workers pass
+their log records to the master, which is the only process writing (and rotating) LOG_FILE.
+Without WEB_PRELOAD each worker writes LOG_FILE itself and rotation is left to logrotate.
+
+Signals: HUP replaces the workers gracefully (re-read settings; with preload the code stays
+the parent's), TTIN / TTOU add or remove a worker, and USR2 followed by TERM to the old
+master upgrades the code without dropping connections.
+"""
+
+import gc
+import os
+
+# Tokenizer thread pools created while building the index in the parent do not survive fork
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+from src.config import Config  # noqa: E402
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = Config.WEB_PRELOAD
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+if not preload_app:
+    # Workers import the app after the fork, so no single process owns LOG_FILE
+    from src.logger import rotate_externally
+
+    rotate_externally()
+
+
+def when_ready(server):
+    """Master is up with the app loaded; workers are forked after this."""
+    if not preload_app:
+        return
+    from src.app import retention_worker
+    from src.logger import share_with_forked_children
+
+    share_with_forked_children()
+    # Retention runs in the workers; the master only supervises
+    retention_worker.stop()
+    # Keep the collector from touching (and un-sharing) every preloaded object in each worker
+    gc.freeze()
+    server.log.info("App preloaded; forking %d worker(s) x %d thread(s)", workers, threads)
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from src.app import app, db, retention_worker
+
+    # Pooled connections opened in the parent must not be shared; drop them without closing
+    with app.app_context():
+        db.engine.dispose(close=False)
+    retention_worker.start()
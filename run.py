@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
 """
 Simple script to run the ShellSentry application
+
+    python run.py                 # Flask development server (debug, single process)
+    python run.py --production    # gunicorn, pre-forked workers (see gunicorn.conf.py)
 """
-from src.app import app
+import os
+import sys
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_production():
+    try:
+        from gunicorn.app.wsgiapp import WSGIApplication
+    except ImportError:
+        sys.exit("Production mode needs gunicorn: pip install gunicorn")
+    sys.argv = ['gunicorn', '-c', os.path.join(project_root, 'gunicorn.conf.py'), 'src.app:app']
+    WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]").run()
+
+
+def run_development():
+    from src.app import app
 
-if __name__ == '__main__':
     print("=" * 60)
     print("ShellSentry - LLM-to-Bash Secure Command Execution")
     print("=" * 60)
@@ -16,6 +34,12 @@ if __name__ == '__main__':
     print("\nApplication will be available at: http://localhost:5001")
     print("=" * 60)
     print()
-    
+
     app.run(debug=True, host='0.0.0.0', port=5001)
 
+
+if __name__ == '__main__':
+    if '--production' in sys.argv[1:]:
+        run_production()
+    else:
+        run_development()
@@ -0,0 +1,256 @@
+"""
+Admission control and per-user fair scheduling for the expensive parts of a request.
+
+Two layers, both per process:
+
+- Entry: a user may have ADMISSION_USER_MAX_REQUESTS execute requests in flight and the
+  process ADMISSION_MAX_REQUESTS in total. Beyond that a request is refused at once
+  (HTTP 429 with a Retry-After hint) instead of tying up a server thread.
+- Resources: SSH fan-out ("ssh") and LLM calls ("llm") each have a fixed number of slots
+  (ADMISSION_SSH_SLOTS / ADMISSION_LLM_SLOTS), of which one user holds at most
+  ADMISSION_USER_SLOTS. Waiters are served in start-time fair queuing order: each user's
+  requests are tagged with a virtual start time advanced by cost / weight (cost = hosts
+  for SSH), so a user sending large fleets or many requests cannot push back someone
+  asking about one host. Waiting longer than ADMISSION_QUEUE_TIMEOUT_SECONDS is refused.
+
+User weights come from ADMISSION_USER_WEIGHTS ("alice:2,report-bot:0.5"; default 1).
+"""
+
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Smoothing of the hold-time averages behind Retry-After hints
+_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """The request cannot be admitted now; retry_after is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: int, pool: Optional[str] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.pool = pool
+
+
+def parse_user_weights(spec: str) -> Dict[str, float]:
+    """'alice:2,bot:0.5' -> {'alice': 2.0, 'bot': 0.5}; malformed or non-positive entries are skipped."""
+    weights = {}
+    for item in (spec or '').split(','):
+        name, sep, value = item.strip().rpartition(':')
+        if not sep or not name:
+            continue
+        try:
+            weight = float(value)
+        except ValueError:
+            continue
+        if weight > 0:
+            weights[name.strip()] = weight
+    return weights
+
+
+class _Waiter:
+    __slots__ = ('user', 'start', 'finish', 'seq', 'granted')
+
+    def __init__(self, user, start, finish, seq):
+        self.user = user
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.granted = False
+
+
+class FairQueue:
+    """
+    capacity slots shared by users, at most per_user held by one user; waiters are granted
+    in order of their virtual start tag (start-time fair queuing).
+    """
+
+    def __init__(self, name: str, capacity: int, per_user: int, timeout: float, weights: Dict[str, float]):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.per_user = max(1, per_user)
+        self.timeout = timeout
+        self.weights = weights
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._active = 0
+        self._active_by_user: Dict[str, int] = {}
+        self._last_finish: Dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._hold_seconds = 1.0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a newcomer (queue ahead / capacity x hold time)."""
+        rounds = (len(self._waiting) + 1) / self.capacity
+        return max(1, math.ceil(rounds * self._hold_seconds))
+
+    def _dispatch(self):
+        """Grant free slots to the eligible waiters with the smallest start tags (lock held)."""
+        granted = False
+        while self._active < self.capacity:
+            eligible = [w for w in self._waiting if self._active_by_user.get(w.user, 0) < self.per_user]
+            if not eligible:
+                break
+            waiter = min(eligible, key=lambda w: (w.start, w.seq))
+            self._waiting.remove(waiter)
+            waiter.granted = True
+            self._active += 1
+            self._active_by_user[waiter.user] = self._active_by_user.get(waiter.user, 0) + 1
+            self._virtual_time = max(self._virtual_time, waiter.start)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, user: str, cost: float = 1.0):
+        """Hold one slot for user; raises AdmissionRejected if none is granted within the timeout."""
+        with self._cond:
+            start = max(self._virtual_time, self._last_finish.get(user, 0.0))
+            finish = start + max(cost, 1.0) / self.weights.get(user, 1.0)
+            previous_finish = self._last_finish.get(user)
+            self._last_finish[user] = finish
+            waiter = _Waiter(user, start, finish, next(self._seq))
+            self._waiting.append(waiter)
+            self._dispatch()
+            deadline = time.monotonic() + self.timeout
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(waiter)
+                    if self._last_finish.get(user) == finish:
+                        # Nothing was served for this tag; do not charge the user for it
+                        if previous_finish is None:
+                            del self._last_finish[user]
+                        else:
+                            self._last_finish[user] = previous_finish
+                    logger.warning("Admission: %s waited %.0fs for a %s slot", user, self.timeout, self.name)
+                    raise AdmissionRejected(
+                        f'All {self.name} slots stayed busy for {self.timeout:g}s.',
+                        self.retry_after(), self.name,
+                    )
+                self._cond.wait(remaining)
+
+        held_from = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - held_from
+            with self._cond:
+                self._active -= 1
+                remaining_active = self._active_by_user.get(user, 1) - 1
+                if remaining_active:
+                    self._active_by_user[user] = remaining_active
+                else:
+                    self._active_by_user.pop(user, None)
+                    if (
+                        self._last_finish.get(user, 0.0) <= self._virtual_time
+                        and not any(w.user == user for w in self._waiting)
+                    ):
+                        # Idle users start again from the current virtual time
+                        self._last_finish.pop(user, None)
+                self._hold_seconds += _EWMA_ALPHA * (held - self._hold_seconds)
+                self._dispatch()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            waiting: Dict[str, int] = {}
+            for w in self._waiting:
+                waiting[w.user] = waiting.get(w.user, 0) + 1
+            return {
+                'capacity': self.capacity,
+                'per_user': self.per_user,
+                'active': self._active,
+                'active_by_user': dict(self._active_by_user),
+                'waiting': len(self._waiting),
+                'waiting_by_user': waiting,
+                'avg_hold_seconds': round(self._hold_seconds, 2),
+            }
+
+
+class AdmissionController:
+    """Entry limits plus one FairQueue per resource ('ssh', 'llm')."""
+
+    def __init__(self):
+        self.enabled = Config.ADMISSION_ENABLED
+        self.max_requests = max(1, Config.ADMISSION_MAX_REQUESTS)
+        self.user_max_requests = max(1, Config.ADMISSION_USER_MAX_REQUESTS)
+        weights = parse_user_weights(Config.ADMISSION_USER_WEIGHTS)
+        timeout = Config.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        self.queues = {
+            'ssh': FairQueue('ssh', Config.ADMISSION_SSH_SLOTS, Config.ADMISSION_USER_SLOTS, timeout, weights),
+            'llm': FairQueue('llm', Config.ADMISSION_LLM_SLOTS, Config.ADMISSION_USER_SLOTS, timeout, weights),
+        }
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._in_flight_by_user: Dict[str, int] = {}
+        self._request_seconds = 5.0
+
+    @contextmanager
+    def request(self, user: str):
+        """Admit one request of user for its whole duration, or raise AdmissionRejected at once."""
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            mine = self._in_flight_by_user.get(user, 0)
+            if mine >= self.user_max_requests:
+                reason = f'You already have {mine} request(s) running (limit {self.user_max_requests}).'
+            elif self._in_flight >= self.max_requests:
+                reason = 'The server is busy with other requests.'
+            else:
+                reason = None
+                self._in_flight += 1
+                self._in_flight_by_user[user] = mine + 1
+            retry_after = max(1, math.ceil(self._request_seconds))
+        if reason:
+            logger.info("Admission: rejected request of %s: %s", user, reason)
+            raise AdmissionRejected(reason, retry_after)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._in_flight -= 1
+                remaining = self._in_flight_by_user.get(user, 1) - 1
+                if remaining:
+                    self._in_flight_by_user[user] = remaining
+                else:
+                    self._in_flight_by_user.pop(user, None)
+                self._request_seconds += _EWMA_ALPHA * (elapsed - self._request_seconds)
+
+    @contextmanager
+    def slot(self, pool: str, user: str, cost: float = 1.0):
+        """Hold a slot of pool ('ssh' or 'llm') for user, waiting in fair order."""
+        if not self.enabled:
+            yield
+            return
+        with self.queues[pool].slot(user, cost):
+            yield
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            requests = {
+                'in_flight': self._in_flight,
+                'max': self.max_requests,
+                'per_user_max': self.user_max_requests,
+                'in_flight_by_user': dict(self._in_flight_by_user),
+                'avg_seconds': round(self._request_seconds, 2),
+            }
+        return {
+            'enabled': self.enabled,
+            'requests': requests,
+            'queues': {name: queue.snapshot() for name, queue in self.queues.items()},
+        }
@@ -1,16 +1,29 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, g
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from jinja2 import TemplateNotFound
 from .models import db, User
 from .auth import register_user, authenticate_user
 from .security import SecurityLayer
 from .llm_client import LLMClient
+from .llm_usage import record_llm_usage, usage_report
 from .command_validator import CommandValidator
-from .ssh_executor import SSHExecutor
+from .ssh_executor import create_ssh_executor
 from .logger import setup_logger
 from .result_formatter import format_execution_payload, format_error_summary
+from .fleet_aggregation import aggregate_fleet
+from .result_groups import grouped_results
+from .output_parsers import without_records
+from .result_store import ResultStore, ResultStoreError
 from .rag_pipeline import RagPipeline
+from .retention import ExecutionRetention, RetentionWorker
+from .compression import init_compression
+from .admission import AdmissionController, AdmissionRejected
 import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
 
 # Get the project root directory (parent of src)
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -25,15 +38,118 @@ db.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+init_compression(app)
 
 # Initialize components
 security_layer = SecurityLayer()
-llm_client = LLMClient()
+llm_client = LLMClient(bind_usage_recorder=lambda: _llm_usage_recorder(_current_username()))
 command_validator = CommandValidator()
-ssh_executor = SSHExecutor()
+ssh_executor = create_ssh_executor()
 rag_pipeline = RagPipeline()
+result_store = ResultStore()
+admission = AdmissionController()
 logger = setup_logger()
 
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+def _current_username():
+    return current_user.username if current_user and current_user.is_authenticated else ''
+
+
+def _llm_usage_recorder(username):
+    """Records LLM usage for username; also works after the request ended (late hedge answers)."""
+    def record(usage):
+        with app.app_context():
+            record_llm_usage(username, usage)
+    return record
+
+
+def _optional_flag(value):
+    """True / False for a JSON boolean or "true" / "false" / "1" / "0", None when absent; ValueError otherwise."""
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', '1'):
+        return True
+    if text in ('false', '0'):
+        return False
+    raise ValueError(f'expected true or false, got {value!r}')
+
+
+@app.before_request
+def assign_request_id():
+    """Tag every log record of this request with one id (reuses a sane X-Request-ID from a proxy)."""
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex[:16]
+
+
+@app.after_request
+def echo_request_id(response):
+    if getattr(g, 'request_id', None):
+        response.headers['X-Request-ID'] = g.request_id
+    timings = getattr(g, 'stage_timings', None)
+    if timings:
+        response.headers['Server-Timing'] = ', '.join(
+            f'{stage};dur={ms:.1f}' for stage, ms in timings.items()
+        )
+    return response
+
+
+@contextmanager
+def timed_stage(name):
+    """Record wall time of one pipeline stage; reported in the Server-Timing response header."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add_stage_time(name, (time.perf_counter() - started) * 1000)
+
+
+def _add_stage_time(name, ms):
+    if not hasattr(g, 'stage_timings'):
+        g.stage_timings = {}
+    g.stage_timings[name] = g.stage_timings.get(name, 0.0) + ms
+
+
+def too_busy_response(rejection):
+    """429 for a request that admission control turned away, with a Retry-After hint."""
+    response = jsonify({
+        'error': 'Too many requests',
+        'reason': rejection.reason,
+        'retry_after': rejection.retry_after,
+        'natural_language_summary': format_error_summary(
+            'The server is busy right now',
+            rejection.reason,
+            details=f'Wait about {rejection.retry_after} seconds and send it again.',
+        ),
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(rejection.retry_after)
+    return response
+
+
+def admission_controlled(view):
+    """Run the view under the per-user and per-process in-flight limits; 429 when it is not admitted."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            with admission.request(current_user.username):
+                return view(*args, **kwargs)
+        except AdmissionRejected as e:
+            return too_busy_response(e)
+    return wrapper
+
+
+@contextmanager
+def admitted(pool, cost=1):
+    """Hold a fair-queued 'ssh' or 'llm' slot for the current user; the wait is reported as queue_<pool>."""
+    started = time.perf_counter()
+    with admission.slot(pool, current_user.username, cost):
+        _add_stage_time(f'queue_{pool}', (time.perf_counter() - started) * 1000)
+        yield
+
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -48,6 +164,17 @@ def create_tables():
 # Initialize database on startup
 create_tables()
 
+# Archive, roll up and prune old execution logs in the background
+retention_worker = RetentionWorker(app)
+retention_worker.start()
+
+
+@app.cli.command('prune-executions')
+def prune_executions_command():
+    """Run execution log retention once (archive, roll up, prune)."""
+    stats = ExecutionRetention().run()
+    print(f"Archived {stats['archived']} execution(s) across {stats['days']} day(s)")
+
 @app.route('/')
 def index():
     if current_user.is_authenticated:
@@ -63,11 +190,11 @@ def login():
         user = authenticate_user(username, password)
         if user:
             login_user(user)
-            logger.info(f"User {username} logged in")
+            logger.info("User %s logged in", username)
             return redirect(url_for('dashboard'))
         else:
             flash('Invalid username or password', 'error')
-            logger.warning(f"Failed login attempt for username: {username}")
+            logger.warning("Failed login attempt for username: %s", username)
     
     return render_template('login.html')
 
@@ -85,7 +212,7 @@ def register():
             success, msg = register_user(username, email, password)
             if success:
                 flash('Registration successful. Please login.', 'success')
-                logger.info(f"New user registered: {username}")
+                logger.info("New user registered: %s", username)
                 return redirect(url_for('login'))
             else:
                 flash(msg, 'error')
@@ -97,7 +224,7 @@ def register():
 def logout():
     username = current_user.username
     logout_user()
-    logger.info(f"User {username} logged out")
+    logger.info("User %s logged out", username)
     return redirect(url_for('login'))
 
 @app.route('/dashboard')
@@ -107,6 +234,7 @@ def dashboard():
 
 @app.route('/api/execute', methods=['POST'])
 @login_required
+@admission_controlled
 def execute_command():
     """Main API endpoint for command execution"""
     try:
@@ -124,9 +252,10 @@ def execute_command():
             }), 400
         
         # Step 1: Input Validation
-        validation_result = security_layer.validate_input(natural_language)
+        with timed_stage('validate_input'):
+            validation_result = security_layer.validate_input(natural_language)
         if not validation_result['valid']:
-            logger.warning(f"Input validation failed for user {current_user.username}: {validation_result['reason']}")
+            logger.warning("Input validation failed for user %s: %s", current_user.username, validation_result['reason'])
             return jsonify({
                 'error': 'Input validation failed',
                 'reason': validation_result['reason'],
@@ -136,6 +265,21 @@ def execute_command():
                 ),
             }), 400
         
+        # Optional true / false switches; None leaves the decision to the server settings
+        flags = {}
+        for name in ('kb_fast_path', 'aggregate', 'compact', 'expand_results'):
+            try:
+                flags[name] = _optional_flag(data.get(name))
+            except ValueError as e:
+                return jsonify({
+                    'error': f'Invalid {name}',
+                    'reason': str(e),
+                    'natural_language_summary': format_error_summary(
+                        'The request had an option we could not read',
+                        details=f'{name} must be true or false.',
+                    ),
+                }), 400
+
         if not target_servers:
             target_servers = list(app.config['REMOTE_SERVERS'] or [])
 
@@ -150,22 +294,48 @@ def execute_command():
             }), 400
 
         # Step 2: SSH snapshot before LLM: OS (uname), running systemd services, listening ports (ss)
-        host_context = ssh_executor.probe_host_context(target_servers)
+        with admitted('ssh', cost=len(target_servers)), timed_stage('probe'):
+            host_context = ssh_executor.probe_host_context(target_servers)
         logger.info(
-            f"User {current_user.username} requested: {natural_language} "
-            f"(host context probe: {len(host_context)} host(s))"
+            "User %s requested: %s (host context probe: %d host(s))",
+            current_user.username, natural_language, len(host_context),
         )
 
         # Step 3: RAG retrieval before generation
-        retrieved_examples = rag_pipeline.retrieve(natural_language, top_k=3)
-        rag_context_text = rag_pipeline.format_for_prompt(retrieved_examples)
-
-        # Step 4: LLM Processing (grounded with retrieved examples)
-        llm_response = llm_client.generate_command(
-            natural_language,
-            remote_host_context=host_context,
-            rag_context_text=rag_context_text,
-        )
+        with timed_stage('rag'):
+            retrieved_examples = rag_pipeline.retrieve(natural_language, top_k=3)
+            rag_context_text = rag_pipeline.format_for_prompt(retrieved_examples)
+
+        # Step 4: Knowledge-base fast path: a confident match whose command passes validation
+        # is used as is. A request can only opt out ("kb_fast_path": false), never turn it on
+        # when the operator left KB_FAST_PATH_ENABLED off
+        kb_entry, kb_outcome = None, 'disabled'
+        if app.config['KB_FAST_PATH_ENABLED'] and flags['kb_fast_path'] is not False:
+            kb_entry, kb_outcome = rag_pipeline.fast_path_match(
+                retrieved_examples,
+                app.config['KB_FAST_PATH_MIN_SCORE'],
+                app.config['KB_FAST_PATH_MIN_MARGIN'],
+            )
+            if kb_entry is not None:
+                kb_outcome = 'bypassed'
+                if not command_validator.validate(kb_entry['command'])['valid']:
+                    kb_entry, kb_outcome = None, 'rejected'
+        rag_pipeline.fast_path_stats.record(kb_outcome)
+
+        if kb_entry is not None:
+            logger.info(
+                "Knowledge base match (score %s): %s -> %s",
+                kb_entry['score'], kb_entry['description'], kb_entry['command'],
+            )
+            llm_response = {'success': True, 'command': kb_entry['command']}
+        else:
+            # Step 4b: LLM Processing (grounded with retrieved examples)
+            with admitted('llm'), timed_stage('llm_generate'):
+                llm_response = llm_client.generate_command(
+                    natural_language,
+                    remote_host_context=host_context,
+                    rag_context_text=rag_context_text,
+                )
         
         if not llm_response['success']:
             err = llm_response.get('error', 'Unknown error')
@@ -179,12 +349,13 @@ def execute_command():
             }), 500
         
         generated_command = llm_response['command']
-        logger.info(f"Generated command: {generated_command}")
+        logger.info("Generated command: %s", generated_command)
         
         # Step 5: Command Validation
-        validation_result = command_validator.validate(generated_command)
+        with timed_stage('validate_command'):
+            validation_result = command_validator.validate(generated_command)
         if not validation_result['valid']:
-            logger.warning(f"Command validation failed: {validation_result['reason']}")
+            logger.warning("Command validation failed: %s", validation_result['reason'])
             return jsonify({
                 'error': 'Command validation failed',
                 'reason': validation_result['reason'],
@@ -199,27 +370,45 @@ def execute_command():
         command_to_run = command_validator.normalize_for_execution(generated_command)
         
         # Step 6: Remote Execution
-        execution_results = ssh_executor.execute_on_servers(
-            command_to_run,
-            target_servers,
-            current_user.username,
-            current_user.id,
-            natural_language
-        )
+        with admitted('ssh', cost=len(target_servers)), timed_stage('execute'):
+            execution_results = ssh_executor.execute_on_servers(
+                command_to_run,
+                target_servers,
+                current_user.username,
+                current_user.id,
+                natural_language
+            )
         
         # Step 7: Log execution
-        logger.info(f"Command executed by {current_user.username} on {len(target_servers)} server(s)")
-
-        formatted = format_execution_payload(
-            natural_language, command_to_run, execution_results, host_context
-        )
+        logger.info("Command executed by %s on %s server(s)", current_user.username, len(target_servers))
+
+        with timed_stage('format'):
+            # "aggregate": true / false forces fleet mode on or off; otherwise it depends on fleet size
+            aggregate = flags['aggregate']
+            if aggregate is None:
+                min_hosts = app.config['FLEET_AGGREGATE_MIN_HOSTS']
+                aggregate = bool(min_hosts) and len(execution_results) >= min_hosts
+            fleet_summary = (
+                aggregate_fleet(command_to_run, execution_results, top_n=app.config['FLEET_TOP_N'])
+                if aggregate else None
+            )
+            formatted = format_execution_payload(
+                natural_language, command_to_run, execution_results, host_context, fleet_summary
+            )
 
         ai_explain = ""
-        summ = llm_client.summarize_execution_report(
-            natural_language,
-            command_to_run,
-            formatted["formatted_report"],
-        )
+        try:
+            with admitted('llm'), timed_stage('llm_summarize'):
+                summ = llm_client.summarize_execution_report(
+                    natural_language,
+                    command_to_run,
+                    formatted["formatted_report"],
+                    # The fleet report is already compact; otherwise let the client budget per-host output
+                    results=None if fleet_summary else execution_results,
+                )
+        except AdmissionRejected as e:
+            # The command already ran: answer without the explanation instead of with a 429
+            summ = {"success": False, "error": e.reason}
         if summ.get("success") and summ.get("summary"):
             ai_explain = summ["summary"].strip()
         else:
@@ -234,11 +423,47 @@ def execute_command():
             "remote_host_context": host_context,
             "generated_command": command_to_run,
             "rag_retrieval": retrieved_examples,
-            "results": execution_results,
+            "kb_fast_path": {
+                "used": kb_entry is not None,
+                "outcome": kb_outcome,
+                "score": retrieved_examples[0]["score"] if retrieved_examples else None,
+            },
+            "fleet_summary": fleet_summary,
             "natural_language_summary": formatted["natural_language_summary"],
             "formatted_report": formatted["formatted_report"],
             "ai_report_explanation": ai_explain,
         }
+        listed = set(fleet_summary["hosts_without_data"]) if fleet_summary else set(execution_results)
+
+        # Compact mode: outputs go to the result store and the response carries sizes, previews
+        # and URLs to fetch ranges ("compact": true / false, otherwise by total output size)
+        compact = flags['compact']
+        if compact is None:
+            output_bytes = sum(
+                len(r.get('stdout') or '') + len(r.get('stderr') or '') for r in execution_results.values()
+            )
+            compact = output_bytes >= app.config['RESULT_COMPACT_THRESHOLD_BYTES']
+        if compact:
+            with timed_stage('store'):
+                stored = result_store.save(current_user.id, execution_results, formatted["formatted_report"])
+            payload.update({
+                "compact": True,
+                "run_id": stored["run_id"],
+                "result_groups": [g for g in stored["result_groups"] if listed.intersection(g["hosts"])],
+                "formatted_report": None,
+                "formatted_report_url": stored["report_url"],
+                "remote_host_context": {
+                    host: {k: ctx.get(k) for k in ('uname_line', 'error')}
+                    for host, ctx in (host_context or {}).items() if isinstance(ctx, dict)
+                },
+            })
+        else:
+            # Records stay server-side (summary, report, fleet statistics); the response keeps the highlight
+            payload["result_groups"] = grouped_results(
+                {h: without_records(r) for h, r in execution_results.items() if h in listed}
+            )["groups"]
+        if flags['expand_results']:
+            payload["results"] = {h: without_records(r) for h, r in execution_results.items()}
         if not ai_explain:
             payload["ai_report_explanation_error"] = (
                 "An AI explanation of the report could not be created. "
@@ -247,8 +472,10 @@ def execute_command():
 
         return jsonify(payload)
         
+    except AdmissionRejected:
+        raise
     except Exception as e:
-        logger.error(f"Error in execute_command: {str(e)}", exc_info=True)
+        logger.error("Error in execute_command: %s", e, exc_info=True)
         return jsonify({
             'error': 'Internal server error',
             'details': str(e),
@@ -258,6 +485,112 @@ def execute_command():
             ),
         }), 500
 
+@app.route('/api/execute/batch', methods=['POST'])
+@login_required
+@admission_controlled
+def execute_batch():
+    """
+    Run several Bash commands on the target servers over one SSH connection per host.
+    Body: {"commands": ["df -h", "free -m", "uptime"], "servers": [...]}.
+    Each command is checked by the command validator; rejected ones are reported, not run.
+    """
+    try:
+        data = request.json or {}
+        commands = data.get('commands') or []
+        target_servers = data.get('servers') or list(app.config['REMOTE_SERVERS'] or [])
+
+        if not isinstance(commands, list) or not commands or not all(isinstance(c, str) for c in commands):
+            return jsonify({
+                'error': 'A non-empty list of commands is required',
+                'natural_language_summary': format_error_summary(
+                    'Please list the commands to run.',
+                    details='For example: ["df -h", "free -m", "uptime"].',
+                ),
+            }), 400
+        if len(commands) > app.config['BATCH_MAX_COMMANDS']:
+            return jsonify({
+                'error': f"Too many commands (max {app.config['BATCH_MAX_COMMANDS']})",
+            }), 400
+        if not target_servers:
+            return jsonify({
+                'error': 'No target servers configured',
+                'details': 'Please configure REMOTE_SERVERS in .env or specify servers in the request',
+            }), 400
+
+        # Validate every command; run only the ones that pass (keyed by the command as sent)
+        to_run = {}
+        rejected = {}
+        with timed_stage('validate_command'):
+            for command in commands:
+                command = command.strip()
+                if not command or command in to_run or command in rejected:
+                    continue
+                verdict = command_validator.validate(command)
+                if verdict['valid']:
+                    to_run[command] = command_validator.normalize_for_execution(command)
+                else:
+                    logger.warning("Batch command rejected: %s", verdict['reason'])
+                    rejected[command] = verdict['reason']
+
+        if not to_run:
+            return jsonify({
+                'error': 'Command validation failed',
+                'rejected': rejected,
+                'natural_language_summary': format_error_summary(
+                    'None of those commands are allowed to run on your servers',
+                ),
+            }), 400
+
+        with admitted('ssh', cost=len(target_servers) * len(to_run)), timed_stage('execute'):
+            by_normalized = ssh_executor.execute_batch(
+                list(to_run.values()),
+                target_servers,
+                current_user.username,
+                current_user.id,
+                original_request=f"[batch] {len(to_run)} command(s)",
+            )
+        logger.info(
+            "Batch of %d command(s) executed by %s on %d server(s)",
+            len(to_run), current_user.username, len(target_servers),
+        )
+
+        return jsonify({
+            'success': True,
+            'servers': target_servers,
+            'results': {original: by_normalized[normalized] for original, normalized in to_run.items()},
+            'rejected': rejected,
+        })
+
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        logger.error("Error in execute_batch: %s", e, exc_info=True)
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e),
+        }), 500
+
+@app.route('/api/results/<run_id>/report', methods=['GET'])
+@app.route('/api/results/<run_id>/<key>/<stream>', methods=['GET'])
+@login_required
+def get_result_range(run_id, key='report', stream=None):
+    """
+    Range of a stored output from a compact /api/execute response. key is the group
+    fingerprint (or a host name), stream stdout or stderr; without them the report is read.
+    Query: ?lines=START-END or ?bytes=START-END (END exclusive and optional).
+    """
+    unit, spec = ('lines', request.args['lines']) if 'lines' in request.args else ('bytes', request.args.get('bytes', '0-'))
+    match = re.match(r'^(\d+)-(\d*)$', spec.strip())
+    if not match:
+        return jsonify({'error': f'Invalid {unit} range, expected START-END'}), 400
+    start, end = int(match.group(1)), int(match.group(2)) if match.group(2) else None
+    try:
+        chunk = result_store.read(current_user.id, run_id, key, stream, start, end, unit=unit)
+    except ResultStoreError as e:
+        return jsonify({'error': str(e)}), 404
+    chunk['unit'] = unit
+    return jsonify(chunk)
+
 @app.route('/api/servers', methods=['GET'])
 @login_required
 def get_servers():
@@ -265,6 +598,49 @@ def get_servers():
     servers = app.config['REMOTE_SERVERS']
     return jsonify({'servers': servers})
 
+@app.route('/api/servers/health', methods=['GET'])
+@login_required
+def get_server_health():
+    """Circuit breaker state of hosts with recent connect failures"""
+    return jsonify({'hosts': ssh_executor.circuit_breaker.snapshot()})
+
+@app.route('/api/admission/status', methods=['GET'])
+@login_required
+def get_admission_status():
+    """Requests in flight and fair-queue occupancy (slots held and waiters per user)"""
+    return jsonify(admission.snapshot())
+
+@app.route('/api/llm/usage', methods=['GET'])
+@login_required
+def get_llm_usage():
+    """
+    LLM calls, tokens, latency and estimated cost for the last ?hours=24 (max 720), in total,
+    per user, per call type and per hour; ?user= limits it to one user.
+    """
+    try:
+        hours = min(max(int(request.args.get('hours', 24)), 1), 720)
+    except ValueError:
+        return jsonify({'error': 'hours must be a whole number'}), 400
+    return jsonify(usage_report(hours=hours, username=request.args.get('user') or None))
+
+@app.route('/api/llm/endpoints', methods=['GET'])
+@login_required
+def get_llm_endpoints():
+    """LLM endpoints with their recent latency percentiles, error rate and cool-down state"""
+    return jsonify(llm_client.router.snapshot())
+
+@app.route('/api/kb/fast-path', methods=['GET'])
+@login_required
+def get_kb_fast_path_stats():
+    """How often execute requests skipped the LLM via a knowledge-base match, and why not otherwise"""
+    stats = rag_pipeline.fast_path_stats.snapshot()
+    stats.update(
+        enabled=app.config['KB_FAST_PATH_ENABLED'],
+        min_score=app.config['KB_FAST_PATH_MIN_SCORE'],
+        min_margin=app.config['KB_FAST_PATH_MIN_MARGIN'],
+    )
+    return jsonify(stats)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -280,7 +656,7 @@ def health_check():
 @app.errorhandler(TemplateNotFound)
 def template_not_found_error(error):
     """Show custom 500 page when a template is missing (e.g. renamed/deleted)."""
-    logger.error(f"Template not found: {error}")
+    logger.error("Template not found: %s", error)
     try:
         return render_template(
             'errors/error.html',
@@ -334,7 +710,7 @@ def method_not_allowed_error(error):
 
 @app.errorhandler(500)
 def internal_error(error):
-    logger.error(f"Internal server error: {str(error)}", exc_info=True)
+    logger.error("Internal server error: %s", error, exc_info=True)
     return render_template(
         'errors/error.html',
         error_code=500,
@@ -0,0 +1,346 @@
+"""
+asyncio SSH execution backend (SSH_BACKEND=asyncio, needs the asyncssh package).
+
+Same interface and result dicts as SSHExecutor, but every host session is a coroutine on
+one event loop per process instead of a thread: a request to thousands of hosts holds
+thousands of connections at once (capped by SSH_ASYNC_MAX_SESSIONS) without a thread each.
+Flask handlers stay synchronous; they hand the work to the loop thread and wait for it.
+
+Pre-scan, credentials, inventory (jump hosts, transport profiles), circuit breaker and
+execution logging are shared with the threaded backend. asyncssh errors are translated to
+the paramiko/socket exceptions the threaded backend raises, so both report failures with
+the same messages and circuit-breaker categories.
+"""
+
+import asyncio
+import dataclasses
+import os
+import socket
+import threading
+import time
+
+import paramiko
+
+from .config import Config
+from .inventory import split_host_port
+from .jump_hosts import BASTION_FAILURE_SECONDS, parse_jump_host
+from .logger import setup_logger
+from .circuit_breaker import classify_connect_error
+from .ssh_executor import PROBE_COMMANDS, SSHExecutor
+from .transport_profiles import decode_remote_gzip
+
+try:
+    import asyncssh
+except ImportError:  # optional: only needed for SSH_BACKEND=asyncio
+    asyncssh = None
+
+logger = setup_logger()
+
+_COMPRESSION_ALGS = ('zlib@openssh.com', 'zlib', 'none')
+
+
+class _EventLoopThread:
+    """One event loop on a daemon thread per process; synchronous callers submit coroutines to it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        if hasattr(os, 'register_at_fork'):
+            # The loop thread does not survive fork (pre-forked server workers); start a new one lazily
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._loop = None
+
+    def run(self, coro):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='ssh-asyncio', daemon=True).start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+class _LoopState:
+    """Objects bound to the event loop: the session limit, open bastion connections and recent bastion failures."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.sessions = asyncio.Semaphore(max(1, Config.SSH_ASYNC_MAX_SESSIONS))
+        self.bastions = {}
+        self.bastion_locks = {}
+        self.bastion_failures = {}  # spec -> (monotonic time, exception)
+
+
+class AsyncSSHExecutor(SSHExecutor):
+    """SSHExecutor whose host sessions run as asyncssh coroutines on a shared event loop."""
+
+    def __init__(self, credentials=None):
+        if asyncssh is None:
+            raise ImportError("SSH_BACKEND=asyncio needs the asyncssh package: pip install asyncssh")
+        super().__init__(credentials)
+        self._loop_thread = _EventLoopThread()
+        self._state = None
+        self._client_keys = {}
+
+    def _loop_state(self):
+        loop = asyncio.get_running_loop()
+        if self._state is None or self._state.loop is not loop:
+            self._state = _LoopState(loop)
+        return self._state
+
+    def _execute_hosts(self, command, servers, unreachable, scan_ms):
+        async def run(server):
+            if server in unreachable:
+                return dict(self._connect_failure_result(unreachable[server]), duration_ms=scan_ms)
+            # Like a pool thread, time only the host's own session, not the wait for a slot
+            async with self._loop_state().sessions:
+                started = time.perf_counter()
+                try:
+                    result = await self._execute_on_server_async(server, command)
+                except Exception as e:
+                    logger.error("Error executing on %s: %s", server, e, exc_info=True)
+                    result = {
+                        'success': False,
+                        'error': str(e),
+                        'stdout': '',
+                        'stderr': '',
+                        'exit_code': -1
+                    }
+                result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+                return result
+
+        return self._gather_hosts(run, servers)
+
+    def _probe_hosts(self, servers, unreachable):
+        async def probe(server):
+            if server in unreachable:
+                return unreachable[server]
+            async with self._loop_state().sessions:
+                conn, connect_error = await self._connect(server)
+                if connect_error is not None:
+                    return connect_error
+                try:
+                    # The probe commands are independent; run them on concurrent channels
+                    outputs = await asyncio.gather(*(
+                        self._exec_remote_text_async(conn, cmd, timeout=t) for cmd, t in PROBE_COMMANDS
+                    ))
+                    return self._host_context_result(*outputs)
+                except Exception as e:
+                    e = self._paramiko_error(server, e)
+                    logger.warning("Host context probe failed on %s: %s", server, e)
+                    return self._probe_error_result(e)
+                finally:
+                    conn.close()
+
+        return self._gather_hosts(probe, servers)
+
+    def _execute_batch_hosts(self, commands, servers):
+        return self._gather_hosts(lambda server: self._execute_batch_on_server_async(server, commands), servers)
+
+    def _gather_hosts(self, func, servers):
+        """Run the coroutine func(server) for every server on the event loop; results in input order."""
+        servers = list(dict.fromkeys(servers))
+        if not servers:
+            return {}
+
+        async def run_all():
+            return await asyncio.gather(*(func(server) for server in servers))
+
+        return dict(zip(servers, self._loop_thread.run(run_all())))
+
+    async def _execute_on_server_async(self, server, command):
+        conn, connect_error = await self._connect(server)
+        if connect_error is not None:
+            return self._connect_failure_result(connect_error)
+        try:
+            return await self._run_command_async(
+                conn, command, remote_gzip=self._transport_profile(server)['remote_gzip']
+            )
+        except Exception as e:
+            return self._execution_error_result(server, self._paramiko_error(server, e))
+        finally:
+            conn.close()
+
+    async def _execute_batch_on_server_async(self, server, commands):
+        """One connection to server; every command on its own channel (SSH_MAX_CHANNELS_PER_HOST at a time)."""
+        async with self._loop_state().sessions:
+            started = time.perf_counter()
+            conn, connect_error = await self._connect(server)
+            if connect_error is not None:
+                failure = self._connect_failure_result(connect_error)
+                elapsed = round((time.perf_counter() - started) * 1000, 1)
+                return {command: dict(failure, duration_ms=elapsed) for command in commands}
+            connect_ms = (time.perf_counter() - started) * 1000
+            remote_gzip = self._transport_profile(server)['remote_gzip']
+            channels = asyncio.Semaphore(max(1, Config.SSH_MAX_CHANNELS_PER_HOST))
+
+            async def run(command):
+                async with channels:
+                    t0 = time.perf_counter()
+                    try:
+                        result = await self._run_command_async(conn, command, remote_gzip=remote_gzip)
+                    except Exception as e:
+                        result = self._execution_error_result(server, self._paramiko_error(server, e))
+                    result['duration_ms'] = round(connect_ms + (time.perf_counter() - t0) * 1000, 1)
+                    return result
+
+            try:
+                return dict(zip(commands, await asyncio.gather(*(run(command) for command in commands))))
+            finally:
+                conn.close()
+
+    async def _run_command_async(self, conn, command, timeout=60, remote_gzip=False):
+        completed = await conn.run(
+            self._remote_command(command, remote_gzip), encoding=None, check=False, timeout=timeout
+        )
+        stdout_bytes = completed.stdout or b''
+        if remote_gzip:
+            stdout_bytes = decode_remote_gzip(stdout_bytes)
+        exit_code = completed.exit_status if completed.exit_status is not None else -1
+        return {
+            'success': exit_code == 0,
+            'stdout': stdout_bytes.decode('utf-8', errors='replace'),
+            'stderr': (completed.stderr or b'').decode('utf-8', errors='replace'),
+            'exit_code': exit_code
+        }
+
+    async def _exec_remote_text_async(self, conn, command, timeout=25):
+        completed = await conn.run(command, check=False, timeout=timeout, errors='replace')
+        exit_code = completed.exit_status if completed.exit_status is not None else -1
+        return exit_code, (completed.stdout or '').strip(), (completed.stderr or '').strip()
+
+    async def _connect(self, server):
+        """
+        asyncssh counterpart of _open_ssh: (connection, None) on success, (None, error_dict)
+        on failure, with the same retry and circuit-breaker handling.
+        """
+        open_circuit_error = self.circuit_breaker.check(server)
+        if open_circuit_error is not None:
+            logger.info("Skipping %s: circuit open", server)
+            return None, open_circuit_error
+
+        try:
+            hostname, port = split_host_port(server)
+            credential = self.credentials.for_host(server, hostname)
+            if credential.error:
+                raise ValueError(credential.error)
+            logger.debug(
+                "Connecting to %s as %s using %s (%s)",
+                server, credential.username, credential.method, credential.source,
+            )
+            options = self._connect_options(credential, self._transport_profile(server, hostname))
+            jump_host = self._jump_host_for(server, hostname)
+
+            max_retries = 2
+            for attempt in range(max_retries):
+                try:
+                    if jump_host:
+                        # Inner handshake runs over a channel of the shared bastion connection
+                        options['tunnel'] = await self._bastion(jump_host)
+                    conn = await asyncssh.connect(hostname, port, **options)
+                    self.circuit_breaker.record_success(server)
+                    return conn, None
+                except Exception as e:
+                    if attempt < max_retries - 1:
+                        logger.warning(
+                            "SSH connection attempt %d/%d failed for %s: %s, retrying...",
+                            attempt + 1, max_retries, server, e,
+                        )
+                        await asyncio.sleep(1)
+                        continue
+                    raise
+        except Exception as e:
+            e = self._paramiko_error(server, e)
+            error = self._connect_error_result(server, e)
+            self.circuit_breaker.record_failure(server, classify_connect_error(e), error)
+            return None, error
+
+    def _connect_options(self, credential, profile=None, connect_timeout=30):
+        """asyncssh.connect keyword arguments equivalent to the paramiko connect settings."""
+        if credential.allow_agent:
+            agent_path = Config.SSH_AGENT_SOCKET or ()
+        else:
+            agent_path = None
+        options = {
+            'username': credential.username,
+            'password': credential.password if credential.pkey is None else None,
+            'client_keys': [self._client_key(credential)] if credential.pkey is not None else None,
+            'agent_path': agent_path,
+            # Hosts are not pinned (like paramiko's AutoAddPolicy in the threaded backend)
+            'known_hosts': None,
+            'connect_timeout': connect_timeout,
+        }
+        if profile is not None:
+            options['compression_algs'] = list(_COMPRESSION_ALGS) if profile['compression'] else ['none']
+            options['window'] = int(profile['window_size'])
+            options['max_pktsize'] = int(profile['max_packet_size'])
+        return options
+
+    def _client_key(self, credential):
+        """The credential's key parsed by asyncssh (once per path)."""
+        cache_key = (credential.key_path, credential.key_passphrase)
+        key = self._client_keys.get(cache_key)
+        if key is None:
+            key = self._client_keys[cache_key] = asyncssh.read_private_key(
+                credential.key_path, credential.key_passphrase
+            )
+        return key
+
+    async def _bastion(self, spec):
+        """Connection to the jump host spec, shared by every host behind it on this loop."""
+        state = self._loop_state()
+        conn = state.bastions.get(spec)
+        if conn is not None and not conn.is_closed():
+            return conn
+        self._raise_bastion_failure(state, spec)
+        # Only one coroutine performs the outer handshake; the others wait and reuse it (or its error)
+        async with state.bastion_locks.setdefault(spec, asyncio.Lock()):
+            conn = state.bastions.get(spec)
+            if conn is not None and not conn.is_closed():
+                return conn
+            self._raise_bastion_failure(state, spec)
+            user, server = parse_jump_host(spec)
+            hostname, port = split_host_port(server)
+            credential = self.credentials.for_host(server, hostname)
+            if credential.error:
+                raise ValueError(credential.error)
+            if user:
+                credential = dataclasses.replace(credential, username=user)
+            options = self._connect_options(credential)
+            try:
+                conn = await asyncssh.connect(hostname, port, keepalive_interval=30, **options)
+            except Exception as e:
+                logger.warning("Jump host %s failed: %s; failing its hosts for %.0fs", server, e, BASTION_FAILURE_SECONDS)
+                state.bastion_failures[spec] = (time.monotonic(), e)
+                raise
+            logger.info("Connected to jump host %s as %s", server, credential.username)
+            state.bastions[spec] = conn
+            state.bastion_failures.pop(spec, None)
+            return conn
+
+    @staticmethod
+    def _raise_bastion_failure(state, spec):
+        """Re-raise the bastion's connect error if it failed within BASTION_FAILURE_SECONDS."""
+        failure = state.bastion_failures.get(spec)
+        if failure is not None and time.monotonic() - failure[0] <= BASTION_FAILURE_SECONDS:
+            raise failure[1]
+
+    @staticmethod
+    def _paramiko_error(server, exc):
+        """The exception the threaded backend would have raised for exc (for shared error mapping)."""
+        if isinstance(exc, asyncssh.PermissionDenied):
+            return paramiko.AuthenticationException(exc.reason)
+        if isinstance(exc, asyncssh.ChannelOpenError):
+            return paramiko.ChannelException(exc.code, exc.reason)
+        if isinstance(exc, TimeoutError):
+            # asyncssh.TimeoutError (command) and connect timeouts; socket.timeout is TimeoutError
+            return exc
+        if isinstance(exc, asyncssh.Error):
+            return paramiko.SSHException(exc.reason)
+        if isinstance(exc, OSError) and not isinstance(exc, (socket.gaierror, ConnectionResetError)):
+            # Refused / unreachable TCP connect, reported by paramiko as NoValidConnectionsError
+            hostname, port = split_host_port(server)
+            return paramiko.ssh_exception.NoValidConnectionsError({(hostname, port): exc})
+        return exc
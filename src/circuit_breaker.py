@@ -0,0 +1,238 @@
+"""
+Per-host circuit breaker for SSH connects.
+
+A host whose connect fails with a network error (timeout, refused, DNS, unreachable)
+is put in the open state: later requests fail fast with the cached error instead of
+waiting out the connect timeout again. After CIRCUIT_OPEN_SECONDS a background probe
+(a TCP connect, through the bastion for jump hosts) runs in half-open state; failure re-opens
+the circuit with a doubled delay (capped at CIRCUIT_MAX_OPEN_SECONDS), success puts it on
+probation: connects are attempted again, the first failed one re-opens it with the doubled
+delay, and only a successful connect closes it and resets the delay.
+
+Pre-scan timeouts are short and count only when they repeat: the first in a row is ignored,
+each further consecutive one is a 'timeout' failure.
+
+Authentication and credential errors never trip the breaker: the host is reachable.
+"""
+
+import errno
+import socket
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import paramiko
+
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger()
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+PROBATION = 'probation'
+
+_UNREACHABLE_ERRNOS = {errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EHOSTDOWN, errno.ENETDOWN}
+
+
+def classify_connect_error(exc: BaseException) -> Optional[str]:
+    """Failure category for a connect exception, or None when the host itself is reachable."""
+    if isinstance(exc, paramiko.AuthenticationException):
+        return None
+    if isinstance(exc, paramiko.ChannelException):
+        # Bastion could not open the direct-tcpip channel: 2 = connect failed; others are policy/limits
+        return 'refused' if exc.code == paramiko.common.OPEN_FAILED_CONNECT_FAILED else None
+    if isinstance(exc, socket.gaierror):
+        return 'dns'
+    if isinstance(exc, (socket.timeout, TimeoutError)):
+        return 'timeout'
+    if isinstance(exc, paramiko.ssh_exception.NoValidConnectionsError):
+        codes = {getattr(e, 'errno', None) for e in exc.errors.values()}
+        return 'unreachable' if codes & _UNREACHABLE_ERRNOS else 'refused'
+    if isinstance(exc, ConnectionRefusedError):
+        return 'refused'
+    if isinstance(exc, OSError) and exc.errno in _UNREACHABLE_ERRNOS:
+        return 'unreachable'
+    message = str(exc).lower()
+    if 'timed out' in message or 'timeout' in message:
+        return 'timeout'
+    if 'name resolution' in message or 'could not resolve' in message:
+        return 'dns'
+    if 'no route to host' in message or 'network is unreachable' in message:
+        return 'unreachable'
+    if 'unable to connect to port' in message or 'connection refused' in message:
+        return 'refused'
+    if isinstance(exc, (paramiko.SSHException, EOFError, ConnectionResetError)):
+        # Banner / kex failures: something answers but is not a usable sshd
+        return 'protocol'
+    return None
+
+
+class _HostCircuit:
+    __slots__ = ('state', 'failures', 'last_error', 'opened_at', 'open_seconds', 'probing')
+
+    def __init__(self, window: int):
+        self.state = CLOSED
+        self.failures = deque(maxlen=window)  # (monotonic time, category)
+        self.last_error: Optional[Dict] = None
+        self.opened_at = 0.0
+        self.open_seconds = 0.0
+        self.probing = False
+
+
+class HostCircuitBreaker:
+    """Tracks connect failures per host and decides whether a connect is attempted."""
+
+    def __init__(
+        self,
+        probe: Callable[[str], bool],
+        failure_threshold: Optional[int] = None,
+        failure_window_seconds: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+        max_open_seconds: Optional[float] = None,
+    ):
+        self.probe = probe
+        self.failure_threshold = max(1, failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD)
+        self.failure_window_seconds = failure_window_seconds or Config.CIRCUIT_FAILURE_WINDOW_SECONDS
+        self.open_seconds = open_seconds or Config.CIRCUIT_OPEN_SECONDS
+        self.max_open_seconds = max(self.open_seconds, max_open_seconds or Config.CIRCUIT_MAX_OPEN_SECONDS)
+        self.enabled = Config.CIRCUIT_BREAKER_ENABLED
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostCircuit] = {}
+        self._scan_timeouts: Dict[str, int] = {}
+
+    def _circuit(self, server: str) -> _HostCircuit:
+        circuit = self._hosts.get(server)
+        if circuit is None:
+            circuit = self._hosts[server] = _HostCircuit(max(self.failure_threshold, 10))
+        return circuit
+
+    def check(self, server: str) -> Optional[Dict]:
+        """
+        None when a connect to server may be attempted; otherwise the cached error dict
+        to return immediately (the circuit is open or a half-open probe is pending).
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            circuit = self._hosts.get(server)
+            if circuit is None or circuit.state in (CLOSED, PROBATION):
+                return None
+            remaining = circuit.opened_at + circuit.open_seconds - time.monotonic()
+            if remaining <= 0 and not circuit.probing:
+                circuit.state = HALF_OPEN
+                circuit.probing = True
+                threading.Thread(
+                    target=self._half_open_probe, args=(server,), name='circuit-probe', daemon=True
+                ).start()
+            cached = dict(circuit.last_error or {})
+        retry_in = max(0, int(round(remaining)))
+        note = (
+            f"Skipped: {server} failed to connect recently; "
+            f"next reachability check in {retry_in}s" if retry_in else
+            f"Skipped: {server} failed to connect recently; reachability check in progress"
+        )
+        cached['stderr'] = f"{cached.get('stderr', '')}\n{note}".strip()
+        return cached
+
+    def record_success(self, server: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._scan_timeouts.pop(server, None)
+            circuit = self._hosts.get(server)
+            if circuit is None:
+                return
+            if circuit.state != CLOSED:
+                logger.info("Circuit closed for %s", server)
+            del self._hosts[server]
+
+    def record_scan(self, server: str, category: Optional[str], error: Optional[Dict] = None):
+        """
+        Outcome of a pre-scan TCP check (category None = reachable). Refusals and DNS errors
+        count at once; a timeout only when the previous scan of the host timed out too.
+        """
+        if not self.enabled:
+            return
+        if category is None:
+            with self._lock:
+                self._scan_timeouts.pop(server, None)
+            return
+        if category == 'timeout':
+            with self._lock:
+                repeats = self._scan_timeouts[server] = self._scan_timeouts.get(server, 0) + 1
+            if repeats < 2:
+                return
+        self.record_failure(server, category, error or {})
+
+    def record_failure(self, server: str, category: Optional[str], error: Dict):
+        """Count a failed connect; categories of None (e.g. auth errors) are ignored."""
+        if not self.enabled or category is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(server)
+            circuit.failures.append((now, category))
+            circuit.last_error = dict(error)
+            recent = [c for t, c in circuit.failures if now - t <= self.failure_window_seconds]
+            if circuit.state == PROBATION:
+                # Reachable to the probe, but a real connect still fails: back off further
+                circuit.state = OPEN
+                circuit.opened_at = now
+                circuit.open_seconds = min(circuit.open_seconds * 2, self.max_open_seconds)
+                logger.warning(
+                    "Circuit re-opened for %s after a failed connect on probation; fast-failing for %.0fs",
+                    server, circuit.open_seconds,
+                )
+            elif circuit.state == CLOSED and len(recent) >= self.failure_threshold:
+                circuit.state = OPEN
+                circuit.opened_at = now
+                circuit.open_seconds = self.open_seconds
+                logger.warning(
+                    "Circuit opened for %s after %d %s failure(s); fast-failing for %.0fs",
+                    server, len(recent), '/'.join(sorted(set(recent))), circuit.open_seconds,
+                )
+
+    def _half_open_probe(self, server: str):
+        try:
+            reachable = self.probe(server)
+        except Exception as e:
+            logger.debug("Circuit probe for %s raised: %s", server, e)
+            reachable = False
+        with self._lock:
+            circuit = self._hosts.get(server)
+            if circuit is None:
+                return
+            circuit.probing = False
+            if reachable:
+                # Let the next request try a real connect; its outcome closes or re-opens
+                circuit.state = PROBATION
+                logger.info("Circuit probe succeeded for %s; allowing connects on probation", server)
+            else:
+                circuit.state = OPEN
+                circuit.opened_at = time.monotonic()
+                circuit.open_seconds = min(circuit.open_seconds * 2, self.max_open_seconds)
+                logger.info("Circuit probe failed for %s; open for another %.0fs", server, circuit.open_seconds)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """State and recent failure counts by category per tracked host."""
+        now = time.monotonic()
+        with self._lock:
+            out = {}
+            for server, circuit in self._hosts.items():
+                by_category: Dict[str, int] = {}
+                for t, category in circuit.failures:
+                    if now - t <= self.failure_window_seconds:
+                        by_category[category] = by_category.get(category, 0) + 1
+                out[server] = {
+                    'state': circuit.state,
+                    'failures': by_category,
+                    'error': (circuit.last_error or {}).get('error'),
+                    'retry_in_seconds': (
+                        max(0, round(circuit.opened_at + circuit.open_seconds - now, 1))
+                        if circuit.state != CLOSED else 0
+                    ),
+                }
+            return out
@@ -266,7 +266,7 @@ class CommandValidator:
         if base_command in self.readonly_safe_builtins:
             return {'valid': True}
         if base_command not in self.readonly_allowlist:
-            logger.warning(f"Read-only: base command not allowed: {base_command}")
+            logger.warning("Read-only: base command not allowed: %s", base_command)
             return {'valid': False, 'reason': f'Read-only mode: state-changing or disallowed command: {base_command}'}
 
         p = part.strip()
@@ -368,7 +368,7 @@ class CommandValidator:
         # Check blacklist patterns
         for pattern in self.blacklist_patterns:
             if re.search(pattern, command, re.IGNORECASE):
-                logger.warning(f"Blacklist pattern matched: {pattern}")
+                logger.warning("Blacklist pattern matched: %s", pattern)
                 return {'valid': False, 'reason': f'Forbidden pattern detected: {pattern}'}
 
         if Config.READ_ONLY_EXECUTION:
@@ -409,7 +409,7 @@ class CommandValidator:
                 if base_command not in self.whitelist:
                     # Check if it's a builtin or common command
                     if not self._is_safe_builtin(base_command):
-                        logger.warning(f"Command not in whitelist: {base_command}")
+                        logger.warning("Command not in whitelist: %s", base_command)
                         return {
                             'valid': False,
                             'reason': f'Command not allowed: {base_command}'
@@ -428,7 +428,7 @@ class CommandValidator:
                         return result
         
         except Exception as e:
-            logger.error(f"Error parsing command: {str(e)}")
+            logger.error("Error parsing command: %s", e)
             return {'valid': False, 'reason': f'Error parsing command: {str(e)}'}
         
         return {'valid': True}
@@ -0,0 +1,153 @@
+"""
+Negotiated compression of HTTP responses (br when the brotli package is installed, gzip,
+deflate).
+
+Responses of at least RESPONSE_COMPRESSION_MIN_BYTES with a text-like mimetype are
+compressed according to the client's Accept-Encoding. Streamed (chunked) responses are
+compressed chunk by chunk as they are produced, so they keep streaming.
+"""
+
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from .config import Config
+
+try:
+    import brotli
+except ImportError:  # optional: only advertised when installed
+    brotli = None
+
+_COMPRESSIBLE = ('application/json', 'application/javascript', 'text/', 'image/svg+xml')
+# Server preference when the client accepts several with the same q-value
+_PREFERENCE = ('br', 'gzip', 'deflate')
+_STREAM_FLUSH_BYTES = 16 * 1024
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding from an Accept-Encoding header, or None for identity."""
+    offered = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            offered[name] = q
+    supported = [e for e in _PREFERENCE if e != 'br' or brotli is not None]
+    best = None
+    for encoding in supported:
+        q = offered.get(encoding, offered.get('*', 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (encoding, q)
+    return best[0] if best else None
+
+
+class _Compressor:
+    """Uniform compress()/flush() over zlib (gzip or deflate) and brotli."""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=min(max(level, 0), 11))
+            self._compress, self._flush, self._finish = (
+                self._obj.process, self._obj.flush, self._obj.finish
+            )
+        else:
+            wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, wbits)
+            self._compress = self._obj.compress
+            self._flush = lambda: self._obj.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._obj.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def flush(self) -> bytes:
+        return self._flush()
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+def compress_bytes(data: bytes, encoding: str, level: int = 6) -> bytes:
+    compressor = _Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(
+    chunks: Iterable[bytes],
+    encoding: str,
+    level: int = 6,
+    flush_bytes: int = _STREAM_FLUSH_BYTES,
+) -> Iterator[bytes]:
+    """
+    Compress an iterable of chunks, flushing whenever flush_bytes of input have gone in so
+    the client keeps receiving data (flushing per chunk would ruin the ratio for line-sized chunks).
+    """
+    compressor = _Compressor(encoding, level)
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if not chunk:
+                continue
+            out = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_bytes:
+                out += compressor.flush()
+                pending = 0
+            if out:
+                yield out
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+
+
+def init_compression(app):
+    """Register the after_request hook that compresses eligible responses."""
+    if not Config.RESPONSE_COMPRESSION_ENABLED:
+        return
+
+    from flask import request
+
+    min_bytes = Config.RESPONSE_COMPRESSION_MIN_BYTES
+    level = Config.RESPONSE_COMPRESSION_LEVEL
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or request.method == 'HEAD'
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(_COMPRESSIBLE)
+        ):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.content_length is not None and response.content_length < min_bytes:
+            return response
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, level)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compress_bytes(response.get_data(), encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        # Byte ranges and strong validators refer to the uncompressed body
+        response.headers.pop('Accept-Ranges', None)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
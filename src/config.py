@@ -15,12 +15,50 @@ class Config:
     # Default to Groq's OpenAI-compatible endpoint (override in .env if needed)
     LLM_API_BASE_URL = os.environ.get('LLM_API_BASE_URL', 'https://api.groq.com/openai/v1')
     LLM_MODEL = os.environ.get('LLM_MODEL', 'llama-3.1-8b-instant')
+    # Approximate token budget for the execution results sent to the LLM for the plain-language
+    # explanation; identical host outputs are grouped and samples shrink to fit
+    LLM_SUMMARY_TOKEN_BUDGET = int(os.environ.get('LLM_SUMMARY_TOKEN_BUDGET', '3000'))
+    # Approximate token budget for the host snapshot (OS, services, listeners) in the command
+    # generation prompt; hosts with the same snapshot are grouped and lists shrink to fit
+    LLM_HOST_CONTEXT_TOKEN_BUDGET = int(os.environ.get('LLM_HOST_CONTEXT_TOKEN_BUDGET', '1500'))
+    # Identical prompts sent while the same one is already in flight wait for that API call
+    # and share its answer instead of making their own (per process)
+    LLM_SINGLE_FLIGHT = os.environ.get('LLM_SINGLE_FLIGHT', 'true').lower() == 'true'
+    # Routing: more OpenAI-compatible endpoints as JSON, e.g.
+    # [{"base_url": "https://api.openai.com/v1", "model": "gpt-4o-mini", "api_key": "..."}]
+    # (api_key / base_url default to the primary's). Slow answers are hedged on the next endpoint
+    # after LLM_HEDGE_PERCENTILE of recent latency (at least LLM_HEDGE_MIN_MS; never with only the
+    # primary); failures fall back, up to LLM_MAX_ATTEMPTS requests per call
+    LLM_FALLBACK_ENDPOINTS = os.environ.get('LLM_FALLBACK_ENDPOINTS', '')
+    LLM_MAX_ATTEMPTS = int(os.environ.get('LLM_MAX_ATTEMPTS', '3'))
+    LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'true').lower() == 'true'
+    LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', '90'))
+    LLM_HEDGE_MIN_MS = float(os.environ.get('LLM_HEDGE_MIN_MS', '1000'))
+    # Usage accounting: tokens, latency and calls per hour, user, model and call type
+    # (GET /api/llm/usage); prices in your currency per 1000 tokens, for the cost estimate
+    LLM_USAGE_ENABLED = os.environ.get('LLM_USAGE_ENABLED', 'true').lower() == 'true'
+    LLM_PROMPT_PRICE_PER_1K = float(os.environ.get('LLM_PROMPT_PRICE_PER_1K', '0'))
+    LLM_COMPLETION_PRICE_PER_1K = float(os.environ.get('LLM_COMPLETION_PRICE_PER_1K', '0'))
+    # Knowledge-base fast path: when the top RAG match scores at least KB_FAST_PATH_MIN_SCORE
+    # (cosine similarity) and leads the runner-up by KB_FAST_PATH_MIN_MARGIN, its command is run
+    # without asking the LLM (if it passes validation). Off by default: check the scores your
+    # knowledge base gives (the kb_fast_path.score of each response) before enabling it
+    KB_FAST_PATH_ENABLED = os.environ.get('KB_FAST_PATH_ENABLED', 'false').lower() == 'true'
+    KB_FAST_PATH_MIN_SCORE = float(os.environ.get('KB_FAST_PATH_MIN_SCORE', '0.80'))
+    KB_FAST_PATH_MIN_MARGIN = float(os.environ.get('KB_FAST_PATH_MIN_MARGIN', '0.05'))
+    # Fleet aggregation: with at least this many hosts (0 = only on request), output that a parser
+    # understands (df, free, uptime, ps, ss, systemctl) is rolled up into fleet statistics
+    FLEET_AGGREGATE_MIN_HOSTS = int(os.environ.get('FLEET_AGGREGATE_MIN_HOSTS', '20'))
+    FLEET_TOP_N = int(os.environ.get('FLEET_TOP_N', '5'))
     
     # SSH Configuration
     SSH_USER = os.environ.get('SSH_USER', '')
     SSH_PASSWORD = os.environ.get('SSH_PASSWORD', '')
     SSH_KEY_PATH = os.environ.get('SSH_KEY_PATH', '~/.ssh/id_rsa')
+    SSH_KEY_PASSPHRASE = os.environ.get('SSH_KEY_PASSPHRASE', '')
     SSH_AGENT_SOCKET = os.environ.get('SSH_AGENT_SOCKET', '')
+    # Optional JSON inventory with per-group / per-host SSH settings (see src/inventory.py)
+    SSH_INVENTORY_FILE = os.environ.get('SSH_INVENTORY_FILE', '')
     
     # Remote Servers
     REMOTE_SERVERS = [s.strip() for s in os.environ.get('REMOTE_SERVERS', '').split(',') if s.strip()]
@@ -41,9 +79,86 @@ class Config:
                         'password': password.strip()
                     }
     
+    # Concurrency for batch execution: hosts handled at once, and channels per host connection
+    # (keep channels at or below the servers' sshd MaxSessions, 10 by default)
+    SSH_MAX_PARALLEL_HOSTS = int(os.environ.get('SSH_MAX_PARALLEL_HOSTS', '32'))
+    SSH_MAX_CHANNELS_PER_HOST = int(os.environ.get('SSH_MAX_CHANNELS_PER_HOST', '8'))
+    # Execution backend: threads (paramiko, SSH_MAX_PARALLEL_HOSTS threads) or asyncio (asyncssh,
+    # every host a coroutine on one event loop, at most SSH_ASYNC_MAX_SESSIONS connections at once)
+    SSH_BACKEND = os.environ.get('SSH_BACKEND', 'threads').strip().lower()
+    SSH_ASYNC_MAX_SESSIONS = int(os.environ.get('SSH_ASYNC_MAX_SESSIONS', '1000'))
+    BATCH_MAX_COMMANDS = int(os.environ.get('BATCH_MAX_COMMANDS', '20'))
+    # Transport profile for hosts without an inventory "transport" setting: default, wan
+    # (compression + large windows) or bulk (large windows + gzip of stdout on the host)
+    SSH_TRANSPORT_PROFILE = os.environ.get('SSH_TRANSPORT_PROFILE', 'default')
+    # Concurrent TCP check of every target's SSH port before any handshake; hosts that do not
+    # accept a connection within SSH_PRESCAN_TIMEOUT seconds are reported unreachable at once
+    SSH_PRESCAN_ENABLED = os.environ.get('SSH_PRESCAN_ENABLED', 'true').lower() == 'true'
+    SSH_PRESCAN_TIMEOUT = float(os.environ.get('SSH_PRESCAN_TIMEOUT', '2'))
+
+    # Per-host circuit breaker: after CIRCUIT_FAILURE_THRESHOLD network failures within the window,
+    # a host fails fast for CIRCUIT_OPEN_SECONDS (doubling up to the max while background probes fail)
+    CIRCUIT_BREAKER_ENABLED = os.environ.get('CIRCUIT_BREAKER_ENABLED', 'true').lower() == 'true'
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '3'))
+    CIRCUIT_FAILURE_WINDOW_SECONDS = float(os.environ.get('CIRCUIT_FAILURE_WINDOW_SECONDS', '300'))
+    CIRCUIT_OPEN_SECONDS = float(os.environ.get('CIRCUIT_OPEN_SECONDS', '30'))
+    CIRCUIT_MAX_OPEN_SECONDS = float(os.environ.get('CIRCUIT_MAX_OPEN_SECONDS', '600'))
+    CIRCUIT_PROBE_TIMEOUT = float(os.environ.get('CIRCUIT_PROBE_TIMEOUT', '3'))
+
     # Security Settings
     ALLOW_ROOT_EXECUTION = os.environ.get('ALLOW_ROOT_EXECUTION', 'false').lower() == 'true'
     # When true (default), only non-mutating / inspection commands may run on remote hosts.
     READ_ONLY_EXECUTION = os.environ.get('READ_ONLY_EXECUTION', 'true').lower() == 'true'
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.environ.get('LOG_FILE', 'shellsentry.log')
+    # File log format: json (one object per line, with request ids) or text
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+    # Rotate by size (LOG_MAX_BYTES) or, when LOG_ROTATE_WHEN is set (e.g. midnight, H), by time;
+    # rotated files are gzip-compressed and only LOG_BACKUP_COUNT of them are kept
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN', '')
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '5'))
+
+    # Execution log retention: rows older than this many days are archived, rolled up and pruned
+    # (0, the default, keeps every row in the table)
+    EXECUTION_RETENTION_DAYS = int(os.environ.get('EXECUTION_RETENTION_DAYS', '0'))
+    # One append-only gzip JSONL file per day is written here before rows leave the hot table
+    EXECUTION_ARCHIVE_DIR = os.environ.get('EXECUTION_ARCHIVE_DIR', 'archive/executions')
+    RETENTION_INTERVAL_SECONDS = int(os.environ.get('RETENTION_INTERVAL_SECONDS', '3600'))
+
+    # Result store for compact /api/execute responses: outputs are written here and fetched by range
+    RESULT_STORE_DIR = os.environ.get('RESULT_STORE_DIR', 'archive/results')
+    RESULT_STORE_TTL_SECONDS = int(os.environ.get('RESULT_STORE_TTL_SECONDS', '3600'))
+    # Responses whose host outputs add up to at least this many bytes switch to compact mode
+    RESULT_COMPACT_THRESHOLD_BYTES = int(os.environ.get('RESULT_COMPACT_THRESHOLD_BYTES', '262144'))
+    RESULT_FETCH_MAX_BYTES = int(os.environ.get('RESULT_FETCH_MAX_BYTES', '1048576'))
+
+    # Compression of API / page responses negotiated via Accept-Encoding (br needs the brotli package)
+    RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', 'true').lower() == 'true'
+    RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
+    RESPONSE_COMPRESSION_LEVEL = int(os.environ.get('RESPONSE_COMPRESSION_LEVEL', '6'))
+
+    # Production server (python run.py --production): pre-forked gunicorn workers, each with WEB_THREADS
+    # threads. With WEB_PRELOAD the app, RAG model and index load once in the parent and are shared
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5001')
+    WEB_WORKERS = int(os.environ.get('WEB_WORKERS', str(min(os.cpu_count() or 1, 4))))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', '8'))
+    WEB_PRELOAD = os.environ.get('WEB_PRELOAD', 'true').lower() == 'true'
+    # /api/execute waits on SSH and two LLM calls; keep the worker timeout above that
+    WEB_TIMEOUT = int(os.environ.get('WEB_TIMEOUT', '300'))
+    WEB_GRACEFUL_TIMEOUT = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', '60'))
+    WEB_MAX_REQUESTS = int(os.environ.get('WEB_MAX_REQUESTS', '0'))
+
 
+    # Admission control (per process): execute requests in flight (over the limit -> 429 with
+    # Retry-After; keep it below WEB_THREADS so the UI and result fetches still get a thread),
+    # fair-queued slots for SSH fan-out and LLM calls, and how long a request may wait for one
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', 'true').lower() == 'true'
+    ADMISSION_MAX_REQUESTS = int(os.environ.get('ADMISSION_MAX_REQUESTS', str(max(1, WEB_THREADS - 2))))
+    ADMISSION_USER_MAX_REQUESTS = int(os.environ.get('ADMISSION_USER_MAX_REQUESTS', '2'))
+    ADMISSION_SSH_SLOTS = int(os.environ.get('ADMISSION_SSH_SLOTS', '4'))
+    ADMISSION_LLM_SLOTS = int(os.environ.get('ADMISSION_LLM_SLOTS', '4'))
+    ADMISSION_USER_SLOTS = int(os.environ.get('ADMISSION_USER_SLOTS', '2'))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT_SECONDS', '30'))
+    # Fair-share weights by username, e.g. "alice:2,report-bot:0.5" (default 1)
+    ADMISSION_USER_WEIGHTS = os.environ.get('ADMISSION_USER_WEIGHTS', '')
@@ -0,0 +1,199 @@
+"""
+Compact the pre-run host snapshots into a generation prompt that fits a token budget.
+
+Each host's probe output (uname, running services, ss listeners) is reduced to a profile:
+the OS line without the host name, the set of service names and the set of listening
+ports with their process. Hosts with the same profile are grouped; what every probed host
+has in common is listed once, and each group only lists what it adds. Lists shrink, then
+groups drop to their host names and OS, until the text fits the budget, so the prompt
+stays bounded however many hosts are selected.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .report_compaction import estimate_tokens
+
+_MAX_HOST_NAMES = 8
+_MAX_LINE_CHARS = 200
+# Item limits tried in turn for a list until its block fits (None = everything)
+_LIST_LIMITS = (None, 12, 4)
+_WILDCARD_ADDRESSES = {'0.0.0.0', '*', '[::]', '::'}
+# Present on nearly every systemd host; listed after the services that say what a host is for
+_BASE_SERVICE_PREFIXES = (
+    'systemd-', 'getty@', 'serial-getty@', 'user@', 'dbus', 'polkit', 'cron', 'rsyslog',
+    'irqbalance', 'networkd-dispatcher', 'unattended-upgrades', 'multipathd', 'snapd',
+    'accounts-daemon', 'udisks2', 'ModemManager', 'packagekit', 'upower', 'thermald',
+)
+_SS_PROCESS = re.compile(r'\(\("([^"]+)"')
+
+INTRO = (
+    "Remote host snapshot gathered over SSH before generating the command "
+    "(OS, running services, listening ports). Use this to pick correct tools, paths, "
+    "and flags; align suggestions with what is actually running when relevant.\n"
+    "Hosts with the same snapshot are grouped (host names removed from the OS line); "
+    "listeners are port/protocol and process, with the address only when not bound to all interfaces."
+)
+
+Profile = Tuple[Optional[str], Tuple[str, ...], Tuple[str, ...], Optional[str]]
+
+
+def _os_line(uname: Optional[str]) -> Optional[str]:
+    """uname -a without its second field (the node name), so identical hosts compare equal."""
+    parts = (uname or '').split()
+    if len(parts) < 2:
+        return uname or None
+    return ' '.join(parts[:1] + parts[2:])[:_MAX_LINE_CHARS]
+
+
+def parse_services(text: Optional[str]) -> List[str]:
+    """Unit names (without .service) from `systemctl list-units --type=service` output."""
+    names = set()
+    for line in (text or '').splitlines():
+        for token in line.replace('●', ' ').split()[:1]:
+            if token.endswith('.service'):
+                names.add(token[:-len('.service')])
+    return sorted(names, key=lambda n: (n.startswith(_BASE_SERVICE_PREFIXES), n))
+
+
+def parse_listeners(text: Optional[str], proto: str) -> List[str]:
+    """'22/tcp sshd', '127.0.0.1:5432/tcp postgres' entries from `ss -tlnp` / `ss -ulnp` output."""
+    entries = {}
+    for line in (text or '').splitlines():
+        parts = line.split()
+        if len(parts) < 5 or parts[0] in ('State', 'Netid'):
+            continue
+        address, _sep, port = parts[3].rpartition(':')
+        if not port.isdigit():
+            continue
+        address = address.split('%', 1)[0]
+        where = f"{port}/{proto}" if address in _WILDCARD_ADDRESSES else f"{address}:{port}/{proto}"
+        process = _SS_PROCESS.search(line)
+        entries[where] = f"{where} {process.group(1)}" if process else where
+    return [entries[k] for k in sorted(entries, key=lambda k: (int(k.split('/')[0].rpartition(':')[2]), k))]
+
+
+def host_profile(info: Dict[str, Any]) -> Profile:
+    """(os, services, listeners, error) for one host's probe result; error only if nothing was probed."""
+    if info.get('error') and not info.get('uname_line') and not info.get('running_services'):
+        return None, (), (), str(info['error'])[:_MAX_LINE_CHARS]
+    os_line = _os_line(info.get('uname_line'))
+    if os_line is None:
+        os_line = f"unavailable ({info['error']})"[:_MAX_LINE_CHARS] if info.get('error') else 'unavailable'
+    listeners = parse_listeners(info.get('listening_tcp'), 'tcp') + parse_listeners(info.get('listening_udp'), 'udp')
+    return os_line, tuple(parse_services(info.get('running_services'))), tuple(listeners), None
+
+
+def _host_list(hosts: List[str]) -> str:
+    shown = ', '.join(hosts[:_MAX_HOST_NAMES])
+    if len(hosts) > _MAX_HOST_NAMES:
+        shown += f" (+{len(hosts) - _MAX_HOST_NAMES} more)"
+    return shown
+
+
+def _items(label: str, items, limit: Optional[int]) -> Optional[str]:
+    items = list(items)
+    if not items:
+        return None
+    shown = items if limit is None else items[:limit]
+    line = f"  {label} ({len(items)}): {', '.join(shown)}"
+    if len(shown) < len(items):
+        line += f" (+{len(items) - len(shown)} more)"
+    return line
+
+
+def _common_block(services, listeners, hosts: int, limit: Optional[int]) -> str:
+    lines = [f"Common to all {hosts} probed host(s):"]
+    lines.extend(filter(None, (
+        _items('services', services, limit),
+        _items('listening', listeners, limit),
+    )))
+    return "\n".join(lines)
+
+
+def _group_block(index: int, hosts: List[str], profile: Profile, common, limit: Optional[int]) -> str:
+    os_line, services, listeners, error = profile
+    if error:
+        return f"[{index}] {len(hosts)} host(s): {_host_list(hosts)}\n  not probed: {error}"
+    common_services, common_listeners = common
+    label = 'more services' if common_services else 'services'
+    lines = [f"[{index}] {len(hosts)} host(s): {_host_list(hosts)}", f"  OS: {os_line}"]
+    if limit != 0:
+        lines.extend(filter(None, (
+            _items(label, [s for s in services if s not in common_services], limit),
+            _items('more listening' if common_listeners else 'listening',
+                   [entry for entry in listeners if entry not in common_listeners], limit),
+        )))
+    return "\n".join(lines)
+
+
+def compact_host_context(host_context: Dict[str, Dict[str, Any]], token_budget: int = 1500) -> Dict[str, Any]:
+    """
+    Returns {'text', 'tokens', 'hosts', 'groups', 'groups_included'} where text describes
+    host_context (host -> probe result) in about token_budget tokens; text is '' without hosts.
+    """
+    groups: Dict[Profile, List[str]] = {}
+    for host in sorted(host_context or {}):
+        info = host_context[host]
+        if isinstance(info, dict):
+            groups.setdefault(host_profile(info), []).append(host)
+    if not groups:
+        return {'text': '', 'tokens': 0, 'hosts': 0, 'groups': 0, 'groups_included': 0}
+
+    # Largest groups first; hosts that could not be probed say least about what to run
+    ordered = sorted(groups.items(), key=lambda item: (item[0][3] is not None, -len(item[1]), item[1][0]))
+    probed = [profile for profile, _hosts in ordered if profile[3] is None]
+    common_services: Tuple[str, ...] = ()
+    common_listeners: Tuple[str, ...] = ()
+    if len(probed) > 1:
+        common_services = tuple(s for s in probed[0][1] if all(s in p[1] for p in probed[1:]))
+        common_listeners = tuple(entry for entry in probed[0][2] if all(entry in p[2] for p in probed[1:]))
+    common = (set(common_services), set(common_listeners))
+
+    blocks = [INTRO]
+    used = estimate_tokens(INTRO)
+    # Keep room for the line that names what had to be left out
+    reserve = 40
+    if common_services or common_listeners:
+        probed_hosts = sum(len(hosts) for profile, hosts in ordered if profile[3] is None)
+        # The shared lists shrink before any group has to be left out entirely
+        groups_minimum = sum(
+            estimate_tokens(_group_block(i, hosts, profile, common, 0)) + 1
+            for i, (profile, hosts) in enumerate(ordered, start=1)
+        )
+        for limit in _LIST_LIMITS:
+            block = _common_block(common_services, common_listeners, probed_hosts, limit)
+            if used + estimate_tokens(block) + groups_minimum <= token_budget or limit == _LIST_LIMITS[-1]:
+                blocks.append(block)
+                used += estimate_tokens(block) + 1
+                break
+
+    included = 0
+    for position, (profile, hosts) in enumerate(ordered, start=1):
+        remaining = token_budget - used - (reserve if position < len(ordered) else 0)
+        for limit in _LIST_LIMITS + (0,):
+            block = _group_block(position, hosts, profile, common, limit)
+            cost = estimate_tokens(block) + 1
+            if cost <= remaining:
+                blocks.append(block)
+                used += cost
+                included += 1
+                break
+        else:
+            break
+
+    omitted = ordered[included:]
+    if omitted:
+        omitted_hosts = [h for _profile, hosts in omitted for h in hosts]
+        blocks.append(
+            f"[… {len(omitted)} more distinct snapshot(s) on {len(omitted_hosts)} host(s) not shown: "
+            f"{_host_list(omitted_hosts)} …]"
+        )
+    text = "\n\n".join(blocks)
+    return {
+        'text': text,
+        'tokens': estimate_tokens(text),
+        'hosts': sum(len(hosts) for hosts in groups.values()),
+        'groups': len(groups),
+        'groups_included': included,
+    }
@@ -0,0 +1,183 @@
+"""
+SSH credential provider: keys are read and parsed once, credentials are indexed per
+host and group, and the connection layer receives ready-to-use auth settings.
+
+Precedence for a server (first match wins):
+1) SERVER_CREDENTIALS entry (IP:username:password) -> password auth
+2) SSH_INVENTORY_FILE host entry, then its group (username/password/key_path)
+3) defaults: SSH_USER with SSH_KEY_PATH, else the SSH agent, else SSH_PASSWORD
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import paramiko
+
+from .config import Config
+from .inventory import Inventory
+from .logger import setup_logger
+
+logger = setup_logger()
+
+# Tried in order when a paramiko without PKey.from_path has to guess the key type
+_KEY_CLASSES = (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey)
+
+
+@dataclass(frozen=True)
+class HostCredential:
+    """Pre-built authentication settings for one host."""
+
+    username: str
+    password: Optional[str] = None
+    pkey: Optional[paramiko.PKey] = None
+    allow_agent: bool = False
+    source: str = 'default'
+    error: Optional[str] = None
+    # Where pkey was loaded from, for clients that parse keys themselves (asyncssh backend)
+    key_path: Optional[str] = None
+    key_passphrase: Optional[str] = None
+
+    @property
+    def method(self) -> str:
+        if self.pkey is not None:
+            return f"{self.pkey.get_name()} key"
+        if self.password:
+            return 'password'
+        if self.allow_agent:
+            return 'agent'
+        return 'none'
+
+    def connect_kwargs(self) -> Dict:
+        kwargs = {
+            'username': self.username,
+            'look_for_keys': False,
+            'allow_agent': self.allow_agent,
+        }
+        if self.pkey is not None:
+            kwargs['pkey'] = self.pkey
+        elif self.password:
+            kwargs['password'] = self.password
+        return kwargs
+
+
+def load_private_key(path: str, passphrase: Optional[str] = None) -> paramiko.PKey:
+    """Parse an RSA, Ed25519 or ECDSA private key (PEM or OpenSSH format), optionally encrypted."""
+    if hasattr(paramiko.PKey, 'from_path'):
+        return paramiko.PKey.from_path(path, passphrase=passphrase.encode() if passphrase else None)
+    last_error = None
+    for key_class in _KEY_CLASSES:
+        try:
+            return key_class.from_private_key_file(path, password=passphrase)
+        except paramiko.PasswordRequiredException:
+            raise
+        except Exception as e:
+            last_error = e
+    raise ValueError(f"Key format not recognized (not RSA, Ed25519 or ECDSA): {last_error}")
+
+
+class CredentialProvider:
+    """Loads keys once and hands out HostCredential objects by host."""
+
+    def __init__(self, inventory: Optional[Inventory] = None):
+        self.inventory = inventory or Inventory()
+        self._lock = threading.Lock()
+        self._keys: Dict[Tuple[str, Optional[str]], Tuple[Optional[paramiko.PKey], Optional[str]]] = {}
+        self._by_host: Dict[str, HostCredential] = {}
+        self._load_defaults()
+
+    def reload(self):
+        """Re-read the inventory and key files (e.g. after rotating a key)."""
+        with self._lock:
+            self._keys = {}
+            self._by_host = {}
+        self.inventory.load()
+        self._load_defaults()
+
+    def _load_defaults(self):
+        ssh_user_raw = Config.SSH_USER or ''
+        # SSH_USER may be "username@hostname"; only the user part is used
+        self.default_user = ssh_user_raw.split('@')[0] if '@' in ssh_user_raw else ssh_user_raw
+        self.default_password = Config.SSH_PASSWORD
+        self.default_key_path = os.path.expanduser(Config.SSH_KEY_PATH) if Config.SSH_KEY_PATH else ''
+        self.default_key_passphrase = Config.SSH_KEY_PASSPHRASE or None
+        self.agent_enabled = bool(Config.SSH_AGENT_SOCKET)
+        self.server_credentials = Config.SERVER_CREDENTIALS
+
+        # Parse the default key eagerly so a bad key is reported at startup, not per request
+        if self.default_key_path and os.path.exists(self.default_key_path):
+            self._key(self.default_key_path, self.default_key_passphrase)
+
+    def _key(self, path: str, passphrase: Optional[str]) -> Tuple[Optional[paramiko.PKey], Optional[str]]:
+        """Parsed key (or the load error) for path, cached for the provider's lifetime."""
+        cache_key = (os.path.realpath(path), passphrase)
+        with self._lock:
+            cached = self._keys.get(cache_key)
+        if cached is not None:
+            return cached
+        try:
+            key = load_private_key(path, passphrase)
+            logger.info("Loaded %s SSH key: %s", key.get_name(), path)
+            loaded = (key, None)
+        except Exception as e:
+            logger.error("Could not load SSH key %s: %s", path, e)
+            loaded = (None, f"Could not load SSH key {path}: {e}")
+        with self._lock:
+            self._keys[cache_key] = loaded
+        return loaded
+
+    def for_host(self, server: str, hostname: Optional[str] = None) -> HostCredential:
+        """HostCredential for server (memoized; no file I/O after the first call per host)."""
+        cred = self._by_host.get(server)
+        if cred is None:
+            cred = self._build(server, hostname or server)
+            with self._lock:
+                self._by_host[server] = cred
+        return cred
+
+    def _build(self, server: str, hostname: str) -> HostCredential:
+        flat = self.server_credentials.get(server) or self.server_credentials.get(hostname)
+        if flat and flat.get('password'):
+            return HostCredential(
+                username=flat['username'], password=flat['password'], source='server_credentials'
+            )
+
+        group_name, settings = self.inventory.resolve(server, hostname)
+        if settings.get('username') or settings.get('password') or settings.get('key_path'):
+            source = f"group:{group_name}" if group_name else 'inventory'
+            if self.inventory.hosts.get(server) or self.inventory.hosts.get(hostname):
+                source = 'inventory:host'
+            username = settings.get('username') or self.default_user or 'root'
+            key_path = settings.get('key_path')
+            if key_path:
+                passphrase = settings.get('key_passphrase')
+                if settings.get('key_passphrase_env'):
+                    passphrase = os.environ.get(settings['key_passphrase_env'])
+                key_path = os.path.expanduser(key_path)
+                key, error = self._key(key_path, passphrase or None)
+                if key is not None or not settings.get('password'):
+                    return HostCredential(
+                        username=username, pkey=key, source=source, error=error,
+                        key_path=key_path, key_passphrase=passphrase or None,
+                    )
+            return HostCredential(
+                username=username,
+                password=settings.get('password'),
+                allow_agent=bool(settings.get('allow_agent', False)),
+                source=source,
+            )
+
+        username = (flat or {}).get('username') or self.default_user or 'root'
+        if self.default_key_path and os.path.exists(self.default_key_path):
+            key, error = self._key(self.default_key_path, self.default_key_passphrase)
+            return HostCredential(
+                username=username, pkey=key, source='default', error=error,
+                key_path=self.default_key_path, key_passphrase=self.default_key_passphrase,
+            )
+        if self.agent_enabled:
+            return HostCredential(username=username, allow_agent=True, source='default')
+        if self.default_password:
+            return HostCredential(username=username, password=self.default_password, source='default')
+        logger.warning("No SSH key or password found for %s", server)
+        return HostCredential(username=username, source='default')
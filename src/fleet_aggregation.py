@@ -0,0 +1,308 @@
+"""
+Fleet-wide numeric rollups of parsed command output.
+
+For commands with a parser (df, free, uptime, ps, ss, systemctl list-units) every host's
+records are reduced to a few numbers (fullest filesystem %, memory used %, load average,
+...). Those go into one hosts x metrics NumPy array, and min / max / mean / percentiles,
+worst hosts and outliers are computed for all metrics at once. The result is a compact
+summary that stays the same size whether the command ran on ten hosts or ten thousand.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .output_parsers import ensure_parsed
+
+_PERCENTILES = (50, 90, 99)
+# Modified z-score (median / MAD) above which a host is reported as an outlier
+_OUTLIER_Z = 3.5
+_SIZE = re.compile(r'^(?P<num>\d+(?:[.,]\d+)?)\s*(?P<unit>[KMGTPE]?)(?:i?B?)$', re.I)
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4, 'P': 1024 ** 5, 'E': 1024 ** 6}
+
+# parser name -> (metric -> (label, unit, higher_is_worse)), and parser name -> records -> {metric: value}
+_METRICS: Dict[str, Dict[str, tuple]] = {}
+_EXTRACTORS: Dict[str, Callable[[List[Dict[str, Any]]], Dict[str, float]]] = {}
+
+
+def metric(parser: str, metrics: Dict[str, tuple]):
+    """Decorator registering the numeric extractor for one output parser."""
+    def decorator(func):
+        _METRICS[parser] = metrics
+        _EXTRACTORS[parser] = func
+        return func
+    return decorator
+
+
+def _size_bytes(value: Any) -> Optional[float]:
+    """'20G' / '7.6Gi' / '512M' -> bytes; plain numbers are returned as they are."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _SIZE.match(str(value or '').strip())
+    if not m:
+        return None
+    return float(m.group('num').replace(',', '.')) * _UNITS[m.group('unit').upper()]
+
+
+def _ratio_pct(part: Any, whole: Any) -> Optional[float]:
+    part, whole = _size_bytes(part), _size_bytes(whole)
+    if part is None or not whole:
+        return None
+    return 100.0 * part / whole
+
+
+@metric('df', {
+    'disk_max_use_pct': ('fullest filesystem', '%', True),
+    'disk_root_use_pct': ('/ used', '%', True),
+    'disk_root_avail_bytes': ('/ available', 'bytes', False),
+})
+def _df_metrics(records):
+    out = {}
+    usage = [r['use_pct'] for r in records if isinstance(r.get('use_pct'), (int, float))]
+    if usage:
+        out['disk_max_use_pct'] = max(usage)
+    root = next((r for r in records if r.get('mounted_on') == '/'), None)
+    if root:
+        if isinstance(root.get('use_pct'), (int, float)):
+            out['disk_root_use_pct'] = root['use_pct']
+        # Only human-readable sizes (df -h) have a known unit
+        if isinstance(root.get('avail'), str) and not root['avail'].isdigit():
+            avail = _size_bytes(root['avail'])
+            if avail is not None:
+                out['disk_root_avail_bytes'] = avail
+    return out
+
+
+@metric('free', {
+    'mem_used_pct': ('memory used', '%', True),
+    'swap_used_pct': ('swap used', '%', True),
+})
+def _free_metrics(records):
+    out = {}
+    for record in records:
+        if record.get('kind') == 'mem':
+            # 'available' accounts for reclaimable cache; fall back to 'used' on old procps
+            if 'available' in record:
+                free_pct = _ratio_pct(record['available'], record.get('total'))
+                if free_pct is not None:
+                    out['mem_used_pct'] = 100.0 - free_pct
+            elif 'used' in record:
+                value = _ratio_pct(record['used'], record.get('total'))
+                if value is not None:
+                    out['mem_used_pct'] = value
+        elif record.get('kind') == 'swap':
+            value = _ratio_pct(record.get('used'), record.get('total'))
+            if value is not None:
+                out['swap_used_pct'] = value
+    return out
+
+
+@metric('uptime', {
+    'load_1': ('load average (1 min)', '', True),
+    'load_5': ('load average (5 min)', '', True),
+    'load_15': ('load average (15 min)', '', True),
+    'users': ('logged-in users', '', True),
+})
+def _uptime_metrics(records):
+    return {k: records[0][k] for k in ('load_1', 'load_5', 'load_15', 'users') if k in records[0]}
+
+
+@metric('ps', {
+    'process_count': ('processes', '', True),
+    'top_cpu_pct': ('busiest process CPU', '%', True),
+    'top_mem_pct': ('largest process memory', '%', True),
+})
+def _ps_metrics(records):
+    out = {'process_count': len(records)}
+    for key, name in (('cpu', 'top_cpu_pct'), ('mem', 'top_mem_pct')):
+        values = [r[key] for r in records if isinstance(r.get(key), (int, float))]
+        if values:
+            out[name] = max(values)
+    return out
+
+
+@metric('ss', {
+    'socket_count': ('sockets', '', True),
+    'listening_count': ('listening sockets', '', True),
+})
+def _ss_metrics(records):
+    return {
+        'socket_count': len(records),
+        'listening_count': sum(1 for r in records if r.get('state') in ('LISTEN', 'UNCONN')),
+    }
+
+
+@metric('systemctl_units', {
+    'unit_count': ('units', '', True),
+    'failed_unit_count': ('failed units', '', True),
+})
+def _units_metrics(records):
+    return {
+        'unit_count': len(records),
+        'failed_unit_count': sum(1 for r in records if r.get('active') == 'failed' or r.get('sub') == 'failed'),
+    }
+
+
+def _round(value) -> float:
+    return round(float(value), 3)
+
+
+def _fleet_matrix(command: str, results: Dict[str, Dict[str, Any]]) -> Optional[tuple]:
+    """
+    (parser, metric names, hosts, hosts without data, hosts x metrics array with NaN for
+    missing values); metrics no host reported are dropped. None when nothing can be extracted.
+    """
+    ensure_parsed(command, results)
+    parser = next(
+        (r['parsed']['parser'] for r in results.values() if isinstance(r, dict) and r.get('parsed')),
+        None,
+    )
+    extract = _EXTRACTORS.get(parser)
+    if extract is None:
+        return None
+
+    names = list(_METRICS[parser])
+    column = {name: i for i, name in enumerate(names)}
+    hosts: List[str] = []
+    without_data: List[str] = []
+    rows: List[List[float]] = []
+    for host, result in results.items():
+        parsed = result.get('parsed') if isinstance(result, dict) else None
+        values = extract(parsed['records']) if parsed and parsed['parser'] == parser else {}
+        if not values:
+            without_data.append(host)
+            continue
+        row = [np.nan] * len(names)
+        for name, value in values.items():
+            row[column[name]] = float(value)
+        hosts.append(host)
+        rows.append(row)
+    if not rows:
+        return None
+
+    data = np.array(rows, dtype=np.float64)
+    keep = (~np.isnan(data)).any(axis=0)
+    return parser, [n for n, k in zip(names, keep) if k], hosts, without_data, data[:, keep]
+
+
+def _modified_z(data: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """
+    Modified z-score (distance from the median in robust standard deviations) per value, 0
+    where missing. When more than half the hosts share one value the MAD is 0 and the mean
+    absolute deviation is used instead (Iglewicz & Hoaglin).
+    """
+    deviation = np.abs(data - np.nanmedian(data, axis=0))
+    mad = np.nanmedian(deviation, axis=0)
+    mean_ad = np.nanmean(deviation, axis=0)
+    scale = np.where(mad > 0, mad / 0.6745, mean_ad * 1.253314)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(scale > 0, deviation / scale, 0.0)
+    return np.where(present, z, 0.0)
+
+
+def host_deviation(command: str, results: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """
+    host -> largest modified z-score over its metrics, i.e. how far it sits from the rest of
+    the fleet. Empty when the command has no numeric extractor; hosts without data are left out.
+    """
+    matrix = _fleet_matrix(command, results)
+    if matrix is None:
+        return {}
+    _parser, _names, hosts, _without_data, data = matrix
+    z = _modified_z(data, ~np.isnan(data)).max(axis=1)
+    return {host: float(score) for host, score in zip(hosts, z)}
+
+
+def aggregate_fleet(command: str, results: Dict[str, Dict[str, Any]], top_n: int = 5) -> Optional[Dict[str, Any]]:
+    """
+    {'parser', 'hosts', 'hosts_with_data', 'hosts_without_data', 'metrics': {name: stats}}
+    where stats holds label, unit, count, min, max, mean, nearest-rank p50/p90/p99, worst
+    and outliers. 'worst' lists the top_n hosts at the bad end (highest values, or lowest for
+    metrics such as free space). None when the command has no numeric extractor or no host parsed.
+    """
+    matrix = _fleet_matrix(command, results)
+    if matrix is None:
+        return None
+    parser, names, hosts, without_data, data = matrix
+    present = ~np.isnan(data)
+    counts = present.sum(axis=0)
+    host_names = np.array(hosts, dtype=object)
+
+    minimum = np.nanmin(data, axis=0)
+    maximum = np.nanmax(data, axis=0)
+    mean = np.nanmean(data, axis=0)
+    # Nearest-rank, like stats.percentile, so fleet p90 / p99 agree with the rollups and router
+    pcts = np.nanpercentile(data, _PERCENTILES, axis=0, method='inverted_cdf')
+
+    # Worst N per metric (sign flipped where low is bad); missing values sort last
+    k = min(top_n, data.shape[0])
+    sign = np.array([1.0 if _METRICS[parser][n][2] else -1.0 for n in names])
+    ranked = np.where(present, data * sign, -np.inf)
+    top_idx = np.argpartition(-ranked, k - 1, axis=0)[:k]
+    top_idx = np.take_along_axis(top_idx, np.argsort(-np.take_along_axis(ranked, top_idx, axis=0), axis=0), axis=0)
+
+    z = _modified_z(data, present)
+
+    metrics = {}
+    for j, name in enumerate(names):
+        label, unit, _higher_is_worse = _METRICS[parser][name]
+        flagged = np.flatnonzero(z[:, j] > _OUTLIER_Z)
+        flagged = flagged[np.argsort(-z[flagged, j])][:top_n * 2]
+        metrics[name] = {
+            'label': label,
+            'unit': unit,
+            'count': int(counts[j]),
+            'min': _round(minimum[j]),
+            'max': _round(maximum[j]),
+            'mean': _round(mean[j]),
+            **{f"p{p}": _round(pcts[i, j]) for i, p in enumerate(_PERCENTILES)},
+            'worst': [
+                {'host': host_names[i], 'value': _round(data[i, j])}
+                for i in top_idx[:, j] if present[i, j]
+            ],
+            'outliers': [
+                {'host': host_names[i], 'value': _round(data[i, j]), 'z': round(float(z[i, j]), 1)}
+                for i in flagged
+            ],
+        }
+    return {
+        'parser': parser,
+        'hosts': len(results),
+        'hosts_with_data': len(hosts),
+        'hosts_without_data': without_data,
+        'metrics': metrics,
+    }
+
+
+def format_value(value: float, unit: str) -> str:
+    if unit == 'bytes':
+        for suffix in ('B', 'K', 'M', 'G', 'T', 'P'):
+            if abs(value) < 1024 or suffix == 'P':
+                return f"{value:.1f}{suffix}" if suffix != 'B' else f"{value:.0f}B"
+            value /= 1024
+    if unit == '%':
+        return f"{value:.1f}%"
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def format_fleet_summary(summary: Dict[str, Any], width: int = 72) -> List[str]:
+    """Report lines for aggregate_fleet() output: one stats line per metric plus worst hosts and outliers."""
+    lines = [
+        f"Parser: {summary['parser']}  |  Hosts with data: {summary['hosts_with_data']} of {summary['hosts']}",
+        "",
+    ]
+    for stats in summary['metrics'].values():
+        fmt = lambda v: format_value(v, stats['unit'])  # noqa: E731
+        lines.append(f"{stats['label']} ({stats['count']} host(s))")
+        lines.append(
+            f"  min {fmt(stats['min'])}  p50 {fmt(stats['p50'])}  p90 {fmt(stats['p90'])}  "
+            f"p99 {fmt(stats['p99'])}  max {fmt(stats['max'])}  mean {fmt(stats['mean'])}"
+        )
+        worst = ', '.join(f"{t['host']} {fmt(t['value'])}" for t in stats['worst'])
+        lines.append(f"  worst: {worst}"[:width * 2])
+        if stats['outliers']:
+            odd = ', '.join(f"{o['host']} {fmt(o['value'])}" for o in stats['outliers'])
+            lines.append(f"  outliers: {odd}"[:width * 2])
+        lines.append("")
+    return lines
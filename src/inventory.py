@@ -0,0 +1,107 @@
+"""
+Optional host inventory (SSH_INVENTORY_FILE): per-group and per-host SSH settings.
+
+The file is JSON:
+
+    {
+      "groups": {
+        "web": {
+          "hosts": ["10.0.1.*", "web-*.example.com"],
+          "username": "deploy",
+          "key_path": "~/.ssh/web_ed25519",
+          "key_passphrase_env": "WEB_KEY_PASSPHRASE"
+        },
+        "internal": {
+          "hosts": ["10.20.*"],
+          "username": "ops",
+          "jump_host": "deploy@bastion.example.com:22",
+          "transport": "wan"
+        }
+      },
+      "hosts": {
+        "10.0.2.5": {"username": "ops", "password": "..."}
+      }
+    }
+
+Group "hosts" entries are exact names or fnmatch patterns; the first matching group
+wins (in file order). Host entries override their group's settings. "jump_host" routes
+a host through a bastion (see src/jump_hosts.py); "transport" picks a transport profile
+(see src/transport_profiles.py).
+"""
+
+import json
+import os
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Optional, Tuple
+
+from .config import Config
+from .logger import setup_logger
+
+logger = setup_logger()
+
+
+def split_host_port(server, default_port=22):
+    """
+    Split a target like 'host', 'host:2222', '[::1]:2222' or a bare IPv6 address
+    into (hostname, port).
+    """
+    server = (server or '').strip()
+    if server.startswith('['):
+        host, _, rest = server[1:].partition(']')
+        if rest.startswith(':') and rest[1:].isdigit():
+            return host, int(rest[1:])
+        return host, default_port
+    if server.count(':') == 1:
+        host, port = server.split(':')
+        if port.isdigit():
+            return host, int(port)
+    return server, default_port
+
+
+class Inventory:
+    """Resolves the merged settings (group < host) for a target server."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = os.path.expanduser(path if path is not None else Config.SSH_INVENTORY_FILE)
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+        self._resolved: Dict[str, Tuple[Optional[str], Dict[str, Any]]] = {}
+        self.load()
+
+    def load(self):
+        groups, hosts = {}, {}
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f) or {}
+                groups = data.get('groups') or {}
+                hosts = data.get('hosts') or {}
+                logger.info("Loaded SSH inventory %s: %d group(s), %d host(s)", self.path, len(groups), len(hosts))
+            except Exception as e:
+                logger.error("Could not load SSH inventory %s: %s", self.path, e)
+        elif self.path and Config.SSH_INVENTORY_FILE:
+            logger.warning("SSH inventory file not found: %s", self.path)
+        self.groups, self.hosts, self._resolved = groups, hosts, {}
+
+    def group_for(self, server: str, hostname: Optional[str] = None) -> Optional[str]:
+        names = {server, hostname or server}
+        for group_name, group in self.groups.items():
+            for pattern in group.get('hosts') or []:
+                if any(name == pattern or fnmatchcase(name, pattern) for name in names):
+                    return group_name
+        return None
+
+    def resolve(self, server: str, hostname: Optional[str] = None) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Return (group name or None, merged settings) for server; memoized per server."""
+        cached = self._resolved.get(server)
+        if cached is not None:
+            return cached
+        group_name = self.group_for(server, hostname)
+        settings: Dict[str, Any] = {}
+        if group_name:
+            settings.update({k: v for k, v in self.groups[group_name].items() if k != 'hosts'})
+        host_entry = self.hosts.get(server) or self.hosts.get(hostname or server) or {}
+        settings.update(host_entry)
+        resolved = (group_name, settings)
+        self._resolved[server] = resolved
+        return resolved
@@ -0,0 +1,124 @@
+"""
+Jump-host (bastion) support.
+
+Hosts whose inventory group or host entry sets "jump_host" are reached through a
+direct-tcpip channel on one shared, authenticated transport per bastion. The outer
+handshake is paid once per bastion; every internal host then only costs a channel open
+plus its own SSH handshake inside that channel, and many channels can be open at once.
+
+"jump_host" is "host", "host:port" or "user@host:port". The bastion's credentials are
+resolved like any other server (SERVER_CREDENTIALS, inventory, defaults); a user in
+the jump_host string overrides the username. Chained bastions are not supported.
+
+A failed bastion connect is remembered for BASTION_FAILURE_SECONDS: the hosts behind it
+fail at once with that error instead of each waiting out its own connect timeout.
+"""
+
+import dataclasses
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import paramiko
+
+from .inventory import split_host_port
+from .logger import setup_logger
+
+logger = setup_logger()
+
+BASTION_FAILURE_SECONDS = 30.0
+
+
+def parse_jump_host(spec: str) -> Tuple[Optional[str], str]:
+    """'deploy@bastion:2222' -> ('deploy', 'bastion:2222'); the server part keeps its port."""
+    spec = (spec or '').strip()
+    user, sep, server = spec.rpartition('@')
+    if not sep:
+        return None, spec
+    return user or None, server
+
+
+class JumpHostPool:
+    """One live SSHClient per bastion, shared by every host behind it."""
+
+    def __init__(self, credentials, connect_timeout: float = 30, keepalive: int = 30):
+        self.credentials = credentials
+        self.connect_timeout = connect_timeout
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._clients: Dict[str, paramiko.SSHClient] = {}
+        self._connect_locks: Dict[str, threading.Lock] = {}
+        self._failures: Dict[str, Tuple[float, BaseException]] = {}
+
+    def _recent_failure(self, spec: str) -> Optional[BaseException]:
+        with self._lock:
+            failure = self._failures.get(spec)
+        if failure is None or time.monotonic() - failure[0] > BASTION_FAILURE_SECONDS:
+            return None
+        return failure[1]
+
+    def _transport(self, spec: str) -> paramiko.Transport:
+        """Authenticated transport to the bastion, (re)connecting it if needed."""
+        with self._lock:
+            client = self._clients.get(spec)
+            connect_lock = self._connect_locks.setdefault(spec, threading.Lock())
+        transport = client.get_transport() if client else None
+        if transport is not None and transport.is_active():
+            return transport
+        failure = self._recent_failure(spec)
+        if failure is not None:
+            raise failure
+
+        # Only one thread performs the outer handshake; the others wait and reuse it (or its error)
+        with connect_lock:
+            with self._lock:
+                client = self._clients.get(spec)
+            transport = client.get_transport() if client else None
+            if transport is not None and transport.is_active():
+                return transport
+            failure = self._recent_failure(spec)
+            if failure is not None:
+                raise failure
+            if client is not None:
+                client.close()
+
+            user, server = parse_jump_host(spec)
+            hostname, port = split_host_port(server)
+            credential = self.credentials.for_host(server, hostname)
+            if credential.error:
+                raise ValueError(credential.error)
+            if user:
+                credential = dataclasses.replace(credential, username=user)
+
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            connect_kwargs = {'hostname': hostname, 'port': port, 'timeout': self.connect_timeout}
+            connect_kwargs.update(credential.connect_kwargs())
+            try:
+                client.connect(**connect_kwargs)
+            except Exception as e:
+                client.close()
+                logger.warning("Jump host %s failed: %s; failing its hosts for %.0fs", server, e, BASTION_FAILURE_SECONDS)
+                with self._lock:
+                    self._failures[spec] = (time.monotonic(), e)
+                raise
+            transport = client.get_transport()
+            transport.set_keepalive(self.keepalive)
+            logger.info("Connected to jump host %s as %s", server, credential.username)
+            with self._lock:
+                self._clients[spec] = client
+                self._failures.pop(spec, None)
+            return transport
+
+    def open_channel(self, spec: str, hostname: str, port: int, timeout: Optional[float] = None) -> paramiko.Channel:
+        """direct-tcpip channel from the bastion to hostname:port, usable as a connect() sock."""
+        transport = self._transport(spec)
+        return transport.open_channel(
+            'direct-tcpip', (hostname, port), ('127.0.0.1', 0), timeout=timeout or self.connect_timeout
+        )
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
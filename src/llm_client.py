@@ -1,62 +1,162 @@
+import hashlib
 import json
 import re
+import threading
 import time
-import requests
+from .llm_router import LLMRouter
 from .logger import setup_logger
 from .config import Config
+from .context_compaction import compact_host_context
+from .report_compaction import compact_results, estimate_tokens
 
 logger = setup_logger()
 
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class _SingleFlight:
+    """Callers of do() with a key that is already in flight wait for that call instead of making their own."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn):
+        """(result, shared): fn()'s result dict, or a copy of the identical call's already running."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.result), True
+
+        try:
+            result = fn()
+            # Followers get their own copy; the leader's caller may modify the one it gets
+            flight.result = dict(result)
+            return result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.followers:
+                logger.info("LLM: %d identical request(s) shared one API call", flight.followers)
+
+
 class LLMClient:
     """Client for interacting with LLM API (OpenAI/LLaMA)"""
     
-    def __init__(self):
+    def __init__(self, bind_usage_recorder=None):
         self.api_key = Config.LLM_API_KEY
         self.api_base = Config.LLM_API_BASE_URL
         self.model = Config.LLM_MODEL
         self.api_type = Config.LLM_API_TYPE
+        self.single_flight = Config.LLM_SINGLE_FLIGHT
+        self._in_flight = _SingleFlight()
+        self.router = LLMRouter()
+        # Called in the caller's thread at the start of every generate / summarize call; returns the
+        # function that records its usage dicts (see _usage). That function may also run later on
+        # a router thread, for a hedged request that answered after another endpoint won.
+        self.bind_usage_recorder = bind_usage_recorder
+
+    def _send(self, kind, system_prompt, user_prompt, call):
+        """
+        call(system_prompt, user_prompt, on_late), unless the same prompt is already being sent to
+        the same model: then wait for that request and return its result. Usage is recorded either
+        way, and again for each late answer the router hands to on_late.
+        """
+        started = time.perf_counter()
+        recorder = self.bind_usage_recorder() if self.bind_usage_recorder is not None else None
+
+        def record(result, shared):
+            if recorder is None:
+                return
+            try:
+                recorder(self._usage(kind, result, shared, started, system_prompt, user_prompt))
+            except Exception as e:
+                logger.warning("Could not record LLM usage: %s", e)
+
+        def on_late(outcome):
+            # Same shape as the call's own result, so tokens are counted (or estimated) alike
+            record({
+                'success': True,
+                'command': outcome['content'],
+                'token_usage': outcome['usage'],
+                'model': outcome['model'],
+            }, False)
+
+        result, shared = None, False
+        try:
+            if not self.single_flight:
+                result = call(system_prompt, user_prompt, on_late)
+                return result
+            key = hashlib.sha256(
+                json.dumps([kind, self.api_base, self.model, system_prompt, user_prompt]).encode('utf-8')
+            ).hexdigest()
+            result, shared = self._in_flight.do(key, lambda: call(system_prompt, user_prompt, on_late))
+            return result
+        finally:
+            record(result, shared)
+
+    def _usage(self, kind, result, shared, started, system_prompt, user_prompt):
+        """
+        {'call_type', 'model', 'success', 'shared', 'estimated', 'prompt_tokens',
+        'completion_tokens', 'latency_ms'} for one call; tokens come from the API's usage
+        block, or are estimated from the text when a server does not report them.
+        """
+        result = result if result is not None else {}
+        reported = result.pop('token_usage', None) or {}
+        success = bool(result.get('success'))
+        prompt_tokens = reported.get('prompt_tokens')
+        completion_tokens = reported.get('completion_tokens')
+        estimated = success and prompt_tokens is None
+        if estimated:
+            prompt_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+            completion_tokens = estimate_tokens(result.get('command') or result.get('summary') or '')
+        return {
+            'call_type': kind,
+            # The endpoint that answered (a fallback model when the primary failed or was slower)
+            'model': result.get('model') or self.model,
+            'success': success,
+            'shared': shared,
+            'estimated': estimated,
+            'prompt_tokens': int(prompt_tokens or 0),
+            'completion_tokens': int(completion_tokens or 0),
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
     
     def _format_remote_host_context(self, host_context):
-        """Turn per-host probe (OS, running services, listeners) into text for the LLM."""
+        """
+        Turn per-host probe (OS, running services, listeners) into text for the LLM: hosts with
+        the same snapshot grouped, kept within LLM_HOST_CONTEXT_TOKEN_BUDGET.
+        """
         if not host_context:
             return None
-        blocks = []
-        for host in sorted(host_context.keys()):
-            info = host_context[host]
-            if info.get('error') and not info.get('uname_line') and not info.get('running_services'):
-                blocks.append(f"### {host}\n(could not connect or probe — {info['error']})")
-                continue
-            parts = [f"### {host}"]
-            if info.get('uname_line'):
-                parts.append(f"OS (uname -a): {info['uname_line']}")
-            elif info.get('error'):
-                parts.append(f"OS: unavailable ({info['error']})")
-            else:
-                parts.append("OS: unavailable")
-            if info.get('running_services'):
-                parts.append(
-                    "Running systemd service units (sample):\n"
-                    + info['running_services']
-                )
-            if info.get('listening_tcp'):
-                parts.append(
-                    "Listening TCP (ss -tlnp; like nmap listener view):\n"
-                    + info['listening_tcp']
-                )
-            if info.get('listening_udp'):
-                parts.append(
-                    "Listening UDP (ss -ulnp):\n"
-                    + info['listening_udp']
-                )
-            blocks.append("\n".join(parts))
-        if not blocks:
+        compacted = compact_host_context(host_context, token_budget=Config.LLM_HOST_CONTEXT_TOKEN_BUDGET)
+        if not compacted["text"]:
             return None
-        return (
-            "Remote host snapshot gathered over SSH before generating the command "
-            "(OS, running services, listening ports). Use this to pick correct tools, paths, "
-            "and flags; align suggestions with what is actually running when relevant.\n\n"
-            + "\n\n".join(blocks)
+        logger.debug(
+            "Host context prompt: %d host(s) in %d group(s), %d included, ~%d tokens",
+            compacted["hosts"], compacted["groups"], compacted["groups_included"], compacted["tokens"],
         )
+        return compacted["text"]
 
     def generate_command(
         self,
@@ -116,26 +216,21 @@ Now convert this request to a Bash command:"""
         
         try:
             if self.api_type == 'openai' or 'openai' in self.api_base.lower():
-                return self._call_openai_api(system_prompt, user_prompt)
+                call = self._call_openai_api
             else:
                 # Try OpenAI-compatible API
-                return self._call_openai_compatible_api(system_prompt, user_prompt)
+                call = self._call_openai_compatible_api
+            return self._send('generate', system_prompt, user_prompt, call)
         except Exception as e:
-            logger.error(f"Error calling LLM API: {str(e)}", exc_info=True)
+            logger.error("Error calling LLM API: %s", e, exc_info=True)
             return {
                 'success': False,
                 'error': f'API call failed: {str(e)}'
             }
     
-    def _call_openai_api(self, system_prompt, user_prompt):
-        """Call OpenAI API with retry logic"""
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
-        
+    def _call_openai_api(self, system_prompt, user_prompt, on_late=None):
+        """Call OpenAI API through the router (hedging, fallback endpoints, retries)"""
         payload = {
-            'model': self.model,
             'messages': [
                 {'role': 'system', 'content': system_prompt},
                 {'role': 'user', 'content': user_prompt}
@@ -143,52 +238,10 @@ Now convert this request to a Bash command:"""
             'temperature': 0.3,
             'max_tokens': 500
         }
+        answer = self.router.complete(payload, timeout=60, label='generate', on_late=on_late)
         
-        # Retry logic for network issues
-        max_retries = 3
-        retry_delay = 1  # seconds
-        
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    f'{self.api_base}/chat/completions',
-                    headers=headers,
-                    json=payload,
-                    timeout=60  # Increased timeout
-                )
-                break  # Success, exit retry loop
-            except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    logger.warning(f"LLM API timeout (attempt {attempt + 1}/{max_retries}), retrying...")
-                    time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-                    continue
-                else:
-                    logger.error("LLM API timeout after all retries")
-                    return {
-                        'success': False,
-                        'error': 'Request timeout: LLM API did not respond in time'
-                    }
-            except requests.exceptions.ConnectionError as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"LLM API connection error (attempt {attempt + 1}/{max_retries}): {str(e)}, retrying...")
-                    time.sleep(retry_delay * (attempt + 1))
-                    continue
-                else:
-                    logger.error(f"LLM API connection error after all retries: {str(e)}")
-                    return {
-                        'success': False,
-                        'error': f'Connection error: {str(e)}'
-                    }
-            except requests.exceptions.RequestException as e:
-                logger.error(f"LLM API request error: {str(e)}")
-                return {
-                    'success': False,
-                    'error': f'Request error: {str(e)}'
-                }
-        
-        if response.status_code == 200:
-            data = response.json()
-            command = data['choices'][0]['message']['content'].strip()
+        if answer['success']:
+            command = answer['content']
             
             # Clean up the command (remove markdown code blocks if present)
             command = command.replace('```bash', '').replace('```', '').strip()
@@ -207,25 +260,21 @@ Now convert this request to a Bash command:"""
             
             return {
                 'success': True,
-                'command': command
+                'command': command,
+                'token_usage': answer['usage'],
+                'model': answer['model'],
             }
         else:
-            error_text = response.text
-            try:
-                error_json = response.json()
-                error_text = error_json.get('error', {}).get('message', error_text)
-            except:
-                pass
-            logger.error(f"OpenAI API error: {response.status_code} - {error_text}")
             return {
                 'success': False,
-                'error': f'API returned status {response.status_code}: {error_text[:200]}'
+                'error': answer['error'],
+                'model': answer['model'],
             }
     
-    def _call_openai_compatible_api(self, system_prompt, user_prompt):
+    def _call_openai_compatible_api(self, system_prompt, user_prompt, on_late=None):
         """Call OpenAI-compatible API (for LLaMA servers)"""
         # Similar to OpenAI but may need adjustments
-        return self._call_openai_api(system_prompt, user_prompt)
+        return self._call_openai_api(system_prompt, user_prompt, on_late)
 
     def summarize_execution_report(
         self,
@@ -233,17 +282,30 @@ Now convert this request to a Bash command:"""
         command_run: str,
         report_text: str,
         max_report_chars: int = 14000,
+        results=None,
     ):
         """
         Ask the LLM to explain the formatted execution report in plain language
         for non-technical readers.
+
+        When the per-host results are passed, the prompt is built from a grouped,
+        token-budgeted compaction of them (LLM_SUMMARY_TOKEN_BUDGET) instead of the
+        report text cut at max_report_chars.
         """
         if not self.api_key:
             return {"success": False, "summary": "", "error": "LLM API key not configured"}
 
-        rt = (report_text or "").strip()
-        if len(rt) > max_report_chars:
-            rt = rt[: max_report_chars - 80] + "\n\n[… report shortened for the assistant …]"
+        if results:
+            compacted = compact_results(results, command=command_run, token_budget=Config.LLM_SUMMARY_TOKEN_BUDGET)
+            rt = compacted["text"]
+            logger.debug(
+                "Summary prompt: %d host(s) in %d group(s), %d included, ~%d tokens",
+                compacted["hosts"], compacted["groups"], compacted["groups_included"], compacted["tokens"],
+            )
+        else:
+            rt = (report_text or "").strip()
+            if len(rt) > max_report_chars:
+                rt = rt[: max_report_chars - 80] + "\n\n[… report shortened for the assistant …]"
 
         system_prompt = """You are a clear, friendly assistant helping someone who is NOT a Linux or IT expert.
 
@@ -274,20 +336,13 @@ Command that ran on the remote machine(s):
 Write the explanation now, in plain language."""
 
         try:
-            if self.api_type == "openai" or "openai" in self.api_base.lower():
-                return self._summarize_openai(system_prompt, user_prompt)
-            return self._summarize_openai(system_prompt, user_prompt)
+            return self._send("summarize", system_prompt, user_prompt, self._summarize_openai)
         except Exception as e:
-            logger.error(f"LLM summarize_execution_report: {str(e)}", exc_info=True)
+            logger.error("LLM summarize_execution_report: %s", e, exc_info=True)
             return {"success": False, "summary": "", "error": str(e)}
 
-    def _summarize_openai(self, system_prompt: str, user_prompt: str):
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+    def _summarize_openai(self, system_prompt: str, user_prompt: str, on_late=None):
         payload = {
-            "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
@@ -295,23 +350,16 @@ Write the explanation now, in plain language."""
             "temperature": 0.35,
             "max_tokens": 1000,
         }
-        response = requests.post(
-            f"{self.api_base}/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=90,
-        )
-        if response.status_code != 200:
-            err = response.text[:400]
-            try:
-                err = response.json().get("error", {}).get("message", err)
-            except Exception:
-                pass
-            logger.error(f"summarize_execution_report API error: {response.status_code} {err}")
-            return {"success": False, "summary": "", "error": f"API error: {err}"}
-
-        data = response.json()
-        text = data["choices"][0]["message"]["content"].strip()
-        text = text.replace("```markdown", "").replace("```", "").strip()
-        return {"success": True, "summary": text, "error": ""}
+        answer = self.router.complete(payload, timeout=90, label="summarize", on_late=on_late)
+        if not answer["success"]:
+            logger.error("summarize_execution_report API error: %s", answer["error"])
+            return {"success": False, "summary": "", "error": answer["error"], "model": answer["model"]}
 
+        text = answer["content"].replace("```markdown", "").replace("```", "").strip()
+        return {
+            "success": True,
+            "summary": text,
+            "error": "",
+            "token_usage": answer["usage"],
+            "model": answer["model"],
+        }
@@ -0,0 +1,297 @@
+"""
+Route chat completions across several OpenAI-compatible endpoints.
+
+The primary endpoint is LLM_API_BASE_URL / LLM_MODEL / LLM_API_KEY; LLM_FALLBACK_ENDPOINTS
+adds more as JSON: [{"base_url": "...", "model": "...", "api_key": "..."}] (api_key defaults
+to LLM_API_KEY, base_url to the primary's).
+
+Each endpoint keeps its recent latencies (per call type) and an error rate. Requests go to
+the fastest healthy endpoint; one that failed several times in a row is skipped for a while.
+When an answer takes longer than LLM_HEDGE_PERCENTILE of that endpoint's recent latencies,
+the same request is also sent to the next endpoint (a hedge) and whichever answers first
+wins; the other request still runs to the end and is billed, so its answer is handed to the
+caller's on_late callback for usage accounting. Hedging needs a second endpoint: re-sending to
+the one that is already slow would only add to its load. Failures fall back to the next
+endpoint, up to LLM_MAX_ATTEMPTS requests in total; with a single endpoint, timeouts,
+connection errors, 429 and 5xx are retried on it.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from .config import Config
+from .logger import setup_logger
+from .stats import percentile
+
+logger = setup_logger()
+
+_LATENCY_WINDOW = 50
+# Hedging needs this many recent answers from the endpoint to know what "slow" is
+_MIN_HEDGE_SAMPLES = 5
+_ERROR_ALPHA = 0.2
+_COOLDOWN_AFTER_FAILURES = 3
+_COOLDOWN_SECONDS = 30.0
+_POOL_THREADS = 32
+
+
+class LLMEndpoint:
+    """One base URL + model, with its recent latencies and error rate."""
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: str):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.api_key = api_key
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record(self, label: str, success: bool, latency_ms: float):
+        with self._lock:
+            self.error_rate += _ERROR_ALPHA * ((0.0 if success else 1.0) - self.error_rate)
+            if success:
+                self._latencies.setdefault(label, deque(maxlen=_LATENCY_WINDOW)).append(latency_ms)
+                self.consecutive_failures = 0
+                self.cooldown_until = 0.0
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= _COOLDOWN_AFTER_FAILURES:
+                    self.cooldown_until = time.monotonic() + _COOLDOWN_SECONDS
+
+    def latency_percentile(self, label: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latencies.get(label, ()))
+        return percentile(samples, pct) if len(samples) >= min_samples else None
+
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def score(self, label: str) -> float:
+        """Expected latency, inflated by the error rate; unmeasured endpoints rank last."""
+        p50 = self.latency_percentile(label, 50)
+        if p50 is None:
+            return float('inf')
+        return p50 * (1.0 + 4.0 * self.error_rate)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = sorted(self._latencies)
+        return {
+            'name': self.name,
+            'base_url': self.base_url,
+            'model': self.model,
+            'error_rate': round(self.error_rate, 3),
+            'consecutive_failures': self.consecutive_failures,
+            'cooling_down': self.cooling_down(),
+            'latency_ms': {
+                label: {
+                    'p50': round(self.latency_percentile(label, 50), 1),
+                    'p90': round(self.latency_percentile(label, 90), 1),
+                    'samples': len(self._latencies[label]),
+                }
+                for label in labels
+            },
+        }
+
+
+def configured_endpoints() -> List[LLMEndpoint]:
+    """The primary endpoint followed by LLM_FALLBACK_ENDPOINTS (malformed entries are logged and skipped)."""
+    endpoints = [LLMEndpoint('primary', Config.LLM_API_BASE_URL, Config.LLM_MODEL, Config.LLM_API_KEY)]
+    raw = (Config.LLM_FALLBACK_ENDPOINTS or '').strip()
+    if not raw:
+        return endpoints
+    try:
+        entries = json.loads(raw)
+        if not isinstance(entries, list):
+            raise ValueError('expected a JSON list')
+    except ValueError as e:
+        logger.warning("Ignoring LLM_FALLBACK_ENDPOINTS: %s", e)
+        return endpoints
+    for i, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict) or not entry.get('model'):
+            logger.warning("Ignoring LLM_FALLBACK_ENDPOINTS entry %d: needs at least a model", i)
+            continue
+        endpoints.append(LLMEndpoint(
+            entry.get('name') or f'fallback-{i}',
+            entry.get('base_url') or Config.LLM_API_BASE_URL,
+            entry['model'],
+            entry.get('api_key') or Config.LLM_API_KEY,
+        ))
+    return endpoints
+
+
+class LLMRouter:
+    """Sends a chat completion payload to the best endpoint, hedging slow answers and falling back on errors."""
+
+    def __init__(self, endpoints: Optional[List[LLMEndpoint]] = None):
+        self.endpoints = endpoints or configured_endpoints()
+        self.max_attempts = max(1, Config.LLM_MAX_ATTEMPTS)
+        self.hedge_enabled = Config.LLM_HEDGE_ENABLED
+        self.hedge_percentile = Config.LLM_HEDGE_PERCENTILE
+        self.hedge_min_ms = Config.LLM_HEDGE_MIN_MS
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        # Created on first use, so pre-forked workers each start their own threads
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=_POOL_THREADS, thread_name_prefix='llm')
+            return self._pool
+
+    def ranked(self, label: str) -> List[LLMEndpoint]:
+        """Healthy endpoints by expected latency (configured order until measured), cooling-down ones last."""
+        order = {id(ep): i for i, ep in enumerate(self.endpoints)}
+        return sorted(self.endpoints, key=lambda ep: (ep.cooling_down(), ep.score(label), order[id(ep)]))
+
+    def _hedge_delay(self, endpoint: LLMEndpoint, label: str) -> Optional[float]:
+        """Seconds after which a second request is sent, or None when there is nothing to go on."""
+        if not self.hedge_enabled or self.max_attempts < 2 or len(self.endpoints) < 2:
+            return None
+        threshold = endpoint.latency_percentile(label, self.hedge_percentile, _MIN_HEDGE_SAMPLES)
+        if threshold is None:
+            return None
+        return max(threshold, self.hedge_min_ms) / 1000.0
+
+    def complete(
+        self,
+        payload: Dict[str, Any],
+        timeout: float = 60,
+        label: str = 'chat',
+        on_late: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        POST payload (its 'model' is set per endpoint) to /chat/completions. Returns
+        {'success', 'content', 'usage', 'model', 'endpoint', 'attempts', 'hedged', 'error'}.
+        Requests still running when one succeeds are left to finish; on_late(outcome) is then
+        called from a pool thread for each of them that also succeeded.
+        """
+        order = self.ranked(label)
+        pending = {}
+        state = {'attempts': 0, 'hedged': False}
+
+        def launch(endpoint):
+            state['attempts'] += 1
+            pending[self._executor().submit(self._attempt, endpoint, payload, timeout, label)] = endpoint
+
+        launch(order[0])
+        hedge_delay = self._hedge_delay(order[0], label)
+        hedge_at = None if hedge_delay is None else time.monotonic() + hedge_delay
+        last_failure = None
+        while pending:
+            wait_for = None if hedge_at is None else max(0.0, hedge_at - time.monotonic())
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slower than this endpoint usually answers: race a second request against it
+                hedge_at = None
+                if state['attempts'] < self.max_attempts:
+                    endpoint = order[state['attempts'] % len(order)]
+                    logger.info(
+                        "LLM %s: no answer from %s after %.1fs, hedging on %s",
+                        label, order[0].name, hedge_delay, endpoint.name,
+                    )
+                    state['hedged'] = True
+                    launch(endpoint)
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                outcome = future.result()
+                if outcome['success']:
+                    for late in pending:
+                        late.add_done_callback(lambda f: self._late_answer(f.result(), label, on_late))
+                    outcome.update(attempts=state['attempts'], hedged=state['hedged'])
+                    return outcome
+                last_failure = outcome
+                if pending or state['attempts'] >= self.max_attempts:
+                    continue
+                if len(order) > 1:
+                    fallback = order[state['attempts'] % len(order)]
+                    logger.warning("LLM %s failed on %s (%s), trying %s", label, endpoint.name, outcome['error'], fallback.name)
+                    launch(fallback)
+                elif outcome['retryable']:
+                    logger.warning(
+                        "LLM %s failed (attempt %d/%d): %s, retrying...",
+                        label, state['attempts'], self.max_attempts, outcome['error'],
+                    )
+                    time.sleep(state['attempts'])
+                    launch(endpoint)
+        logger.error("LLM %s failed after %d attempt(s): %s", label, state['attempts'], last_failure['error'])
+        last_failure.update(attempts=state['attempts'], hedged=state['hedged'])
+        return last_failure
+
+    @staticmethod
+    def _late_answer(outcome: Dict[str, Any], label: str, on_late):
+        """A request that lost the race finished; its tokens are billed all the same."""
+        if not outcome['success'] or on_late is None:
+            return
+        logger.debug("LLM %s: late answer from %s after another endpoint won", label, outcome['endpoint'])
+        try:
+            on_late(outcome)
+        except Exception as e:
+            logger.warning("LLM %s: could not handle the late answer from %s: %s", label, outcome['endpoint'], e)
+
+    def _attempt(self, endpoint: LLMEndpoint, payload: Dict[str, Any], timeout: float, label: str) -> Dict[str, Any]:
+        """One request to endpoint; never raises."""
+        outcome = {
+            'success': False, 'content': '', 'usage': None, 'model': endpoint.model,
+            'endpoint': endpoint.name, 'error': '', 'retryable': False,
+        }
+        headers = {
+            'Authorization': f'Bearer {endpoint.api_key}',
+            'Content-Type': 'application/json',
+        }
+        started = time.perf_counter()
+        try:
+            response = requests.post(
+                f'{endpoint.base_url}/chat/completions',
+                headers=headers,
+                json=dict(payload, model=endpoint.model),
+                timeout=timeout,
+            )
+            if response.status_code == 200:
+                data = response.json()
+                outcome.update(
+                    success=True,
+                    content=data['choices'][0]['message']['content'].strip(),
+                    usage=data.get('usage'),
+                )
+            else:
+                error_text = response.text
+                try:
+                    error_text = response.json().get('error', {}).get('message', error_text)
+                except Exception:
+                    pass
+                logger.error("LLM API error from %s: %s - %s", endpoint.name, response.status_code, error_text)
+                outcome.update(
+                    error=f'API returned status {response.status_code}: {error_text[:200]}',
+                    retryable=response.status_code == 429 or response.status_code >= 500,
+                )
+        except requests.exceptions.Timeout:
+            outcome.update(error='Request timeout: LLM API did not respond in time', retryable=True)
+        except requests.exceptions.ConnectionError as e:
+            outcome.update(error=f'Connection error: {str(e)}', retryable=True)
+        except requests.exceptions.RequestException as e:
+            outcome.update(error=f'Request error: {str(e)}')
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            outcome.update(error=f'Malformed API response: {str(e)}')
+        endpoint.record(label, outcome['success'], (time.perf_counter() - started) * 1000)
+        return outcome
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'max_attempts': self.max_attempts,
+            'hedge': {
+                'enabled': self.hedge_enabled,
+                'percentile': self.hedge_percentile,
+                'min_ms': self.hedge_min_ms,
+            },
+            'endpoints': [ep.snapshot() for ep in self.endpoints],
+        }
@@ -0,0 +1,154 @@
+"""
+LLM usage and cost accounting.
+
+Every generate / summarize call is added to one LLMUsageHourly row per UTC hour, user,
+model and call type: calls, failures, calls answered by an identical in-flight request,
+prompt and completion tokens (as reported by the API, or estimated when it reports none)
+and latency. A hedged request that answered after another endpoint won is billed too, so it
+is added as a call of its own. Counters are incremented in SQL, so concurrent requests and app
+workers do not lose updates. usage_report() sums the rows for the API, with a cost estimate from
+LLM_PROMPT_PRICE_PER_1K / LLM_COMPLETION_PRICE_PER_1K.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from .config import Config
+from .models import db, LLMUsageHourly
+
+_SUMMED = (
+    'calls', 'failed_calls', 'shared_calls', 'estimated_calls',
+    'prompt_tokens', 'completion_tokens', 'latency_ms_total',
+)
+
+
+def _increments(usage: Dict[str, Any]) -> Dict[str, float]:
+    """Column increments for one usage dict from LLMClient."""
+    if usage.get('shared'):
+        # No API request was made for this caller; only count that it was served
+        return {'shared_calls': 1}
+    return {
+        'calls': 1,
+        'failed_calls': 0 if usage.get('success') else 1,
+        'estimated_calls': 1 if usage.get('estimated') else 0,
+        'prompt_tokens': int(usage.get('prompt_tokens') or 0),
+        'completion_tokens': int(usage.get('completion_tokens') or 0),
+        'latency_ms_total': float(usage.get('latency_ms') or 0.0),
+    }
+
+
+def record_llm_usage(username: str, usage: Dict[str, Any], now: Optional[datetime] = None) -> None:
+    """Add one call to its hourly row. Must run inside an app context."""
+    if not Config.LLM_USAGE_ENABLED or not usage:
+        return
+    now = now or datetime.utcnow()
+    key = {
+        'hour': now.replace(minute=0, second=0, microsecond=0),
+        'username': (username or '')[:80],
+        'model': (usage.get('model') or '')[:120],
+        'call_type': usage.get('call_type') or '',
+    }
+    increments = _increments(usage)
+    latency = 0.0 if usage.get('shared') else float(usage.get('latency_ms') or 0.0)
+    values = {getattr(LLMUsageHourly, name): getattr(LLMUsageHourly, name) + n for name, n in increments.items()}
+    values[LLMUsageHourly.latency_ms_max] = db.case(
+        (LLMUsageHourly.latency_ms_max < latency, latency), else_=LLMUsageHourly.latency_ms_max
+    )
+
+    for attempt in range(2):
+        try:
+            updated = LLMUsageHourly.query.filter_by(**key).update(values, synchronize_session=False)
+            if not updated:
+                row = LLMUsageHourly(**key, **{name: 0 for name in _SUMMED})
+                for name, n in increments.items():
+                    setattr(row, name, n)
+                row.latency_ms_max = latency
+                db.session.add(row)
+            db.session.commit()
+            return
+        except IntegrityError:
+            # Another request created the row first; add to it instead
+            db.session.rollback()
+            if attempt:
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def _cost(prompt_tokens: int, completion_tokens: int) -> float:
+    return round(
+        prompt_tokens / 1000.0 * Config.LLM_PROMPT_PRICE_PER_1K
+        + completion_tokens / 1000.0 * Config.LLM_COMPLETION_PRICE_PER_1K,
+        6,
+    )
+
+
+def _summary(row) -> Dict[str, Any]:
+    calls = int(row.calls or 0)
+    prompt_tokens = int(row.prompt_tokens or 0)
+    completion_tokens = int(row.completion_tokens or 0)
+    return {
+        'calls': calls,
+        'failed_calls': int(row.failed_calls or 0),
+        'shared_calls': int(row.shared_calls or 0),
+        'estimated_calls': int(row.estimated_calls or 0),
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'avg_prompt_tokens': round(prompt_tokens / calls) if calls else None,
+        'avg_latency_ms': round(float(row.latency_ms_total or 0) / calls, 1) if calls else None,
+        'max_latency_ms': round(float(row.latency_ms_max or 0), 1),
+        'cost': _cost(prompt_tokens, completion_tokens),
+    }
+
+
+def _grouped(query_filter, *columns) -> List[Dict[str, Any]]:
+    sums = [db.func.sum(getattr(LLMUsageHourly, name)).label(name) for name in _SUMMED]
+    rows = (
+        db.session.query(*columns, *sums, db.func.max(LLMUsageHourly.latency_ms_max).label('latency_ms_max'))
+        .filter(query_filter)
+        .group_by(*columns)
+        .order_by(*columns)
+        .all()
+    )
+    out = []
+    for row in rows:
+        entry = {column.key: getattr(row, column.key) for column in columns}
+        if isinstance(entry.get('hour'), datetime):
+            entry['hour'] = entry['hour'].isoformat() + 'Z'
+        entry.update(_summary(row))
+        out.append(entry)
+    return out
+
+
+def usage_report(hours: int = 24, username: Optional[str] = None, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Usage of the last `hours` hours (current hour included): totals, per user, per call
+    type and model, and one entry per hour and user. Must run inside an app context.
+    """
+    now = now or datetime.utcnow()
+    until = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    since = until - timedelta(hours=max(1, hours))
+    query_filter = (LLMUsageHourly.hour >= since) & (LLMUsageHourly.hour < until)
+    if username:
+        query_filter = query_filter & (LLMUsageHourly.username == username)
+
+    totals = _grouped(query_filter)
+    by_user = sorted(_grouped(query_filter, LLMUsageHourly.username), key=lambda e: -e['total_tokens'])
+    return {
+        'since': since.isoformat() + 'Z',
+        'until': until.isoformat() + 'Z',
+        'prices_per_1k': {
+            'prompt': Config.LLM_PROMPT_PRICE_PER_1K,
+            'completion': Config.LLM_COMPLETION_PRICE_PER_1K,
+        },
+        # Without group columns the query returns one row (sums are NULL when nothing matched)
+        'totals': totals[0],
+        'by_user': by_user,
+        'by_call_type': _grouped(query_filter, LLMUsageHourly.call_type, LLMUsageHourly.model),
+        'hourly': _grouped(query_filter, LLMUsageHourly.hour, LLMUsageHourly.username),
+    }
+
@@ -1,44 +1,246 @@
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime, timezone
 from .config import Config
 
-def setup_logger(name='ShellSentry', log_file='shellsentry.log'):
+# Request threads only enqueue records; one listener thread does all console/file I/O.
+_queue = queue.SimpleQueue()
+_queue_handlers = []
+_listener = None
+_listener_lock = threading.Lock()
+_log_file = None
+# True once forked children send their records to this process's listener
+_shared_with_children = False
+# True when several processes open LOG_FILE themselves and an external tool rotates it
+_rotate_externally = False
+
+
+def _current_request_id():
+    """Request id of the active Flask request, or '-' outside a request."""
+    try:
+        from flask import g, has_request_context
+    except ImportError:
+        return '-'
+    if has_request_context():
+        return getattr(g, 'request_id', None) or '-'
+    return '-'
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the request id while still on the request thread."""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = _current_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, suitable for log shippers."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'module': record.module,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _RequestQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps the traceback in exc_text instead of folding it into the
+    message, so the listener-side formatters (text or JSON) still see it separately.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    """Compress the rotated file so backups cost a fraction of the live log."""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _build_file_handler(log_file):
+    """
+    Size-based rotation by default; time-based when LOG_ROTATE_WHEN is set (e.g. 'midnight').
+    After rotate_externally() the file is only reopened once something else has moved it.
+    """
+    if _rotate_externally:
+        return logging.handlers.WatchedFileHandler(log_file, delay=True)
+    if Config.LOG_ROTATE_WHEN:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            log_file,
+            when=Config.LOG_ROTATE_WHEN,
+            backupCount=Config.LOG_BACKUP_COUNT,
+            utc=True,
+            delay=True,
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=Config.LOG_MAX_BYTES,
+            backupCount=Config.LOG_BACKUP_COUNT,
+            delay=True,
+        )
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+def _start_listener(log_file):
+    """Create the process-wide console/file handlers and the listener thread (once)."""
+    global _listener, _log_file
+    with _listener_lock:
+        if _listener is not None:
+            return
+        _log_file = log_file
+        text_formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
+        handlers = []
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(text_formatter)
+        handlers.append(console_handler)
+
+        try:
+            file_handler = _build_file_handler(log_file)
+            file_handler.setLevel(logging.DEBUG)
+            file_handler.setFormatter(JsonFormatter() if Config.LOG_FORMAT == 'json' else text_formatter)
+            handlers.append(file_handler)
+        except Exception as e:
+            record = logging.LogRecord(
+                'ShellSentry', logging.WARNING, __file__, 0, 'Could not create file handler: %s', (e,), None
+            )
+            record.request_id = '-'
+            console_handler.handle(record)
+
+        _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Drain queued records and stop the listener thread (called at interpreter exit)."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _reinit_after_fork():
+    """
+    A forked child inherits the queue but not the listener thread; give it a fresh
+    queue and listener so records from worker processes are not silently dropped.
+    """
+    global _queue, _listener, _listener_lock
+    _listener_lock = threading.Lock()
+    if _listener is None:
+        return
+    _listener = None
+    if _shared_with_children:
+        # Keep the inherited multiprocessing queue; the parent writes the records
+        return
+    _queue = queue.SimpleQueue()
+    for handler in _queue_handlers:
+        handler.queue = _queue
+    _start_listener(_log_file)
+
+
+def share_with_forked_children():
+    """
+    Pre-fork servers: switch to a multiprocessing queue so that children forked after this
+    call hand their records to this process's listener. A single process then owns the log
+    file, so size-based rotation cannot race between workers.
+    """
+    global _queue, _listener, _shared_with_children
+    with _listener_lock:
+        if _listener is None or _shared_with_children:
+            return
+        handlers = _listener.handlers
+        _listener.stop()
+        _queue = multiprocessing.Queue(-1)
+        for handler in _queue_handlers:
+            handler.queue = _queue
+        _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _shared_with_children = True
+
+
+def rotate_externally():
+    """
+    Pre-fork servers without preload: every worker opens LOG_FILE itself, and rotating it
+    from several processes would race. Leave rotation to logrotate (or similar) and reopen
+    the file when it has been moved. Must be called before the first setup_logger().
+    """
+    global _rotate_externally
+    _rotate_externally = True
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+
+
+def setup_logger(name='ShellSentry', log_file=None):
     """
     Set up application logger
-    
+
     Args:
         name: Logger name
-        log_file: Log file path
-        
+        log_file: Log file path (default: LOG_FILE)
+
     Returns:
         logging.Logger: Configured logger
     """
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, Config.LOG_LEVEL, logging.INFO))
-    
+
     # Prevent duplicate handlers
     if logger.handlers:
         return logger
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # File handler
-    try:
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-    except Exception as e:
-        logger.warning(f"Could not create file handler: {str(e)}")
-    
-    return logger
 
+    _start_listener(log_file or Config.LOG_FILE)
+
+    queue_handler = _RequestQueueHandler(_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    _queue_handlers.append(queue_handler)
+    logger.addHandler(queue_handler)
+
+    return logger
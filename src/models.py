@@ -35,10 +35,53 @@ class ExecutionLog(db.Model):
     target_servers = db.Column(db.Text, nullable=False)  # JSON string
     execution_status = db.Column(db.String(20), nullable=False)  # success, failed, partial
     execution_results = db.Column(db.Text)  # JSON string
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     user = db.relationship('User', backref=db.backref('executions', lazy=True))
     
     def __repr__(self):
         return f'<ExecutionLog {self.id} by {self.username}>'
 
+
+class ExecutionRollup(db.Model):
+    """Daily aggregate of archived executions (one row per day, user, host and host status)"""
+    __table_args__ = (
+        db.UniqueConstraint('day', 'username', 'server', 'status', name='uq_rollup_day_user_server_status'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    username = db.Column(db.String(80), nullable=False)
+    server = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False)  # per-host: success, failed
+    executions = db.Column(db.Integer, nullable=False, default=0)
+    latency_p50_ms = db.Column(db.Float)
+    latency_p95_ms = db.Column(db.Float)
+    latency_p99_ms = db.Column(db.Float)
+
+    def __repr__(self):
+        return f'<ExecutionRollup {self.day} {self.username}@{self.server} {self.status}={self.executions}>'
+
+
+class LLMUsageHourly(db.Model):
+    """LLM calls aggregated per hour, user, model and call type (generate, summarize)"""
+    __table_args__ = (
+        db.UniqueConstraint('hour', 'username', 'model', 'call_type', name='uq_llm_usage_hour_user_model_type'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    hour = db.Column(db.DateTime, nullable=False, index=True)  # UTC, truncated to the hour
+    username = db.Column(db.String(80), nullable=False)
+    model = db.Column(db.String(120), nullable=False)
+    call_type = db.Column(db.String(20), nullable=False)
+    calls = db.Column(db.Integer, nullable=False, default=0)  # requests sent to the API
+    failed_calls = db.Column(db.Integer, nullable=False, default=0)
+    shared_calls = db.Column(db.Integer, nullable=False, default=0)  # answered by an identical in-flight call
+    estimated_calls = db.Column(db.Integer, nullable=False, default=0)  # API reported no usage; tokens estimated
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    latency_ms_total = db.Column(db.Float, nullable=False, default=0.0)
+    latency_ms_max = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<LLMUsageHourly {self.hour} {self.username} {self.call_type} calls={self.calls}>'
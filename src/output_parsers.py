@@ -0,0 +1,538 @@
+"""
+Structured parsers for the output of common inspection commands.
+
+Each parser turns stdout of one command family (df, free, ss, ps, uptime, ip addr,
+systemctl list-units, lsblk) into a list of plain dict records. ensure_parsed() runs
+the matching parser once per host and caches {'parser', 'records', 'highlight'} on the
+result dict under 'parsed', so the summary, the report and API consumers all read
+records instead of re-scanning stdout.
+
+Parsers return None when the output does not look like what they expect (for example
+when a pipe through awk reshaped it); 'parsed' is then None.
+"""
+
+import re
+import shlex
+from typing import Any, Callable, Dict, List, Optional
+
+Records = List[Dict[str, Any]]
+
+# name -> (matches(argv of the first pipeline stage), parse(stdout), highlight(records))
+_PARSERS: Dict[str, tuple] = {}
+
+
+def register(name: str, matches: Callable[[List[str]], bool], highlight: Optional[Callable[[Records], str]] = None):
+    """Decorator adding a parser to the registry (first registered match wins)."""
+    def decorator(func: Callable[[str], Optional[Records]]):
+        _PARSERS[name] = (matches, func, highlight)
+        return func
+    return decorator
+
+
+def _first_stage_argv(command: str) -> List[str]:
+    stage = re.split(r'\|\||&&|[|;\n]', command or '', maxsplit=1)[0].strip()
+    try:
+        argv = shlex.split(stage)
+    except ValueError:
+        argv = stage.split()
+    # Skip leading sudo / env assignments / absolute paths
+    while argv and (argv[0] == 'sudo' or '=' in argv[0]):
+        argv = argv[1:]
+    if argv:
+        argv[0] = argv[0].rsplit('/', 1)[-1]
+    return argv
+
+
+def parser_for(command: str) -> Optional[str]:
+    """Name of the registered parser for command, or None."""
+    argv = _first_stage_argv(command)
+    if not argv:
+        return None
+    for name, (matches, _parse, _highlight) in _PARSERS.items():
+        if matches(argv):
+            return name
+    return None
+
+
+def parse_output(command: str, stdout: str) -> Optional[Dict[str, Any]]:
+    """{'parser', 'records', 'highlight'} for stdout of command, or None when unsupported."""
+    name = parser_for(command)
+    if not name or not (stdout or '').strip():
+        return None
+    _matches, parse, highlight = _PARSERS[name]
+    try:
+        records = parse(stdout)
+    except Exception:
+        return None
+    if not records:
+        return None
+    return {
+        'parser': name,
+        'records': records,
+        'highlight': highlight(records) if highlight else '',
+    }
+
+
+def ensure_parsed(command: str, results: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse each successful host result once; the outcome is cached on the result as 'parsed'."""
+    for result in (results or {}).values():
+        if not isinstance(result, dict) or 'parsed' in result:
+            continue
+        parsed = parse_output(command, result.get('stdout') or '') if result.get('success') else None
+        result['parsed'] = parsed
+    return results
+
+
+def without_records(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of result whose 'parsed' keeps only parser and highlight (records can be as large as the output)."""
+    parsed = result.get('parsed')
+    if not parsed:
+        return result
+    return dict(result, parsed={'parser': parsed['parser'], 'highlight': parsed['highlight']})
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _lines(stdout: str) -> List[str]:
+    return [ln.rstrip() for ln in (stdout or '').splitlines() if ln.strip()]
+
+
+def _number(value: str) -> Any:
+    """'42' -> 42, '0.5' -> 0.5, '45%' -> 45; anything else is returned unchanged."""
+    v = value.rstrip('%')
+    try:
+        return int(v)
+    except ValueError:
+        try:
+            return float(v)
+        except ValueError:
+            return value
+
+
+def _split_host_port(address: str):
+    """'0.0.0.0:22' / '[::]:22' / '*:*' -> (address, port)."""
+    host, sep, port = address.rpartition(':')
+    if not sep:
+        return address, ''
+    return host.strip('[]'), port
+
+
+def _header_key(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+# ---------------------------------------------------------------------------
+# df
+# ---------------------------------------------------------------------------
+
+def _df_highlight(records: Records) -> str:
+    usage = [r for r in records if isinstance(r.get('use_pct'), int)]
+    if not usage:
+        return f"{len(records)} filesystem(s)"
+    fullest = max(usage, key=lambda r: r['use_pct'])
+    return (
+        f"{len(records)} filesystem(s); fullest {fullest.get('mounted_on') or fullest['filesystem']} "
+        f"at {fullest['use_pct']}% ({fullest.get('used', '?')} of {fullest.get('size', '?')} used)"
+    )
+
+
+@register('df', lambda argv: argv[0] == 'df', _df_highlight)
+def parse_df(stdout: str) -> Optional[Records]:
+    lines = _lines(stdout)
+    if not lines or not lines[0].lower().startswith('filesystem'):
+        return None
+    header = lines[0].lower()
+    has_type = ' type ' in f" {header} "
+    inodes = 'inodes' in header
+    records = []
+    pending = ''
+    for line in lines[1:]:
+        fields = (pending + ' ' + line).split() if pending else line.split()
+        # Long device names make df wrap the rest of the row onto the next line
+        if len(fields) == 1:
+            pending = fields[0]
+            continue
+        pending = ''
+        expected = 6 + (1 if has_type else 0)
+        if len(fields) < expected:
+            continue
+        fields = fields[:expected - 1] + [' '.join(fields[expected - 1:])]
+        record = {'filesystem': fields[0]}
+        rest = fields[1:]
+        if has_type:
+            record['type'] = rest.pop(0)
+        size, used, avail, pct, mount = rest
+        if inodes:
+            record.update({'inodes': _number(size), 'iused': _number(used), 'ifree': _number(avail)})
+        else:
+            record.update({'size': size, 'used': used, 'avail': avail})
+        record['use_pct'] = _number(pct) if pct != '-' else None
+        record['mounted_on'] = mount
+        records.append(record)
+    return records
+
+
+# ---------------------------------------------------------------------------
+# free
+# ---------------------------------------------------------------------------
+
+def _free_highlight(records: Records) -> str:
+    mem = next((r for r in records if r['kind'] == 'mem'), None)
+    if not mem:
+        return ''
+    text = f"memory {mem.get('used', '?')} used of {mem.get('total', '?')}"
+    if 'available' in mem:
+        text += f", {mem['available']} available"
+    swap = next((r for r in records if r['kind'] == 'swap'), None)
+    if swap:
+        text += f"; swap {swap.get('used', '?')} of {swap.get('total', '?')}"
+    return text
+
+
+@register('free', lambda argv: argv[0] == 'free', _free_highlight)
+def parse_free(stdout: str) -> Optional[Records]:
+    lines = _lines(stdout)
+    if not lines or 'total' not in lines[0]:
+        return None
+    columns = [_header_key(c) for c in lines[0].split()]
+    records = []
+    for line in lines[1:]:
+        label, _, values = line.partition(':')
+        if not values:
+            continue
+        record = {'kind': _header_key(label)}
+        for column, value in zip(columns, values.split()):
+            record[column] = _number(value)
+        records.append(record)
+    return records
+
+
+# ---------------------------------------------------------------------------
+# ss
+# ---------------------------------------------------------------------------
+
+def _ss_highlight(records: Records) -> str:
+    listening = sorted({
+        r['local_port'] for r in records
+        if r.get('state') in ('LISTEN', 'UNCONN') and str(r.get('local_port', '')).isdigit()
+    }, key=int)
+    text = f"{len(records)} socket(s)"
+    if listening:
+        shown = ', '.join(listening[:12]) + (' …' if len(listening) > 12 else '')
+        text += f"; listening ports {shown}"
+    return text
+
+
+@register('ss', lambda argv: argv[0] in ('ss', 'netstat'), _ss_highlight)
+def parse_ss(stdout: str) -> Optional[Records]:
+    lines = _lines(stdout)
+    if not lines:
+        return None
+    header = lines[0]
+    if header.startswith('Netid') or header.startswith('State'):
+        has_netid = header.startswith('Netid')
+        records = []
+        for line in lines[1:]:
+            fields = line.split(None, 6 if has_netid else 5)
+            if has_netid:
+                if len(fields) < 6:
+                    continue
+                netid, state, recv_q, send_q, local, peer = fields[:6]
+                process = fields[6] if len(fields) > 6 else ''
+            else:
+                if len(fields) < 5:
+                    continue
+                netid = ''
+                state, recv_q, send_q, local, peer = fields[:5]
+                process = fields[5] if len(fields) > 5 else ''
+            local_address, local_port = _split_host_port(local)
+            peer_address, peer_port = _split_host_port(peer)
+            records.append({
+                'netid': netid, 'state': state, 'recv_q': _number(recv_q), 'send_q': _number(send_q),
+                'local_address': local_address, 'local_port': local_port,
+                'peer_address': peer_address, 'peer_port': peer_port, 'process': process,
+            })
+        return records
+    # netstat -tulnp style: skip the "Active Internet connections" banner
+    if header.startswith('Active'):
+        lines = lines[1:]
+    if not lines or not lines[0].startswith('Proto'):
+        return None
+    records = []
+    for line in lines[1:]:
+        fields = line.split()
+        if len(fields) < 5 or not fields[0].startswith(('tcp', 'udp')):
+            continue
+        proto, recv_q, send_q, local, peer = fields[:5]
+        rest = fields[5:]
+        state = rest.pop(0) if rest and not ('/' in rest[0] or rest[0] == '-') else ('UNCONN' if proto.startswith('udp') else '')
+        local_address, local_port = _split_host_port(local)
+        peer_address, peer_port = _split_host_port(peer)
+        records.append({
+            'netid': proto, 'state': state, 'recv_q': _number(recv_q), 'send_q': _number(send_q),
+            'local_address': local_address, 'local_port': local_port,
+            'peer_address': peer_address, 'peer_port': peer_port, 'process': ' '.join(rest),
+        })
+    return records
+
+
+# ---------------------------------------------------------------------------
+# ps
+# ---------------------------------------------------------------------------
+
+def _ps_highlight(records: Records) -> str:
+    text = f"{len(records)} process(es)"
+    for key, label in (('cpu', 'CPU'), ('mem', 'memory')):
+        values = [r for r in records if isinstance(r.get(key), (int, float))]
+        if values:
+            top = max(values, key=lambda r: r[key])
+            name = (top.get('command') or top.get('cmd') or '?').split()[0]
+            text += f"; top {label}: {name} ({top[key]}%)"
+    return text
+
+
+@register('ps', lambda argv: argv[0] == 'ps', _ps_highlight)
+def parse_ps(stdout: str) -> Optional[Records]:
+    lines = _lines(stdout)
+    if not lines or 'PID' not in lines[0].split():
+        return None
+    columns = [_header_key(c) for c in lines[0].split()]
+    records = []
+    for line in lines[1:]:
+        # The last column (COMMAND / CMD) keeps its spaces
+        fields = line.split(None, len(columns) - 1)
+        if len(fields) < len(columns) - 1:
+            continue
+        record = {}
+        for column, value in zip(columns, fields):
+            record[column] = _number(value) if column in ('pid', 'ppid', 'cpu', 'mem', 'vsz', 'rss', 'c') else value
+        records.append(record)
+    return records
+
+
+# ---------------------------------------------------------------------------
+# uptime
+# ---------------------------------------------------------------------------
+
+_UPTIME = re.compile(
+    r'(?P<time>\d{1,2}:\d{2}(?::\d{2})?)\s+up\s+(?P<up>.+?),\s+(?P<users>\d+)\s+users?,\s+'
+    r'load averages?:\s*(?P<l1>[\d.]+),?\s+(?P<l5>[\d.]+),?\s+(?P<l15>[\d.]+)'
+)
+
+
+def _uptime_highlight(records: Records) -> str:
+    r = records[0]
+    text = f"up {r['up']}"
+    if 'load_1' in r:
+        text += f", load {r['load_1']} / {r['load_5']} / {r['load_15']}"
+    return text
+
+
+@register('uptime', lambda argv: argv[0] == 'uptime', _uptime_highlight)
+def parse_uptime(stdout: str) -> Optional[Records]:
+    lines = _lines(stdout)
+    if not lines:
+        return None
+    line = lines[0].strip()
+    m = _UPTIME.search(line)
+    if m:
+        return [{
+            'time': m.group('time'),
+            'up': re.sub(r'\s+', ' ', m.group('up')),
+            'users': int(m.group('users')),
+            'load_1': float(m.group('l1')),
+            'load_5': float(m.group('l5')),
+            'load_15': float(m.group('l15')),
+        }]
+    if line.startswith('up '):  # uptime -p
+        return [{'up': line[3:]}]
+    return None
+
+
+# ---------------------------------------------------------------------------
+# ip addr
+# ---------------------------------------------------------------------------
+
+_IP_LINK = re.compile(r'^(?P<index>\d+):\s+(?P<name>[^:@\s]+)(?:@\S+)?:\s+<(?P<flags>[^>]*)>(?P<rest>.*)$')
+
+
+def _ip_highlight(records: Records) -> str:
+    parts = []
+    for r in records:
+        if r['name'] == 'lo':
+            continue
+        addrs = ', '.join(a.split('/')[0] for a in r.get('ipv4', [])) or 'no IPv4'
+        parts.append(f"{r['name']} {r.get('state', '?')} {addrs}")
+    return '; '.join(parts[:6]) + (' …' if len(parts) > 6 else '')
+
+
+def _is_ip_addr(argv: List[str]) -> bool:
+    if argv[0] == 'ip':
+        args = [a for a in argv[1:] if not a.startswith('-')]
+        return bool(args) and 'address'.startswith(args[0]) and args[0].startswith('a')
+    return False
+
+
+@register('ip_addr', _is_ip_addr, _ip_highlight)
+def parse_ip_addr(stdout: str) -> Optional[Records]:
+    lines = _lines(stdout)
+    if not lines:
+        return None
+    records: Records = []
+    if _IP_LINK.match(lines[0]):
+        current = None
+        for line in lines:
+            m = _IP_LINK.match(line)
+            if m:
+                rest = m.group('rest')
+                mtu = re.search(r'\bmtu (\d+)', rest)
+                state = re.search(r'\bstate (\S+)', rest)
+                current = {
+                    'index': int(m.group('index')),
+                    'name': m.group('name'),
+                    'flags': [f for f in m.group('flags').split(',') if f],
+                    'mtu': int(mtu.group(1)) if mtu else None,
+                    'state': state.group(1) if state else None,
+                    'mac': None,
+                    'ipv4': [],
+                    'ipv6': [],
+                }
+                records.append(current)
+                continue
+            if current is None:
+                continue
+            fields = line.split()
+            if fields[0].startswith('link/') and len(fields) > 1:
+                current['mac'] = fields[1]
+            elif fields[0] == 'inet' and len(fields) > 1:
+                current['ipv4'].append(fields[1])
+            elif fields[0] == 'inet6' and len(fields) > 1:
+                current['ipv6'].append(fields[1])
+        return records
+    # ip -br addr: "eth0  UP  10.0.0.5/24 fe80::1/64"
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 2:
+            return None
+        addrs = fields[2:]
+        records.append({
+            'name': fields[0].split('@')[0],
+            'state': fields[1],
+            'ipv4': [a for a in addrs if ':' not in a],
+            'ipv6': [a for a in addrs if ':' in a],
+        })
+    return records
+
+
+# ---------------------------------------------------------------------------
+# systemctl list-units
+# ---------------------------------------------------------------------------
+
+def _units_highlight(records: Records) -> str:
+    failed = [r['unit'] for r in records if r.get('active') == 'failed' or r.get('sub') == 'failed']
+    text = f"{len(records)} unit(s)"
+    if failed:
+        text += f"; failed: {', '.join(failed[:8])}" + (' …' if len(failed) > 8 else '')
+    return text
+
+
+@register(
+    'systemctl_units',
+    lambda argv: argv[0] == 'systemctl' and any(a in ('list-units', '--failed') for a in argv[1:]),
+    _units_highlight,
+)
+def parse_systemctl_units(stdout: str) -> Optional[Records]:
+    lines = (stdout or '').splitlines()
+    start = next((i for i, ln in enumerate(lines) if ln.strip().startswith('UNIT ')), None)
+    records = []
+    for line in lines[(start + 1) if start is not None else 0:]:
+        text = line.strip().lstrip('●*').strip()
+        # The table ends at the first blank line (the legend and counts follow)
+        if not text:
+            if records:
+                break
+            continue
+        fields = text.split(None, 4)
+        if len(fields) < 4 or '.' not in fields[0]:
+            if start is None:
+                return None
+            continue
+        records.append({
+            'unit': fields[0],
+            'load': fields[1],
+            'active': fields[2],
+            'sub': fields[3],
+            'description': fields[4] if len(fields) > 4 else '',
+        })
+    return records
+
+
+# ---------------------------------------------------------------------------
+# lsblk
+# ---------------------------------------------------------------------------
+
+_TREE_CHARS = '├└│─`|- '
+
+
+def _lsblk_highlight(records: Records) -> str:
+    mounted = [r for r in records if r.get('mountpoints')]
+    text = f"{len(records)} device(s), {len(mounted)} mounted"
+    if any('type' in r for r in records):
+        text = f"{sum(1 for r in records if r.get('type') == 'disk')} disk(s), " + text
+    return text
+
+
+def _assign_to_columns(line: str, columns: List[tuple], offset: int) -> Dict[str, str]:
+    """
+    Map tokens of a column-aligned row to header columns (start, end, key) by overlap with
+    the header word, so right-aligned numbers and empty cells land in the right column.
+    """
+    values: Dict[str, List[str]] = {}
+    for m in re.finditer(r'\S+', line[offset:]):
+        t_start, t_end = m.start() + offset, m.end() + offset
+
+        def distance(col):
+            c_start, c_end, _key = col
+            if t_start < c_end and c_start < t_end:
+                return 0
+            return c_start - t_end if t_end <= c_start else t_start - c_end
+        key = min(columns, key=distance)[2]
+        values.setdefault(key, []).append(m.group(0))
+    return {key: ' '.join(tokens) for key, tokens in values.items()}
+
+
+@register('lsblk', lambda argv: argv[0] == 'lsblk' and not any(a in ('-J', '--json') for a in argv), _lsblk_highlight)
+def parse_lsblk(stdout: str) -> Optional[Records]:
+    lines = (stdout or '').splitlines()
+    if not lines or not lines[0].startswith('NAME'):
+        return None
+    header_words = list(re.finditer(r'\S+', lines[0]))
+    if len(header_words) < 2:
+        return None
+    name_end = header_words[1].start()
+    columns = [(m.start(), m.end(), _header_key(m.group(0))) for m in header_words[1:]]
+    records: Records = []
+    parents: List[str] = []
+    for line in lines[1:]:
+        if not line.strip():
+            continue
+        raw_name = line[:name_end]
+        name = raw_name.strip().lstrip(_TREE_CHARS).strip()
+        # Each tree level is drawn two characters wide ("├─", "│ ")
+        depth = (len(raw_name) - len(raw_name.lstrip(_TREE_CHARS))) // 2
+        record: Dict[str, Any] = {'name': name}
+        record.update({key: '' for _s, _e, key in columns})
+        record.update(_assign_to_columns(line, columns, name_end))
+        mount_key = 'mountpoints' if 'mountpoints' in record else 'mountpoint'
+        if mount_key in record:
+            record['mountpoints'] = [mp for mp in record.pop(mount_key).split() if mp]
+        for flag in ('rm', 'ro'):
+            if flag in record:
+                record[flag] = record[flag] == '1'
+        parents = parents[:depth]
+        record['parent'] = parents[-1] if parents else None
+        parents.append(name)
+        records.append(record)
+    return records
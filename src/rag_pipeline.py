@@ -2,7 +2,7 @@ import os
 import threading
 from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from .logger import setup_logger
 
@@ -26,6 +26,31 @@ class KnowledgeEntry:
         )
 
 
+class FastPathStats:
+    """Per-process counts of how execute requests went through the knowledge-base fast path."""
+
+    OUTCOMES = ("bypassed", "disabled", "no_match", "low_score", "ambiguous", "rejected")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {outcome: 0 for outcome in self.OUTCOMES}
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = dict(self._counts)
+        requests = sum(counts.values())
+        return {
+            "requests": requests,
+            "bypassed": counts["bypassed"],
+            "bypass_rate": round(counts["bypassed"] / requests, 3) if requests else None,
+            "outcomes": counts,
+        }
+
+
 class RagPipeline:
     """
     Retrieval pipeline:
@@ -49,6 +74,8 @@ class RagPipeline:
         self._faiss = None
         self._index = None
 
+        self.fast_path_stats = FastPathStats()
+
         self.knowledge_base: List[KnowledgeEntry] = self._build_knowledge_base()
         self._entry_documents = [entry.to_document() for entry in self.knowledge_base]
         self._initialize_index()
@@ -91,7 +118,7 @@ class RagPipeline:
         except Exception as e:
             logger.error(
                 "RAG dependencies missing. Install sentence-transformers and faiss-cpu. Error: %s",
-                str(e),
+                e,
             )
             return
 
@@ -109,7 +136,7 @@ class RagPipeline:
             self._index = index
             logger.info("RAG index initialized with %d entries", len(self.knowledge_base))
         except Exception as e:
-            logger.error("Failed to initialize RAG index: %s", str(e), exc_info=True)
+            logger.error("Failed to initialize RAG index: %s", e, exc_info=True)
             self._index = None
 
     def _get_cached(self, query: str) -> Optional[List[Dict[str, str]]]:
@@ -171,9 +198,29 @@ class RagPipeline:
             self._set_cached(q, results)
             return results
         except Exception as e:
-            logger.error("RAG retrieve failed: %s", str(e), exc_info=True)
+            logger.error("RAG retrieve failed: %s", e, exc_info=True)
             return []
 
+    @staticmethod
+    def fast_path_match(
+        retrieved_entries: List[Dict[str, str]],
+        min_score: float,
+        min_margin: float,
+    ) -> Tuple[Optional[Dict[str, str]], str]:
+        """
+        Top retrieved entry if it is a confident enough match to run without the LLM:
+        (entry, "match"), or (None, "no_match" / "low_score" / "ambiguous"). A match needs a
+        score of at least min_score and a lead of min_margin over the runner-up.
+        """
+        if not retrieved_entries:
+            return None, "no_match"
+        top = float(retrieved_entries[0]["score"])
+        if top < min_score:
+            return None, "low_score"
+        if len(retrieved_entries) > 1 and top - float(retrieved_entries[1]["score"]) < min_margin:
+            return None, "ambiguous"
+        return retrieved_entries[0], "match"
+
     def format_for_prompt(self, retrieved_entries: List[Dict[str, str]]) -> str:
         """Render retrieval output as compact grounding context for LLM prompt."""
         if not retrieved_entries:
@@ -0,0 +1,97 @@
+"""
+Concurrent TCP reachability scan run before SSH handshakes.
+
+All targets are resolved in parallel, then one non-blocking connect per target is
+started and the sockets are awaited together with a selector, so a scan of N hosts
+takes about one timeout at most instead of N connect timeouts.
+"""
+
+import errno
+import os
+import selectors
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, errno.EAGAIN}
+_UNREACHABLE = {errno.EHOSTUNREACH, errno.ENETUNREACH, errno.EHOSTDOWN, errno.ENETDOWN}
+
+# (category, detail) for a closed/unreachable target; None when the port accepted the connect
+ScanResult = Optional[Tuple[str, str]]
+
+
+def _resolve(host: str, port: int):
+    return socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+
+
+def _failure(code: int) -> Tuple[str, str]:
+    category = 'unreachable' if code in _UNREACHABLE else 'refused'
+    return category, os.strerror(code)
+
+
+def scan_tcp(targets: Dict[str, Tuple[str, int]], timeout: float = 2.0) -> Dict[str, ScanResult]:
+    """
+    Check which targets accept a TCP connection within timeout seconds.
+
+    Args:
+        targets: {key: (hostname, port)}
+
+    Returns:
+        dict: {key: None if reachable, else (category, detail)} where category is one of
+        'dns', 'refused', 'unreachable' or 'timeout'. Targets whose name lookup did not
+        finish in time are left out (undecided).
+    """
+    results: Dict[str, ScanResult] = {}
+    if not targets:
+        return results
+    deadline = time.monotonic() + timeout
+
+    # getaddrinfo blocks, so names are resolved on a small pool; slow lookups are not waited for
+    addresses = {}
+    pool = ThreadPoolExecutor(max_workers=min(32, len(targets)), thread_name_prefix='prescan-dns')
+    try:
+        futures = {key: pool.submit(_resolve, host, port) for key, (host, port) in targets.items()}
+        for key, future in futures.items():
+            try:
+                addresses[key] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except socket.gaierror as e:
+                results[key] = ('dns', str(e))
+            except Exception:
+                # Lookup still running: leave the target undecided rather than guess
+                continue
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    selector = selectors.DefaultSelector()
+    try:
+        for key, (family, socktype, proto, _canon, sockaddr) in addresses.items():
+            sock = socket.socket(family, socktype, proto)
+            sock.setblocking(False)
+            code = sock.connect_ex(sockaddr)
+            if code == 0:
+                results[key] = None
+                sock.close()
+            elif code in _IN_PROGRESS:
+                selector.register(sock, selectors.EVENT_WRITE, key)
+            else:
+                results[key] = _failure(code)
+                sock.close()
+
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for selector_key, _events in selector.select(remaining):
+                sock = selector_key.fileobj
+                code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                results[selector_key.data] = None if code == 0 else _failure(code)
+                selector.unregister(sock)
+                sock.close()
+
+        for selector_key in list(selector.get_map().values()):
+            results[selector_key.data] = ('timeout', f'no answer within {timeout:g}s')
+            selector_key.fileobj.close()
+    finally:
+        selector.close()
+    return results
@@ -0,0 +1,146 @@
+"""
+Compact execution results into a prompt that fits a token budget.
+
+Instead of cutting the full per-host report at a fixed length (which only shows the LLM
+the first hosts), hosts with identical output are grouped, failures are always kept,
+hosts that differ from the majority (outliers) come next, most unusual first by their
+parsed metrics, and every group gets a sample of its output. Samples shrink, then whole
+groups are summarized in one line, until the text fits the budget, so prompt size stays flat as the fleet grows.
+"""
+
+import math
+from typing import Any, Dict, List
+
+from .fleet_aggregation import host_deviation
+from .output_parsers import ensure_parsed
+from .result_groups import group_results
+
+_MAX_HOST_NAMES = 8
+_MAX_LINE_CHARS = 200
+_FULL_SAMPLE_LINES = 20
+_SHORT_SAMPLE_LINES = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text and shell output)."""
+    return math.ceil(len(text or '') / 4)
+
+
+def _host_list(hosts: List[str]) -> str:
+    shown = ', '.join(hosts[:_MAX_HOST_NAMES])
+    if len(hosts) > _MAX_HOST_NAMES:
+        shown += f" (+{len(hosts) - _MAX_HOST_NAMES} more)"
+    return shown
+
+
+def _head(text: str, max_lines: int) -> List[str]:
+    lines = (text or '').strip().splitlines()
+    out = [ln if len(ln) <= _MAX_LINE_CHARS else ln[:_MAX_LINE_CHARS - 1] + '…' for ln in lines[:max_lines]]
+    if len(lines) > max_lines:
+        out.append(f"… ({len(lines) - max_lines} more line(s))")
+    return out
+
+
+def _group_block(index: int, group: Dict[str, Any], label: str, sample_lines: int) -> str:
+    r = group['result']
+    status = 'SUCCESS' if r.get('success') else 'FAILED'
+    lines = [f"[{index}] {label}: {len(group['hosts'])} host(s) — {status} (exit {r.get('exit_code')})"]
+    lines.append(f"  hosts: {_host_list(group['hosts'])}")
+    if r.get('error'):
+        lines.append(f"  error: {str(r['error'])[:_MAX_LINE_CHARS]}")
+    parsed = r.get('parsed')
+    if parsed and parsed.get('highlight'):
+        lines.append(f"  parsed ({parsed['parser']}): {parsed['highlight']}")
+    if sample_lines:
+        out = _head(r.get('stdout'), sample_lines)
+        if out:
+            lines.append("  stdout:")
+            lines.extend(f"    {ln}" for ln in out)
+        if not r.get('success'):
+            err = _head(r.get('stderr'), min(sample_lines, 8))
+            if err:
+                lines.append("  stderr:")
+                lines.extend(f"    {ln}" for ln in err)
+    return "\n".join(lines)
+
+
+def _prioritized(groups: List[Dict[str, Any]], host_count: int, deviation: Dict[str, float]) -> List[tuple]:
+    """
+    (label, group) in the order they should get budget: failures, majority, outliers, rest.
+    Outliers and other outputs are ranked by how far their hosts' parsed metrics sit from
+    the fleet (deviation), then by whether they wrote to stderr, then by size.
+    """
+    def unusual(g):
+        return (
+            -max((deviation.get(h, 0.0) for h in g['hosts']), default=0.0),
+            not (g['result'].get('stderr') or '').strip(),
+            -len(g['hosts']),
+        )
+
+    failed = sorted((g for g in groups if not g['result'].get('success')), key=lambda g: -len(g['hosts']))
+    ok = sorted((g for g in groups if g['result'].get('success')), key=lambda g: -len(g['hosts']))
+    ordered = [('failure', g) for g in failed]
+    if ok:
+        ordered.append(('most common output' if len(ok) > 1 else 'output', ok[0]))
+        outlier_size = max(1, host_count // 20)
+        rest = sorted(ok[1:], key=unusual)
+        ordered.extend(('outlier', g) for g in rest if len(g['hosts']) <= outlier_size)
+        ordered.extend(('other output', g) for g in rest if len(g['hosts']) > outlier_size)
+    return ordered
+
+
+def compact_results(
+    results: Dict[str, Dict[str, Any]],
+    command: str = '',
+    token_budget: int = 3000,
+) -> Dict[str, Any]:
+    """
+    Returns {'text', 'tokens', 'groups', 'groups_included', 'hosts'} where text is a
+    grouped description of results estimated to fit in token_budget tokens.
+    """
+    ensure_parsed(command, results)
+    groups = group_results(results)
+    host_count = sum(len(g['hosts']) for g in groups)
+    ok_count = sum(len(g['hosts']) for g in groups if g['result'].get('success'))
+
+    header = (
+        f"Hosts: {host_count} | Succeeded: {ok_count} | Failed: {host_count - ok_count} | "
+        f"Distinct results: {len(groups)}\n"
+        "Hosts that returned identical output are grouped; each group shows a sample of its output."
+    )
+    blocks = [header]
+    used = estimate_tokens(header)
+    ordered = _prioritized(groups, host_count, host_deviation(command, results))
+    # Keep room for the line that names what had to be left out
+    reserve = 60
+
+    included = 0
+    for position, (label, group) in enumerate(ordered, start=1):
+        remaining = token_budget - used - (reserve if position < len(ordered) else 0)
+        for sample_lines in (_FULL_SAMPLE_LINES, _SHORT_SAMPLE_LINES, 0):
+            block = _group_block(position, group, label, sample_lines)
+            cost = estimate_tokens(block) + 1
+            if cost <= remaining:
+                blocks.append(block)
+                used += cost
+                included += 1
+                break
+        else:
+            break
+
+    omitted = ordered[included:]
+    if omitted:
+        omitted_hosts = [h for _label, g in omitted for h in g['hosts']]
+        blocks.append(
+            f"[… {len(omitted)} more distinct result(s) on {len(omitted_hosts)} host(s) not shown: "
+            f"{_host_list(omitted_hosts)} …]"
+        )
+    text = "\n\n".join(blocks)
+    return {
+        'text': text,
+        'tokens': estimate_tokens(text),
+        'groups': len(groups),
+        'groups_included': included,
+        'hosts': host_count,
+    }
+
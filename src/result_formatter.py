@@ -3,8 +3,13 @@ Build human-readable summaries and structured text reports for execution results
 """
 
 import re
+import textwrap
 from typing import Any, Dict, List, Optional
 
+from .fleet_aggregation import format_fleet_summary, format_value
+from .output_parsers import ensure_parsed
+from .result_groups import group_results
+
 # IPv4 (simple validation via regex; filter loopback / zero later)
 _IPV4 = re.compile(
     r"\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}"
@@ -12,10 +17,45 @@ _IPV4 = re.compile(
 )
 
 
+_NON_SPACE = re.compile(r"\S")
+
+
+def _content_bounds(text: str) -> tuple:
+    """(start, end) of text without leading/trailing whitespace, found without copying it."""
+    m = _NON_SPACE.search(text)
+    if not m:
+        return 0, 0
+    end = len(text)
+    while text[end - 1].isspace():
+        end -= 1
+    return m.start(), end
+
+
 def _line_count(text: Optional[str]) -> int:
-    if not text or not str(text).strip():
+    if not text:
         return 0
-    return len(str(text).strip().splitlines())
+    text = str(text)
+    start, end = _content_bounds(text)
+    if start == end:
+        return 0
+    return text.count("\n", start, end) + 1
+
+
+def _head_lines(text: str, limit: int):
+    """
+    Yield the first limit lines of text (stripped), reading only as far as those lines.
+    Whether more follow is left to the caller (compare with _line_count).
+    """
+    start, end = _content_bounds(text)
+    pos = start
+    for _ in range(limit):
+        if pos >= end:
+            return
+        nl = text.find("\n", pos, end)
+        if nl < 0:
+            nl = end
+        yield text[pos:nl].rstrip("\r")
+        pos = nl + 1
 
 
 def _truncate(s: str, max_len: int = 120) -> str:
@@ -37,13 +77,20 @@ def _plain_error_hint(err: str) -> str:
         return "The computer did not answer in time. It may be busy or unreachable."
     if "could not resolve" in low or "name resolution" in low or "nodename nor servname" in low:
         return "The address name could not be looked up. Check spelling and network."
-    if "port 22" in low or "connection refused" in low or "no route to host" in low:
+    if "port 22" in low or "cannot connect to ssh port" in low or "connection refused" in low or "no route to host" in low:
         return "We could not reach that computer on the network. It may be off or blocking connections."
     if "permission denied" in low:
         return "You are not allowed to do that on that computer."
     return e
 
 
+def _host_label_lines(hosts: List[str], width: int) -> List[str]:
+    """[host] for one host, otherwise the host names wrapped to width."""
+    if len(hosts) == 1:
+        return [f"[{hosts[0]}]"]
+    return textwrap.wrap("[" + ", ".join(hosts) + "]", width, break_on_hyphens=False)
+
+
 def _unique_ipv4s(text: str) -> List[str]:
     """Collect unique IPv4 addresses from text, skipping loopback and 0.0.0.0."""
     seen: set = set()
@@ -58,6 +105,14 @@ def _unique_ipv4s(text: str) -> List[str]:
     return out
 
 
+def _parsed(result: Dict[str, Any], parser: str) -> Optional[List[Dict[str, Any]]]:
+    """Records cached by output_parsers.ensure_parsed when they came from parser."""
+    parsed = result.get("parsed")
+    if parsed and parsed.get("parser") == parser:
+        return parsed.get("records")
+    return None
+
+
 def _wants_ip_question(request: str, cmd: str) -> bool:
     low = (request or "").lower()
     cmd_low = (cmd or "").lower()
@@ -127,8 +182,14 @@ def _try_readable_answer_from_output(
     if _wants_ip_question(req, cmd):
         chunks: List[str] = []
         for host, r in ok_items:
-            out = r.get("stdout") or ""
-            ips = _unique_ipv4s(out)
+            interfaces = _parsed(r, "ip_addr")
+            if interfaces is not None:
+                ips = list(dict.fromkeys(
+                    a.split("/")[0] for i in interfaces for a in i.get("ipv4", [])
+                    if not a.startswith("127.")
+                ))
+            else:
+                ips = _unique_ipv4s(r.get("stdout") or "")
             if not ips:
                 continue
             if len(ips) == 1:
@@ -167,16 +228,31 @@ def _try_readable_answer_from_output(
     if _wants_uptime_question(req, cmd):
         chunks = []
         for host, r in ok_items:
+            uptime = _parsed(r, "uptime")
+            if uptime:
+                text = f"On {host}, the computer has been running for {uptime[0]['up']}"
+                if "load_1" in uptime[0]:
+                    text += f" (load average {uptime[0]['load_1']} over the last minute)"
+                chunks.append(text + ".")
+                continue
             line = (r.get("stdout") or "").strip().splitlines()
             if line:
-                chunks.append(f"On {host}, uptime looks like this: {line[0].strip()}")
+                chunks.append(f"On {host}, uptime looks like this: {line[0].strip()}.")
         if chunks:
-            return " ".join(chunks) + "."
+            return " ".join(chunks)
 
     # --- Disk (first useful line of df) ---
     if _wants_disk_question(req, cmd):
         chunks = []
         for host, r in ok_items:
+            filesystems = [f for f in (_parsed(r, "df") or []) if isinstance(f.get("use_pct"), int)]
+            if filesystems:
+                fullest = max(filesystems, key=lambda f: f["use_pct"])
+                text = f"On {host}, the fullest disk is {fullest['mounted_on']} at {fullest['use_pct']}% used"
+                if fullest.get("size"):
+                    text += f" ({fullest['used']} of {fullest['size']})"
+                chunks.append(text + ".")
+                continue
             lines = [ln.strip() for ln in (r.get("stdout") or "").splitlines() if ln.strip()]
             data_line = None
             for i, ln in enumerate(lines):
@@ -193,14 +269,44 @@ def _try_readable_answer_from_output(
         if chunks:
             return " ".join(chunks)
 
+    # --- Anything else a parser understood (free, ss, ps, systemctl, lsblk, ...) ---
+    chunks = []
+    for host, r in ok_items:
+        highlight = (r.get("parsed") or {}).get("highlight")
+        if highlight:
+            chunks.append(f"On {host}: {highlight}.")
+    if chunks:
+        if len(chunks) > 6:
+            chunks = chunks[:6] + [f"({len(ok_items) - 6} more computers are in the full report.)"]
+        return " ".join(chunks)
+
     return None
 
 
+def _fleet_sentence(summary: Dict[str, Any]) -> Optional[str]:
+    """One or two sentences on the first metric of a fleet summary."""
+    if not summary.get("metrics"):
+        return None
+    stats = next(iter(summary["metrics"].values()))
+    fmt = lambda v: format_value(v, stats["unit"])  # noqa: E731
+    text = (
+        f"Across {stats['count']} computers, {stats['label']} ranges from {fmt(stats['min'])} "
+        f"to {fmt(stats['max'])} (typical {fmt(stats['p50'])})"
+    )
+    if stats["worst"]:
+        text += f"; the worst is {stats['worst'][0]['host']} at {fmt(stats['worst'][0]['value'])}"
+    text += "."
+    if stats["outliers"]:
+        text += f" {len(stats['outliers'])} computer(s) stand out from the rest; they are listed in the report."
+    return text
+
+
 def build_natural_language_summary(
     original_request: str,
     generated_command: str,
     results: Dict[str, Any],
     host_context: Optional[Dict[str, Any]] = None,
+    fleet_summary: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Short, plain-language explanation for people who are not technical.
@@ -222,10 +328,14 @@ def build_natural_language_summary(
     ok_hosts = [h for h in servers if results[h].get("success")]
     bad_hosts = [h for h in servers if not results[h].get("success")]
 
+    ensure_parsed(generated_command or "", results)
     parts: list[str] = []
     parts.append(f'You asked: "{req_display}".')
 
-    readable = _try_readable_answer_from_output(req, generated_command or "", results)
+    if fleet_summary:
+        readable = _fleet_sentence(fleet_summary)
+    else:
+        readable = _try_readable_answer_from_output(req, generated_command or "", results)
 
     if n == 1:
         h = servers[0]
@@ -245,7 +355,10 @@ def build_natural_language_summary(
     else:
         if readable and ok_hosts:
             parts.append(readable)
-            parts.append("You can open the full report below for the complete output from each computer.")
+            if fleet_summary:
+                parts.append("The full report below has the statistics for the whole group of computers.")
+            else:
+                parts.append("You can open the full report below for the complete output from each computer.")
         elif not bad_hosts:
             if not readable:
                 parts.append(
@@ -275,103 +388,114 @@ def build_formatted_report(
     generated_command: str,
     results: Dict[str, Any],
     host_context: Optional[Dict[str, Any]] = None,
+    fleet_summary: Optional[Dict[str, Any]] = None,
 ) -> str:
     """
     Multi-section plain-text report suitable for display in a monospace block or logs.
+    With a fleet_summary, numeric rollups replace per-host output; only hosts without
+    parsed data (failures, unexpected output) are listed individually.
     """
-    lines: list[str] = []
+    lines: List[str] = []
     w = 72
+    heavy = "=" * w
+    light = "-" * w
 
-    def hr(char: str = "=") -> None:
-        lines.append(char * w)
-
-    hr("=")
-    lines.append("SHELLSENTRY EXECUTION REPORT".center(w))
-    hr("=")
-    lines.append("")
-
-    lines.append("YOUR REQUEST")
-    hr("-")
-    lines.append((original_request or "").strip() or "(empty)")
-    lines.append("")
-
-    lines.append("GENERATED COMMAND")
-    hr("-")
-    lines.append((generated_command or "").strip() or "(none)")
-    lines.append("")
+    lines += [heavy, "SHELLSENTRY EXECUTION REPORT".center(w), heavy, ""]
+    lines += ["YOUR REQUEST", light, (original_request or "").strip() or "(empty)", ""]
+    lines += ["GENERATED COMMAND", light, (generated_command or "").strip() or "(none)", ""]
 
     if not results:
-        lines.append("PER-SERVER RESULTS")
-        hr("-")
-        lines.append("(no results)")
-        lines.append("")
+        lines += ["PER-SERVER RESULTS", light, "(no results)", ""]
         return "\n".join(lines)
 
+    ensure_parsed(generated_command or "", results)
     ok_n = sum(1 for r in results.values() if r.get("success"))
-    lines.append("OVERVIEW")
-    hr("-")
-    lines.append(f"Servers: {len(results)}  |  Succeeded: {ok_n}  |  Failed: {len(results) - ok_n}")
-    lines.append("")
+    lines += [
+        "OVERVIEW",
+        light,
+        f"Servers: {len(results)}  |  Succeeded: {ok_n}  |  Failed: {len(results) - ok_n}",
+        "",
+    ]
 
     if host_context:
-        lines.append("HOST CONTEXT (PRE-RUN PROBE)")
-        hr("-")
+        lines += ["HOST CONTEXT (PRE-RUN PROBE)", light]
+        by_os: Dict[str, List[str]] = {}
         for host in results.keys():
             ctx = host_context.get(host)
             if isinstance(ctx, dict):
-                uname = ctx.get("uname_line") or "(no uname)"
-                lines.append(f"[{host}]")
-                lines.append(f"  OS: {_truncate(str(uname), w - 4)}")
+                os_line = f"  OS: {_truncate(str(ctx.get('uname_line') or '(no uname)'), w - 4)}"
             else:
-                lines.append(f"[{host}] (probe unavailable)")
+                os_line = "  (probe unavailable)"
+            by_os.setdefault(os_line, []).append(host)
+        for os_line, hosts in by_os.items():
+            lines.extend(_host_label_lines(hosts, w))
+            lines.append(os_line)
         lines.append("")
 
-    lines.append("PER-SERVER RESULTS")
-    hr("-")
-    for host, r in results.items():
-        ok = r.get("success", False)
-        ec = r.get("exit_code")
-        status = "SUCCESS" if ok else "FAILED"
-        lines.append(f"▸ {host}  —  {status}  (exit {ec})")
-        if r.get("error"):
-            lines.append(f"  Error: {r['error']}")
-        out = r.get("stdout") or ""
-        err = r.get("stderr") or ""
-        lines.append(f"  stdout: {_line_count(out)} line(s), stderr: {_line_count(err)} line(s)")
-        if out.strip():
-            preview = "\n".join(out.strip().splitlines()[:12])
-            if _line_count(out) > 12:
-                preview += "\n  … (output continues; truncated here)"
-            lines.append("  --- stdout preview ---")
-            for pl in preview.splitlines():
-                lines.append(f"  {pl}")
-        if err.strip() and not ok:
-            elines = err.strip().splitlines()[:8]
-            lines.append("  --- stderr ---")
-            for el in elines:
-                lines.append(f"  {el}")
-        lines.append("")
+    if fleet_summary:
+        lines += ["FLEET SUMMARY", light]
+        lines.extend(format_fleet_summary(fleet_summary, w))
+        results = {h: results[h] for h in fleet_summary["hosts_without_data"] if h in results}
 
-    hr("=")
-    lines.append("END OF REPORT".center(w))
-    hr("=")
+    if results:
+        lines += ["HOSTS WITHOUT FLEET DATA" if fleet_summary else "PER-SERVER RESULTS", light]
+        groups = group_results(results)
+        if len(groups) < len(results):
+            lines += [f"Hosts with identical output are listed together ({len(groups)} distinct result(s)).", ""]
+        for group in groups:
+            lines.extend(_result_block(group, w))
 
+    lines += [heavy, "END OF REPORT".center(w), heavy]
     return "\n".join(lines)
 
 
+def _result_block(group: Dict[str, Any], w: int) -> List[str]:
+    """Report lines for one result group; outputs are read only up to their preview."""
+    r = group["result"]
+    hosts = group["hosts"]
+    ok = r.get("success", False)
+    ec = r.get("exit_code")
+    status = "SUCCESS" if ok else "FAILED"
+    if len(hosts) == 1:
+        lines = [f"▸ {hosts[0]}  —  {status}  (exit {ec})"]
+    else:
+        lines = [f"▸ {len(hosts)} servers  —  {status}  (exit {ec})"]
+        lines.extend(f"  {ln}" for ln in _host_label_lines(hosts, w - 2))
+    if r.get("error"):
+        lines.append(f"  Error: {r['error']}")
+    out = r.get("stdout") or ""
+    err = r.get("stderr") or ""
+    out_lines = _line_count(out)
+    lines.append(f"  stdout: {out_lines} line(s), stderr: {_line_count(err)} line(s)")
+    parsed = r.get("parsed")
+    if parsed and parsed.get("highlight"):
+        lines.append(f"  Parsed ({parsed['parser']}): {_truncate(parsed['highlight'], w * 2)}")
+    if out_lines:
+        lines.append("  --- stdout preview ---")
+        lines.extend(f"  {pl}" for pl in _head_lines(out, 12))
+        if out_lines > 12:
+            lines.append("    … (output continues; truncated here)")
+    if not ok and _NON_SPACE.search(err):
+        lines.append("  --- stderr ---")
+        lines.extend(f"  {el}" for el in _head_lines(err, 8))
+    lines.append("")
+    return lines
+
+
 def format_execution_payload(
     original_request: str,
     generated_command: str,
     results: Dict[str, Any],
     host_context: Optional[Dict[str, Any]] = None,
+    fleet_summary: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, str]:
     """Return strings to merge into the JSON API response."""
     return {
         "natural_language_summary": build_natural_language_summary(
-            original_request, generated_command, results, host_context
+            original_request, generated_command, results, host_context, fleet_summary
         ),
         "formatted_report": build_formatted_report(
-            original_request, generated_command, results, host_context
+            original_request, generated_command, results, host_context, fleet_summary
         ),
     }
 
@@ -0,0 +1,83 @@
+"""
+Group hosts whose execution results are identical.
+
+A result's fingerprint is a hash of what the host actually returned (success, exit code,
+stdout, stderr, error); per-run details such as duration_ms or cached parses are ignored.
+The grouped form ({'groups': [...]}) is what the API returns and the execution log stores,
+so 300 hosts printing the same line cost one copy of it.
+"""
+
+import hashlib
+from typing import Any, Dict, List
+
+_FINGERPRINT_FIELDS = ('success', 'exit_code', 'stdout', 'stderr', 'error')
+# Differ between hosts of one group; kept per host next to the shared result
+_PER_HOST_FIELDS = ('duration_ms', 'scan_ms')
+
+
+def fingerprint(result: Dict[str, Any]) -> str:
+    """Stable short hash of the fields that make two host results the same."""
+    digest = hashlib.sha1()
+    for key in _FINGERPRINT_FIELDS:
+        value = result.get(key)
+        # Outputs are hashed as raw bytes (no JSON escaping pass over large stdout)
+        data = value.encode('utf-8', errors='replace') if isinstance(value, str) else repr(value).encode()
+        digest.update(f"{key}:{type(value).__name__}:{len(data)}:".encode())
+        digest.update(data)
+    return digest.hexdigest()[:16]
+
+
+def group_results(results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    [{'fingerprint', 'hosts', 'result'}] with one entry per distinct result, in order of
+    first appearance; 'result' is the first host's result (representative for the group).
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for host, result in (results or {}).items():
+        if not isinstance(result, dict):
+            continue
+        fp = fingerprint(result)
+        group = groups.get(fp)
+        if group is None:
+            groups[fp] = {'fingerprint': fp, 'hosts': [host], 'result': result}
+        else:
+            group['hosts'].append(host)
+    return list(groups.values())
+
+
+def grouped_results(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    {'hosts': n, 'groups': [{'fingerprint', 'hosts', 'result', <per-host field>: {host: value}}]}
+    where 'result' no longer carries per-host timings; those sit in the group by host.
+    """
+    out = []
+    for group in group_results(results):
+        entry = {
+            'fingerprint': group['fingerprint'],
+            'hosts': group['hosts'],
+            'result': {k: v for k, v in group['result'].items() if k not in _PER_HOST_FIELDS},
+        }
+        for field in _PER_HOST_FIELDS:
+            values = {h: results[h][field] for h in group['hosts'] if field in results[h]}
+            if values:
+                entry[field] = values
+        out.append(entry)
+    return {'hosts': sum(len(g['hosts']) for g in out), 'groups': out}
+
+
+def expand_results(data: Any) -> Any:
+    """
+    Back to {host: result} from grouped_results() output. Anything else (per-host dicts
+    written before grouping, None) is returned unchanged.
+    """
+    if not (isinstance(data, dict) and isinstance(data.get('groups'), list) and 'hosts' in data):
+        return data
+    results: Dict[str, Dict[str, Any]] = {}
+    for group in data['groups']:
+        for host in group.get('hosts') or []:
+            result = dict(group.get('result') or {})
+            for field in _PER_HOST_FIELDS:
+                if host in (group.get(field) or {}):
+                    result[field] = group[field][host]
+            results[host] = result
+    return results
@@ -0,0 +1,210 @@
+"""
+On-disk store for execution outputs, so API responses can carry metadata and handles
+instead of every host's full stdout/stderr.
+
+Each run gets a directory under RESULT_STORE_DIR holding one file per distinct output
+(hosts with identical results share a file, see result_groups), the formatted report and
+a manifest. Reads memory-map the file and slice the requested byte or line range, so
+fetching the first screen of a 200 MB log does not load it.
+"""
+
+import json
+import mmap
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from .config import Config
+from .logger import setup_logger
+from .output_parsers import without_records
+from .result_groups import group_results
+
+logger = setup_logger()
+
+STREAMS = ('stdout', 'stderr')
+_RUN_ID = re.compile(r'^[0-9a-f]{32}$')
+_PREVIEW_LINES = 10
+
+
+class ResultStoreError(Exception):
+    """Unknown or expired run, host or stream."""
+
+
+def _preview(text: str, max_lines: int = _PREVIEW_LINES) -> str:
+    end = -1
+    for _ in range(max_lines):
+        end = text.find('\n', end + 1)
+        if end < 0:
+            return text
+    return text[:end]
+
+
+class ResultStore:
+    """Spills per-host outputs of a run to disk and serves ranges of them back."""
+
+    def __init__(self, root=None, ttl_seconds=None):
+        self.root = os.path.abspath(root or Config.RESULT_STORE_DIR)
+        self.ttl_seconds = Config.RESULT_STORE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+
+    def save(self, user_id: int, results: Dict[str, Dict[str, Any]], report: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Write the outputs of results (and the formatted report) to a new run directory.
+        Returns the compact view: {'run_id', 'report_url', 'result_groups'} where each group's
+        result has stdout/stderr replaced by sizes, a short preview and fetch URLs.
+        """
+        self.prune()
+        run_id = uuid.uuid4().hex
+        run_dir = os.path.join(self.root, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+
+        manifest = {'user_id': user_id, 'created': time.time(), 'hosts': {}, 'outputs': {}}
+        groups = []
+        for group in group_results(results):
+            fp = group['fingerprint']
+            compact = {k: v for k, v in without_records(group['result']).items() if k not in STREAMS}
+            sizes = {}
+            for stream in STREAMS:
+                text = group['result'].get(stream) or ''
+                data = text.encode('utf-8', errors='replace')
+                with open(os.path.join(run_dir, f"{fp}.{stream}"), 'wb') as f:
+                    f.write(data)
+                sizes[stream] = len(data)
+                compact[f"{stream}_bytes"] = len(data)
+                compact[f"{stream}_lines"] = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
+                compact[f"{stream}_url"] = f"/api/results/{run_id}/{fp}/{stream}"
+            compact['stdout_preview'] = _preview(group['result'].get('stdout') or '')
+            manifest['outputs'][fp] = sizes
+            for host in group['hosts']:
+                manifest['hosts'][host] = fp
+            groups.append({'fingerprint': fp, 'hosts': group['hosts'], 'result': compact})
+
+        report_url = None
+        if report is not None:
+            with open(os.path.join(run_dir, 'report.txt'), 'w', encoding='utf-8', errors='replace') as f:
+                f.write(report)
+            report_url = f"/api/results/{run_id}/report"
+
+        with open(os.path.join(run_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        return {'run_id': run_id, 'report_url': report_url, 'result_groups': groups}
+
+    def read(
+        self,
+        user_id: int,
+        run_id: str,
+        key: str,
+        stream: str = 'stdout',
+        start: int = 0,
+        end: Optional[int] = None,
+        unit: str = 'bytes',
+    ) -> Dict[str, Any]:
+        """
+        Range [start, end) of one output, in bytes or lines. key is an output fingerprint or a
+        host name; key 'report' with stream None reads the formatted report. Returns
+        {'data', 'start', 'end', 'total_bytes', 'eof'} (start/end in the requested unit). In
+        lines, a single line longer than RESULT_FETCH_MAX_BYTES comes back cut to the limit with
+        'truncated' set, and end moves past it so paging always advances.
+        """
+        manifest = self._manifest(user_id, run_id)
+        if key == 'report' and stream is None:
+            path = os.path.join(self.root, run_id, 'report.txt')
+        else:
+            fp = key if key in manifest['outputs'] else manifest['hosts'].get(key)
+            if fp is None or stream not in STREAMS:
+                raise ResultStoreError(f"No {stream} stored for {key}")
+            path = os.path.join(self.root, run_id, f"{fp}.{stream}")
+        if not os.path.exists(path):
+            raise ResultStoreError(f"No output stored for {key}")
+
+        limit = Config.RESULT_FETCH_MAX_BYTES
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return {'data': '', 'start': 0, 'end': 0, 'total_bytes': 0, 'eof': True}
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if unit == 'lines':
+                    lo = self._line_offset(mm, start, size)
+                    hi = size if end is None else self._line_offset(mm, end, size, lo, start)
+                    stop_line = end
+                    truncated = False
+                    next_offset = hi
+                    if hi - lo > limit:
+                        # Cut at the last full line inside the byte limit
+                        cut = mm.rfind(b'\n', lo, lo + limit)
+                        if cut >= lo:
+                            hi = next_offset = cut + 1
+                            stop_line = start + mm[lo:hi].count(b'\n')
+                        else:
+                            # One line longer than the limit: return its head and move past it
+                            hi = lo + limit
+                            next_offset = self._line_offset(mm, start + 1, size, lo, start)
+                            stop_line = start + 1
+                            truncated = True
+                    chunk = mm[lo:hi]
+                    return {
+                        'data': chunk.decode('utf-8', errors='replace'),
+                        'start': start,
+                        'end': stop_line if stop_line is not None else start + chunk.count(b'\n'),
+                        'total_bytes': size,
+                        'eof': next_offset >= size,
+                        'truncated': truncated,
+                    }
+                lo = min(max(start, 0), size)
+                hi = size if end is None else min(max(end, lo), size)
+                hi = min(hi, lo + limit)
+                return {
+                    'data': mm[lo:hi].decode('utf-8', errors='replace'),
+                    'start': lo,
+                    'end': hi,
+                    'total_bytes': size,
+                    'eof': hi >= size,
+                }
+
+    @staticmethod
+    def _line_offset(mm, line: int, size: int, from_offset: int = 0, from_line: int = 0) -> int:
+        """Byte offset where line (0-based) starts, scanning forward only as far as needed."""
+        pos = from_offset
+        for _ in range(max(line - from_line, 0)):
+            nl = mm.find(b'\n', pos)
+            if nl < 0:
+                return size
+            pos = nl + 1
+        return pos
+
+    def _manifest(self, user_id: int, run_id: str) -> Dict[str, Any]:
+        if not _RUN_ID.match(run_id or ''):
+            raise ResultStoreError('Unknown run')
+        try:
+            with open(os.path.join(self.root, run_id, 'manifest.json')) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            raise ResultStoreError('Unknown or expired run')
+        if manifest.get('user_id') != user_id:
+            raise ResultStoreError('Unknown or expired run')
+        # prune() only runs on save, so an idle store can still hold expired runs
+        if time.time() - manifest.get('created', 0) > self.ttl_seconds:
+            raise ResultStoreError('Unknown or expired run')
+        return manifest
+
+    def prune(self) -> int:
+        """Delete runs older than the TTL; returns how many were removed."""
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not _RUN_ID.match(name):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info("Result store: removed %d expired run(s)", removed)
+        return removed
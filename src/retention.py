@@ -0,0 +1,258 @@
+"""
+Retention for the execution log: archive, roll up and prune old ExecutionLog rows.
+
+Rows older than EXECUTION_RETENTION_DAYS are processed one UTC day at a time:
+1) each row is appended to a gzip JSONL archive for its day (one file per day,
+   append-only; every run adds a new gzip member, which gzip readers concatenate)
+2) per-host results are aggregated into ExecutionRollup rows (counts by user, host
+   and status, plus latency percentiles from the per-host duration_ms); when rows of an
+   already rolled-up day show up late, its counts are added to and the percentiles are
+   recomputed from the day's whole archive
+3) the day's rows are deleted from the hot table in the same transaction that
+   writes the rollups, so a day is never counted twice
+
+The archive is written (and fsync'd) before that transaction; if the commit fails, the
+rows stay in the table and the next run archives them again. Archive readers therefore
+keep the first record per (id, timestamp), as _archived_latencies does; the id alone is not
+unique across days, since SQLite reuses the ids of deleted rows.
+
+Retention is off unless EXECUTION_RETENTION_DAYS is set.
+
+Keeping the hot table bounded keeps insert and query latency flat over time.
+"""
+
+import gzip
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+from .config import Config
+from .logger import setup_logger
+from .models import db, ExecutionLog, ExecutionRollup
+from .result_groups import expand_results
+from .stats import percentile
+
+logger = setup_logger()
+
+
+def _row_to_record(row: ExecutionLog) -> Dict:
+    """Serialize one ExecutionLog row for the archive (JSON columns are decoded)."""
+    def _loads(text):
+        try:
+            return json.loads(text) if text else None
+        except ValueError:
+            return text
+
+    return {
+        'id': row.id,
+        'user_id': row.user_id,
+        'username': row.username,
+        'original_request': row.original_request,
+        'generated_command': row.generated_command,
+        'target_servers': _loads(row.target_servers),
+        'execution_status': row.execution_status,
+        'execution_results': _loads(row.execution_results),
+        'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+    }
+
+
+class ExecutionRetention:
+    """Archives, rolls up and prunes ExecutionLog rows past the retention window."""
+
+    def __init__(self, retention_days=None, archive_dir=None, batch_size=500):
+        self.retention_days = Config.EXECUTION_RETENTION_DAYS if retention_days is None else retention_days
+        self.archive_dir = os.path.abspath(archive_dir or Config.EXECUTION_ARCHIVE_DIR)
+        self.batch_size = batch_size
+
+    def archive_path(self, day) -> str:
+        return os.path.join(self.archive_dir, f"executions-{day.isoformat()}.jsonl.gz")
+
+    def run(self, now=None) -> Dict[str, int]:
+        """
+        Process every expired day, oldest first. Must run inside an app context.
+        Returns {'days': n, 'archived': n}.
+        """
+        stats = {'days': 0, 'archived': 0}
+        if self.retention_days <= 0:
+            return stats
+
+        # Day-aligned cutoff: a day is only processed once all of it is past retention
+        now = now or datetime.utcnow()
+        cutoff = datetime.combine((now - timedelta(days=self.retention_days)).date(), datetime.min.time())
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with self._exclusive_lock():
+            while True:
+                oldest = (
+                    db.session.query(db.func.min(ExecutionLog.timestamp))
+                    .filter(ExecutionLog.timestamp < cutoff)
+                    .scalar()
+                )
+                if oldest is None:
+                    break
+                stats['archived'] += self._process_day(oldest.date())
+                stats['days'] += 1
+
+        if stats['days']:
+            logger.info(
+                "Execution retention: archived %d row(s) across %d day(s) into %s",
+                stats['archived'], stats['days'], self.archive_dir,
+            )
+        return stats
+
+    def _process_day(self, day) -> int:
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        in_day = (ExecutionLog.timestamp >= start) & (ExecutionLog.timestamp < end)
+
+        counts: Dict[tuple, int] = defaultdict(int)
+        latencies: Dict[tuple, List[float]] = defaultdict(list)
+        archived = 0
+        last_id = 0
+
+        # Keyset pagination keeps memory bounded to one batch of full rows
+        with open(self.archive_path(day), 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                while True:
+                    rows = (
+                        ExecutionLog.query.filter(in_day, ExecutionLog.id > last_id)
+                        .order_by(ExecutionLog.id)
+                        .limit(self.batch_size)
+                        .all()
+                    )
+                    if not rows:
+                        break
+                    for row in rows:
+                        record = _row_to_record(row)
+                        archive.write((json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8'))
+                        self._accumulate(record, counts, latencies)
+                        archived += 1
+                    last_id = rows[-1].id
+                    db.session.expunge_all()
+            # The archive must be durable before the rows leave the hot table
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        if ExecutionRollup.query.filter_by(day=day).first() is not None:
+            # Percentiles cannot be merged: take them over every archived row of the day
+            latencies = self._archived_latencies(day)
+
+        try:
+            for key, n in counts.items():
+                username, server, status = key
+                values = latencies.get(key, [])
+                rollup = ExecutionRollup.query.filter_by(
+                    day=day, username=username, server=server, status=status
+                ).first()
+                if rollup is None:
+                    rollup = ExecutionRollup(day=day, username=username, server=server, status=status, executions=0)
+                    db.session.add(rollup)
+                rollup.executions += n
+                rollup.latency_p50_ms = percentile(values, 50)
+                rollup.latency_p95_ms = percentile(values, 95)
+                rollup.latency_p99_ms = percentile(values, 99)
+            ExecutionLog.query.filter(in_day).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return archived
+
+    def _archived_latencies(self, day) -> Dict[tuple, List[float]]:
+        """Per-host durations of every execution in the day's archive (all runs that appended to it)."""
+        counts: Dict[tuple, int] = defaultdict(int)
+        latencies: Dict[tuple, List[float]] = defaultdict(list)
+        seen = set()
+        with gzip.open(self.archive_path(day), 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                # Rows archived by a run whose commit failed are archived again by the next one
+                identity = (record.get('id'), record.get('timestamp'))
+                if identity in seen:
+                    continue
+                seen.add(identity)
+                self._accumulate(record, counts, latencies)
+        return latencies
+
+    @staticmethod
+    def _accumulate(record, counts, latencies):
+        username = record.get('username') or ''
+        results = expand_results(record.get('execution_results'))
+        if not isinstance(results, dict) or not results:
+            key = (username, '', record.get('execution_status') or 'failed')
+            counts[key] += 1
+            return
+        for server, result in results.items():
+            if not isinstance(result, dict):
+                continue
+            key = (username, server, 'success' if result.get('success') else 'failed')
+            counts[key] += 1
+            duration = result.get('duration_ms')
+            if isinstance(duration, (int, float)):
+                latencies[key].append(float(duration))
+
+    def _exclusive_lock(self):
+        """Cross-process lock so several app workers never archive the same day twice."""
+        return _ArchiveLock(os.path.join(self.archive_dir, '.retention.lock'))
+
+
+class _ArchiveLock:
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        self._fh.close()
+        self._fh = None
+        return False
+
+
+class RetentionWorker:
+    """Background thread that runs ExecutionRetention every RETENTION_INTERVAL_SECONDS."""
+
+    def __init__(self, app, retention=None, interval=None):
+        self.app = app
+        self.retention = retention or ExecutionRetention()
+        self.interval = Config.RETENTION_INTERVAL_SECONDS if interval is None else interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.retention.retention_days <= 0 or self.interval <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='execution-retention', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.retention.run()
+            except Exception as e:
+                logger.error("Execution retention run failed: %s", e, exc_info=True)
+            self._stop.wait(self.interval)
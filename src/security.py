@@ -58,19 +58,19 @@ class SecurityLayer:
         # Check for prohibited keywords
         for keyword in self.prohibited_keywords:
             if keyword in input_lower:
-                logger.warning(f"Prohibited keyword detected: {keyword}")
+                logger.warning("Prohibited keyword detected: %s", keyword)
                 return {'valid': False, 'reason': f'Prohibited keyword detected: {keyword}'}
         
         # Check for dangerous patterns
         for pattern in self.dangerous_patterns:
             if re.search(pattern, input_lower, re.IGNORECASE):
-                logger.warning(f"Dangerous pattern detected: {pattern}")
+                logger.warning("Dangerous pattern detected: %s", pattern)
                 return {'valid': False, 'reason': f'Dangerous pattern detected'}
         
         # Check for prompt injection
         for pattern in self.injection_patterns:
             if re.search(pattern, input_lower, re.IGNORECASE):
-                logger.warning(f"Prompt injection pattern detected: {pattern}")
+                logger.warning("Prompt injection pattern detected: %s", pattern)
                 return {'valid': False, 'reason': 'Potential prompt injection detected'}
         
         # Sanitize input (remove control characters)
@@ -1,27 +1,130 @@
 import paramiko
-import os
 import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
 from .logger import setup_logger
 from .config import Config
+from .credentials import CredentialProvider
+from .inventory import split_host_port
+from .jump_hosts import JumpHostPool
+from .circuit_breaker import HostCircuitBreaker, classify_connect_error
+from .reachability import scan_tcp
+from .transport_profiles import decode_remote_gzip, resolve_profile, wrap_remote_gzip
+from .result_groups import grouped_results
 from .models import db, ExecutionLog
 
 logger = setup_logger()
 
+# (command, timeout) run by probe_host_context: OS, running systemd services (empty if
+# non-systemd or no permission) and listening TCP/UDP sockets with their processes when
+# permitted (like nmap-style listeners); output is truncated on the remote via head
+PROBE_COMMANDS = (
+    ('uname -a', 15),
+    ("systemctl list-units --type=service --state=running --no-pager 2>/dev/null | head -n 50", 25),
+    ("ss -tlnp 2>/dev/null | head -n 40", 20),
+    ("ss -ulnp 2>/dev/null | head -n 25", 20),
+)
+
+# _run_command reads stdout with this timeout and empties stderr in between
+_STDERR_POLL_SECONDS = 0.05
+_READ_BYTES = 32768
+
+
 class SSHExecutor:
     """Handles SSH-based remote command execution"""
     
-    def __init__(self):
-        # Parse SSH_USER - can be in format "username@hostname" or just "username"
-        ssh_user_raw = Config.SSH_USER or ''
-        if '@' in ssh_user_raw:
-            self.ssh_user = ssh_user_raw.split('@')[0]
-        else:
-            self.ssh_user = ssh_user_raw
-        self.ssh_password = Config.SSH_PASSWORD
-        self.ssh_key_path = os.path.expanduser(Config.SSH_KEY_PATH)
-        self.ssh_agent_socket = Config.SSH_AGENT_SOCKET
-        self.server_credentials = Config.SERVER_CREDENTIALS
+    def __init__(self, credentials=None):
+        # Keys are parsed once here; connections only look up pre-built credentials
+        self.credentials = credentials or CredentialProvider()
+        self.circuit_breaker = HostCircuitBreaker(probe=self._tcp_reachable)
+        # One shared transport per bastion; hosts behind it are reached over direct-tcpip channels
+        self.jump_hosts = JumpHostPool(self.credentials)
+
+    def _jump_host_for(self, server, hostname=None):
+        """The inventory's jump_host for server, or None for a direct connection."""
+        _group, settings = self.credentials.inventory.resolve(server, hostname or split_host_port(server)[0])
+        return settings.get('jump_host') or None
+
+    def _transport_profile(self, server, hostname=None):
+        """Transport settings for server: inventory "transport" over SSH_TRANSPORT_PROFILE."""
+        _group, settings = self.credentials.inventory.resolve(server, hostname or split_host_port(server)[0])
+        return resolve_profile(settings.get('transport'), default=Config.SSH_TRANSPORT_PROFILE)
+
+    def _tcp_reachable(self, server, timeout=None):
+        """True when a TCP connect to the server's SSH port succeeds (through its bastion, if any)."""
+        hostname, port = split_host_port(server)
+        timeout = timeout or Config.CIRCUIT_PROBE_TIMEOUT
+        jump_host = self._jump_host_for(server, hostname)
+        try:
+            if jump_host:
+                self.jump_hosts.open_channel(jump_host, hostname, port, timeout=timeout).close()
+                return True
+            with socket.create_connection((hostname, port), timeout=timeout):
+                return True
+        except (OSError, paramiko.SSHException):
+            return False
+
+    def _map_hosts(self, func, servers, thread_name_prefix):
+        """Run func(server) for every server on up to SSH_MAX_PARALLEL_HOSTS threads; results in input order."""
+        servers = list(dict.fromkeys(servers))
+        if len(servers) <= 1:
+            return {server: func(server) for server in servers}
+        workers = max(1, min(len(servers), Config.SSH_MAX_PARALLEL_HOSTS))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as pool:
+            return dict(zip(servers, pool.map(func, servers)))
     
+    def _prescan(self, servers):
+        """
+        TCP-check every server's SSH port at once before any handshake.
+        Returns {server: connect error dict} for servers that are not reachable; hosts
+        with an open circuit are left to _open_ssh, which fails them fast anyway.
+        """
+        if not Config.SSH_PRESCAN_ENABLED:
+            return {}
+        targets = {}
+        for server in dict.fromkeys(servers):
+            hostname, port = split_host_port(server)
+            # Hosts behind a bastion are not routable from here; their channel open is the check
+            if self._jump_host_for(server, hostname):
+                continue
+            if self.circuit_breaker.check(server) is None:
+                targets[server] = (hostname, port)
+        if not targets:
+            return {}
+        started = time.perf_counter()
+        scan = scan_tcp(targets, timeout=Config.SSH_PRESCAN_TIMEOUT)
+        unreachable = {}
+        for server, outcome in scan.items():
+            if outcome is None:
+                self.circuit_breaker.record_scan(server, None)
+                continue
+            category, detail = outcome
+            hostname, port = targets[server]
+            if category == 'dns':
+                error_msg = f'DNS resolution failed: Could not resolve {server}'
+            else:
+                error_msg = (
+                    f'Cannot connect to SSH port {port} on {server}. Possible causes: SSH service not running, '
+                    f'firewall blocking port {port}, or server is down.'
+                )
+            logger.warning("Pre-scan: %s not reachable (%s: %s)", server, category, detail)
+            error = {
+                'success': False,
+                'uname_line': None,
+                'stderr': error_msg,
+                'exit_code': -1,
+                'error': f'SSH error: {error_msg}'
+            }
+            # SSH_PRESCAN_TIMEOUT is much shorter than the connect timeout: one slow answer only
+            # skips this run, a host that keeps dropping packets opens its circuit
+            self.circuit_breaker.record_scan(server, category, error)
+            unreachable[server] = error
+        logger.debug(
+            "Pre-scan of %d host(s) took %.1f ms, %d unreachable",
+            len(targets), (time.perf_counter() - started) * 1000, len(unreachable),
+        )
+        return unreachable
+
     def execute_on_servers(self, command, servers, username, user_id=None, original_request=''):
         """
         Execute command on one or more remote servers
@@ -39,26 +142,40 @@ class SSHExecutor:
         if not servers:
             return {'error': 'No servers specified'}
         
-        results = {}
+        scan_started = time.perf_counter()
+        unreachable = self._prescan(servers)
+        scan_ms = round((time.perf_counter() - scan_started) * 1000, 1)
+
+        results = self._execute_hosts(command, servers, unreachable, scan_ms)
+
+        # Log execution
+        self._log_execution(username, user_id, original_request, command, servers, results)
         
-        for server in servers:
+        return results
+
+    def _execute_hosts(self, command, servers, unreachable, scan_ms):
+        """{server: result} for command on every server; unreachable ones fail from the pre-scan."""
+        def run(server):
+            if server in unreachable:
+                return dict(self._connect_failure_result(unreachable[server]), duration_ms=scan_ms)
+            started = time.perf_counter()
             try:
                 result = self._execute_on_server(server, command)
-                results[server] = result
             except Exception as e:
-                logger.error(f"Error executing on {server}: {str(e)}", exc_info=True)
-                results[server] = {
+                logger.error("Error executing on %s: %s", server, e, exc_info=True)
+                result = {
                     'success': False,
                     'error': str(e),
                     'stdout': '',
                     'stderr': '',
                     'exit_code': -1
                 }
-        
-        # Log execution
-        self._log_execution(username, user_id, original_request, command, servers, results)
-        
-        return results
+            # Wall-clock time per host (connect + run); feeds the daily latency rollups
+            result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            return result
+
+        # Hosts run concurrently (a slow host no longer delays the others)
+        return self._map_hosts(run, servers, 'ssh-exec')
 
     def _exec_remote_text(self, ssh, command, timeout=25):
         """Run one non-interactive command; return (exit_code, stdout, stderr)."""
@@ -76,57 +193,59 @@ class SSHExecutor:
         """
         if not servers:
             return {}
-        results = {}
-        for server in servers:
+        return self._probe_hosts(servers, self._prescan(servers))
+
+    def _probe_hosts(self, servers, unreachable):
+        def probe(server):
+            if server in unreachable:
+                return unreachable[server]
             ssh, connect_error = self._open_ssh(server)
             if connect_error is not None:
-                results[server] = connect_error
-                continue
+                return connect_error
             try:
-                u_exit, u_out, u_err = self._exec_remote_text(ssh, 'uname -a', timeout=15)
-                # Running service units (systemd); empty if non-systemd or no permission
-                svc_cmd = (
-                    "systemctl list-units --type=service --state=running --no-pager "
-                    "2>/dev/null | head -n 50"
-                )
-                _s_exit, s_out, s_err = self._exec_remote_text(ssh, svc_cmd, timeout=25)
-                # Listening ports + processes when permitted (like nmap-style listeners)
-                _t_exit, t_out, t_err = self._exec_remote_text(
-                    ssh, "ss -tlnp 2>/dev/null | head -n 40", timeout=20
-                )
-                _ud_exit, ud_out, ud_err = self._exec_remote_text(
-                    ssh, "ss -ulnp 2>/dev/null | head -n 25", timeout=20
-                )
-
-                uname_line = u_out or None
-                results[server] = {
-                    'success': u_exit == 0,
-                    'uname_line': uname_line,
-                    'uname_stderr': u_err or None,
-                    'running_services': s_out if s_out else None,
-                    'running_services_stderr': s_err if s_err else None,
-                    'listening_tcp': t_out if t_out else None,
-                    'listening_tcp_stderr': t_err if t_err else None,
-                    'listening_udp': ud_out if ud_out else None,
-                    'listening_udp_stderr': ud_err if ud_err else None,
-                    'error': None
-                    if u_exit == 0
-                    else (u_err or f'uname exited with {u_exit}'),
-                }
+                outputs = [self._exec_remote_text(ssh, cmd, timeout=t) for cmd, t in PROBE_COMMANDS]
+                return self._host_context_result(*outputs)
             except Exception as e:
-                logger.warning(f"Host context probe failed on {server}: {str(e)}")
-                results[server] = {
-                    'success': False,
-                    'uname_line': None,
-                    'running_services': None,
-                    'listening_tcp': None,
-                    'listening_udp': None,
-                    'stderr': str(e),
-                    'error': str(e),
-                }
+                logger.warning("Host context probe failed on %s: %s", server, e)
+                return self._probe_error_result(e)
             finally:
                 ssh.close()
-        return results
+
+        return self._map_hosts(probe, servers, 'ssh-probe')
+
+    @staticmethod
+    def _host_context_result(uname, services, tcp, udp):
+        """Host context dict from the (exit_code, stdout, stderr) of each PROBE_COMMANDS entry."""
+        u_exit, u_out, u_err = uname
+        _s_exit, s_out, s_err = services
+        _t_exit, t_out, t_err = tcp
+        _ud_exit, ud_out, ud_err = udp
+        return {
+            'success': u_exit == 0,
+            'uname_line': u_out or None,
+            'uname_stderr': u_err or None,
+            'running_services': s_out if s_out else None,
+            'running_services_stderr': s_err if s_err else None,
+            'listening_tcp': t_out if t_out else None,
+            'listening_tcp_stderr': t_err if t_err else None,
+            'listening_udp': ud_out if ud_out else None,
+            'listening_udp_stderr': ud_err if ud_err else None,
+            'error': None
+            if u_exit == 0
+            else (u_err or f'uname exited with {u_exit}'),
+        }
+
+    @staticmethod
+    def _probe_error_result(exc):
+        return {
+            'success': False,
+            'uname_line': None,
+            'running_services': None,
+            'listening_tcp': None,
+            'listening_udp': None,
+            'stderr': str(exc),
+            'error': str(exc),
+        }
 
     def probe_os_uname(self, servers):
         """
@@ -139,135 +258,138 @@ class SSHExecutor:
         """
         Open an SSH connection to server using the same credential rules as execution.
         Returns (ssh_client, None) on success, or (None, error_dict) on failure.
+        Hosts whose circuit is open fail fast with their last connect error.
         """
+        open_circuit_error = self.circuit_breaker.check(server)
+        if open_circuit_error is not None:
+            logger.info("Skipping %s: circuit open", server)
+            return None, open_circuit_error
+
         ssh = paramiko.SSHClient()
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         try:
-            server_username = self.ssh_user or 'root'
-            server_password = self.ssh_password
-            has_server_specific_creds = False
-
-            if server in self.server_credentials:
-                server_username = self.server_credentials[server]['username']
-                server_password = self.server_credentials[server]['password']
-                has_server_specific_creds = True
-                logger.info(f"Using server-specific credentials for {server}: user={server_username}")
+            hostname, port = split_host_port(server)
+            credential = self.credentials.for_host(server, hostname)
+            if credential.error:
+                raise ValueError(credential.error)
+            logger.debug(
+                "Connecting to %s as %s using %s (%s)",
+                server, credential.username, credential.method, credential.source,
+            )
 
             connect_kwargs = {
-                'hostname': server,
-                'username': server_username,
+                'hostname': hostname,
+                'port': port,
                 'timeout': 30,
-                'look_for_keys': False,
-                'allow_agent': False
             }
-
-            if has_server_specific_creds and server_password:
-                connect_kwargs['password'] = server_password
-                logger.info(f"Using password authentication for {server}")
-            elif self.ssh_key_path and os.path.exists(self.ssh_key_path):
-                try:
-                    from paramiko import RSAKey, Ed25519Key
-                    import io
-                    with open(self.ssh_key_path, 'r') as f:
-                        key_content = f.read()
-                        if 'BEGIN RSA PRIVATE KEY' in key_content or 'BEGIN OPENSSH PRIVATE KEY' in key_content:
-                            try:
-                                key = RSAKey.from_private_key(io.StringIO(key_content))
-                                connect_kwargs['pkey'] = key
-                                logger.info(f"Using RSA SSH key: {self.ssh_key_path}")
-                            except Exception as e1:
-                                try:
-                                    key = Ed25519Key.from_private_key(io.StringIO(key_content))
-                                    connect_kwargs['pkey'] = key
-                                    logger.info(f"Using Ed25519 SSH key: {self.ssh_key_path}")
-                                except Exception as e2:
-                                    logger.error(f"Could not load key as RSA or Ed25519: {str(e2)}")
-                                    raise e1
-                        else:
-                            raise ValueError("Key format not recognized (not RSA or Ed25519)")
-                except Exception as e:
-                    logger.error(f"Could not load SSH key: {str(e)}")
-                    raise
-            elif self.ssh_agent_socket:
-                connect_kwargs['allow_agent'] = True
-            elif server_password:
-                connect_kwargs['password'] = server_password
-                logger.info(f"Using password authentication for {server}")
-            else:
-                logger.warning(f"No SSH key or password found for {server}")
+            connect_kwargs.update(credential.connect_kwargs())
+            jump_host = self._jump_host_for(server, hostname)
+            profile = self._transport_profile(server, hostname)
+            connect_kwargs['compress'] = bool(profile['compression'])
 
             max_retries = 2
             for attempt in range(max_retries):
                 try:
+                    if jump_host:
+                        # Inner handshake runs over a fresh channel of the shared bastion transport
+                        connect_kwargs['sock'] = self.jump_hosts.open_channel(jump_host, hostname, port)
                     ssh.connect(**connect_kwargs)
+                    # Channel flow-control settings apply to every channel opened from here on
+                    transport = ssh.get_transport()
+                    transport.default_window_size = int(profile['window_size'])
+                    transport.default_max_packet_size = int(profile['max_packet_size'])
+                    self.circuit_breaker.record_success(server)
                     return ssh, None
                 except (paramiko.SSHException, Exception) as e:
+                    # The failed attempt's transport and bastion channel are not reused; a
+                    # channel left open stays allocated on the shared bastion transport
+                    ssh.close()
+                    sock = connect_kwargs.pop('sock', None)
+                    if sock is not None:
+                        sock.close()
                     if attempt < max_retries - 1:
                         logger.warning(
-                            f"SSH connection attempt {attempt + 1}/{max_retries} failed for {server}: {str(e)}, retrying..."
+                            "SSH connection attempt %d/%d failed for %s: %s, retrying...",
+                            attempt + 1, max_retries, server, e,
                         )
-                        import time
                         time.sleep(1)
                         continue
                     raise
-        except paramiko.AuthenticationException:
-            logger.error(f"Authentication failed for {server}")
+        except Exception as e:
             ssh.close()
-            return None, {
+            error = self._connect_error_result(server, e)
+            self.circuit_breaker.record_failure(server, classify_connect_error(e), error)
+            return None, error
+
+    def _connect_error_result(self, server, exc):
+        """Map an exception raised while connecting to server to a connect error dict."""
+        _hostname, port = split_host_port(server)
+        port_msg = (
+            f'Cannot connect to SSH port {port} on {server}. Possible causes: SSH service not running, '
+            f'firewall blocking port {port}, or server is down.'
+        )
+        if isinstance(exc, paramiko.AuthenticationException):
+            logger.error("Authentication failed for %s", server)
+            return {
                 'success': False,
                 'uname_line': None,
                 'stderr': 'SSH authentication failed',
                 'exit_code': -1,
                 'error': 'Authentication failed'
             }
-        except paramiko.SSHException as e:
-            error_msg = str(e)
-            logger.error(f"SSH error for {server}: {error_msg}")
+        if isinstance(exc, paramiko.ChannelException):
+            # The jump host refused to open a direct-tcpip channel to the target
+            error_msg = (
+                f'Cannot connect to SSH port {port} on {server} through its jump host '
+                f'({exc.text or "channel open failed"}). Possible causes: SSH service not running, '
+                f'firewall blocking the bastion, or server is down.'
+            )
+            logger.error("Jump host channel to %s failed: %s", server, exc)
+            return {
+                'success': False,
+                'uname_line': None,
+                'stderr': error_msg,
+                'exit_code': -1,
+                'error': f'SSH error: {error_msg}'
+            }
+        if isinstance(exc, paramiko.SSHException):
+            error_msg = str(exc)
+            logger.error("SSH error for %s: %s", server, error_msg)
             if 'timeout' in error_msg.lower():
                 error_msg = f'Connection timeout: Server {server} did not respond'
             elif 'name resolution' in error_msg.lower() or 'could not resolve' in error_msg.lower():
                 error_msg = f'DNS resolution failed: Could not resolve {server}'
             elif 'no route to host' in error_msg.lower():
                 error_msg = f'Network unreachable: Cannot reach {server}'
-            elif 'unable to connect to port 22' in error_msg.lower() or 'port 22' in error_msg.lower():
-                error_msg = (
-                    f'Cannot connect to SSH port 22 on {server}. Possible causes: SSH service not running, '
-                    f'firewall blocking port 22, or server is down.'
-                )
-            ssh.close()
-            return None, {
+            elif f'port {port}' in error_msg.lower():
+                error_msg = port_msg
+            return {
                 'success': False,
                 'uname_line': None,
                 'stderr': error_msg,
                 'exit_code': -1,
                 'error': f'SSH error: {error_msg}'
             }
-        except socket.timeout:
-            logger.error(f"Connection timeout for {server}")
-            ssh.close()
-            return None, {
+        if isinstance(exc, socket.timeout):
+            logger.error("Connection timeout for %s", server)
+            return {
                 'success': False,
                 'uname_line': None,
                 'stderr': 'Connection timeout',
                 'exit_code': -1,
                 'error': f'Connection timeout: Server {server} did not respond in time'
             }
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Unexpected error for {server}: {error_msg}", exc_info=True)
-            if 'unable to connect to port 22' in error_msg.lower() or 'port 22' in error_msg.lower():
-                error_msg = (
-                    f'Cannot connect to SSH port 22 on {server}. Possible causes: SSH service not running, '
-                    f'firewall blocking port 22, or server is down.'
-                )
-            ssh.close()
-            return None, {
-                'success': False,
-                'uname_line': None,
-                'stderr': error_msg,
-                'exit_code': -1,
-                'error': f'Unexpected error: {error_msg}'
-            }
+        error_msg = str(exc)
+        logger.error("Unexpected error for %s: %s", server, error_msg, exc_info=exc)
+        if f'port {port}' in error_msg.lower():
+            error_msg = port_msg
+        return {
+            'success': False,
+            'uname_line': None,
+            'stderr': error_msg,
+            'exit_code': -1,
+            'error': f'Unexpected error: {error_msg}'
+        }
 
     def _execute_on_server(self, server, command):
         """
@@ -284,38 +406,100 @@ class SSHExecutor:
         try:
             ssh, connect_error = self._open_ssh(server)
             if connect_error is not None:
-                return {
-                    'success': False,
-                    'error': connect_error.get('error', 'SSH connection failed'),
-                    'stdout': '',
-                    'stderr': connect_error.get('stderr', ''),
-                    'exit_code': connect_error.get('exit_code', -1)
-                }
-            
-            # Execute command with increased timeout
-            # Use heredoc for multi-line scripts so the remote shell receives the full script
-            # without quoting/truncation issues (avoids "syntax error near unexpected token 'done'")
-            if '\n' in command:
-                heredoc_marker = 'SHELLSENTRY_EOF'
-                command = f"bash -s << '{heredoc_marker}'\n{command}\n{heredoc_marker}"
-            stdin, stdout, stderr = ssh.exec_command(command, timeout=60)
-            
-            # Wait for command to complete
-            exit_code = stdout.channel.recv_exit_status()
-            
-            # Read output
-            stdout_text = stdout.read().decode('utf-8', errors='replace')
-            stderr_text = stderr.read().decode('utf-8', errors='replace')
-            
-            return {
-                'success': exit_code == 0,
-                'stdout': stdout_text,
-                'stderr': stderr_text,
-                'exit_code': exit_code
-            }
-            
-        except paramiko.AuthenticationException:
-            logger.error(f"Authentication failed for {server}")
+                return self._connect_failure_result(connect_error)
+            return self._run_command(ssh, command, remote_gzip=self._transport_profile(server)['remote_gzip'])
+        except Exception as e:
+            return self._execution_error_result(server, e)
+        finally:
+            if ssh:
+                ssh.close()
+
+    def _run_command(self, ssh, command, timeout=60, remote_gzip=False):
+        """
+        Run one command on an open connection (its own channel); return the result dict.
+        With remote_gzip, stdout is gzipped on the host and decompressed here.
+        """
+        stdin, stdout, stderr = ssh.exec_command(self._remote_command(command, remote_gzip), timeout=timeout)
+
+        # Drain output before waiting for the exit status: a command that fills the
+        # channel window would otherwise never exit
+        stdout_bytes, stderr_bytes = self._drain_channel(stdout.channel, timeout)
+        if remote_gzip:
+            stdout_bytes = decode_remote_gzip(stdout_bytes)
+        stdout_text = stdout_bytes.decode('utf-8', errors='replace')
+        stderr_text = stderr_bytes.decode('utf-8', errors='replace')
+        exit_code = stdout.channel.recv_exit_status()
+
+        return {
+            'success': exit_code == 0,
+            'stdout': stdout_text,
+            'stderr': stderr_text,
+            'exit_code': exit_code
+        }
+
+    @staticmethod
+    def _drain_channel(channel, timeout):
+        """
+        (stdout, stderr) of channel, both read to EOF. stderr is emptied between stdout reads,
+        so a command writing more than the channel window to stderr while stdout stays open
+        does not stall; timeout is how long both may stay silent (socket.timeout after that).
+        """
+        stdout_chunks, stderr_chunks = [], []
+        channel.settimeout(_STDERR_POLL_SECONDS)
+        last_data = time.monotonic()
+        stdout_open = True
+        while stdout_open:
+            try:
+                data = channel.recv(_READ_BYTES)
+                stdout_open = bool(data)
+                stdout_chunks.append(data)
+                last_data = time.monotonic()
+            except socket.timeout:
+                pass
+            while channel.recv_stderr_ready():
+                stderr_chunks.append(channel.recv_stderr(_READ_BYTES))
+                last_data = time.monotonic()
+            if stdout_open and time.monotonic() - last_data > timeout:
+                raise socket.timeout('timed out waiting for command output')
+        # stdout is at EOF: the rest of stderr can be read blocking
+        channel.settimeout(timeout)
+        while True:
+            data = channel.recv_stderr(_READ_BYTES)
+            if not data:
+                break
+            stderr_chunks.append(data)
+        return b''.join(stdout_chunks), b''.join(stderr_chunks)
+
+    @staticmethod
+    def _remote_command(command, remote_gzip=False):
+        """The command line sent to the host: heredoc for scripts, gzip wrapper for remote_gzip."""
+        # Use heredoc for multi-line scripts so the remote shell receives the full script
+        # without quoting/truncation issues (avoids "syntax error near unexpected token 'done'")
+        if '\n' in command:
+            heredoc_marker = 'SHELLSENTRY_EOF'
+            if remote_gzip:
+                command = wrap_remote_gzip(command, bash_script=True)
+            return f"bash -s << '{heredoc_marker}'\n{command}\n{heredoc_marker}"
+        if remote_gzip:
+            return wrap_remote_gzip(command)
+        return command
+
+    @staticmethod
+    def _connect_failure_result(connect_error):
+        """Execution-shaped result for a host that could not be connected to."""
+        return {
+            'success': False,
+            'error': connect_error.get('error', 'SSH connection failed'),
+            'stdout': '',
+            'stderr': connect_error.get('stderr', ''),
+            'exit_code': connect_error.get('exit_code', -1)
+        }
+
+    def _execution_error_result(self, server, exc):
+        """Map an exception raised while executing on server to a result dict."""
+        _hostname, port = split_host_port(server)
+        if isinstance(exc, paramiko.AuthenticationException):
+            logger.error("Authentication failed for %s", server)
             return {
                 'success': False,
                 'error': 'Authentication failed',
@@ -323,9 +507,9 @@ class SSHExecutor:
                 'stderr': 'SSH authentication failed',
                 'exit_code': -1
             }
-        except paramiko.SSHException as e:
-            error_msg = str(e)
-            logger.error(f"SSH error for {server}: {error_msg}")
+        if isinstance(exc, paramiko.SSHException):
+            error_msg = str(exc)
+            logger.error("SSH error for %s: %s", server, error_msg)
             # Provide more helpful error messages
             if 'timeout' in error_msg.lower():
                 error_msg = f'Connection timeout: Server {server} did not respond'
@@ -333,8 +517,8 @@ class SSHExecutor:
                 error_msg = f'DNS resolution failed: Could not resolve {server}'
             elif 'no route to host' in error_msg.lower():
                 error_msg = f'Network unreachable: Cannot reach {server}'
-            elif 'unable to connect to port 22' in error_msg.lower() or 'port 22' in error_msg.lower():
-                error_msg = f'Cannot connect to SSH port 22 on {server}. Possible causes: SSH service not running, firewall blocking port 22, or server is down.'
+            elif f'port {port}' in error_msg.lower():
+                error_msg = f'Cannot connect to SSH port {port} on {server}. Possible causes: SSH service not running, firewall blocking port {port}, or server is down.'
             return {
                 'success': False,
                 'error': f'SSH error: {error_msg}',
@@ -342,8 +526,8 @@ class SSHExecutor:
                 'stderr': error_msg,
                 'exit_code': -1
             }
-        except socket.timeout:
-            logger.error(f"Connection timeout for {server}")
+        if isinstance(exc, socket.timeout):
+            logger.error("Connection timeout for %s", server)
             return {
                 'success': False,
                 'error': f'Connection timeout: Server {server} did not respond in time',
@@ -351,22 +535,83 @@ class SSHExecutor:
                 'stderr': 'Connection timeout',
                 'exit_code': -1
             }
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(f"Unexpected error for {server}: {error_msg}", exc_info=True)
-            # Check for connection errors
-            if 'unable to connect to port 22' in error_msg.lower() or 'port 22' in error_msg.lower():
-                error_msg = f'Cannot connect to SSH port 22 on {server}. Possible causes: SSH service not running, firewall blocking port 22, or server is down.'
-            return {
-                'success': False,
-                'error': f'Unexpected error: {error_msg}',
-                'stdout': '',
-                'stderr': error_msg,
-                'exit_code': -1
-            }
+        error_msg = str(exc)
+        logger.error("Unexpected error for %s: %s", server, error_msg, exc_info=exc)
+        # Check for connection errors
+        if f'port {port}' in error_msg.lower():
+            error_msg = f'Cannot connect to SSH port {port} on {server}. Possible causes: SSH service not running, firewall blocking port {port}, or server is down.'
+        return {
+            'success': False,
+            'error': f'Unexpected error: {error_msg}',
+            'stdout': '',
+            'stderr': error_msg,
+            'exit_code': -1
+        }
+
+    def execute_batch(self, commands, servers, username, user_id=None, original_request=''):
+        """
+        Run several commands on each server over a single SSH connection per host.
+
+        Hosts are handled concurrently; on each host the commands run on concurrent
+        channels of the one authenticated transport (at most SSH_MAX_CHANNELS_PER_HOST
+        at a time), so connection setup is paid once per host instead of once per
+        command. Each command is logged as its own ExecutionLog entry.
+
+        Returns:
+            dict: {command: {server: result}}
+        """
+        if not servers:
+            return {'error': 'No servers specified'}
+        commands = list(dict.fromkeys(commands))
+        per_host = {}
+        scan_started = time.perf_counter()
+        unreachable = self._prescan(servers)
+        scan_ms = round((time.perf_counter() - scan_started) * 1000, 1)
+        for server, connect_error in unreachable.items():
+            failure = self._connect_failure_result(connect_error)
+            per_host[server] = {command: dict(failure, duration_ms=scan_ms) for command in commands}
+        reachable = [server for server in servers if server not in unreachable]
+        per_host.update(self._execute_batch_hosts(commands, reachable))
+
+        results = {}
+        for command in commands:
+            results[command] = {server: per_host[server][command] for server in servers}
+            self._log_execution(username, user_id, original_request, command, servers, results[command])
+        return results
+
+    def _execute_batch_hosts(self, commands, servers):
+        """{server: {command: result}} for servers that passed the pre-scan."""
+        return self._map_hosts(
+            lambda server: self._execute_batch_on_server(server, commands), servers, 'ssh-batch'
+        )
+
+    def _execute_batch_on_server(self, server, commands):
+        """Open one connection to server and run every command on its own channel."""
+        started = time.perf_counter()
+        ssh, connect_error = self._open_ssh(server)
+        if connect_error is not None:
+            failure = self._connect_failure_result(connect_error)
+            elapsed = round((time.perf_counter() - started) * 1000, 1)
+            return {command: dict(failure, duration_ms=elapsed) for command in commands}
+        connect_ms = (time.perf_counter() - started) * 1000
+        remote_gzip = self._transport_profile(server)['remote_gzip']
+
+        def run(command):
+            t0 = time.perf_counter()
+            try:
+                result = self._run_command(ssh, command, remote_gzip=remote_gzip)
+            except Exception as e:
+                result = self._execution_error_result(server, e)
+            # Connection setup is shared by the batch; attribute it to every command
+            result['duration_ms'] = round(connect_ms + (time.perf_counter() - t0) * 1000, 1)
+            return result
+
+        try:
+            channels = max(1, min(len(commands), Config.SSH_MAX_CHANNELS_PER_HOST))
+            with ThreadPoolExecutor(max_workers=channels, thread_name_prefix='ssh-channel') as pool:
+                return dict(zip(commands, pool.map(run, commands)))
         finally:
-            if ssh:
-                ssh.close()
+            ssh.close()
     
     def _log_execution(self, username, user_id, original_request, command, servers, results):
         """Log command execution to database"""
@@ -393,7 +638,7 @@ class SSHExecutor:
                 generated_command=command,
                 target_servers=json.dumps(servers),
                 execution_status=status,
-                execution_results=json.dumps(results),
+                execution_results=json.dumps(grouped_results(results)),
                 timestamp=datetime.utcnow()
             )
             
@@ -401,5 +646,17 @@ class SSHExecutor:
             db.session.commit()
             
         except Exception as e:
-            logger.error(f"Error logging execution: {str(e)}", exc_info=True)
+            logger.error("Error logging execution: %s", e, exc_info=True)
+
 
+def create_ssh_executor():
+    """Executor for SSH_BACKEND: 'threads' (paramiko on a thread pool) or 'asyncio' (asyncssh)."""
+    backend = Config.SSH_BACKEND
+    if backend == 'asyncio':
+        from .async_ssh_executor import AsyncSSHExecutor, asyncssh
+        if asyncssh is not None:
+            return AsyncSSHExecutor()
+        logger.error("SSH_BACKEND=asyncio needs the asyncssh package; using the threaded backend")
+    elif backend != 'threads':
+        logger.warning("Unknown SSH_BACKEND %r; using the threaded backend", backend)
+    return SSHExecutor()
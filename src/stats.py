@@ -0,0 +1,18 @@
+"""
+Small statistics helpers shared by the app and the benchmarks.
+"""
+
+import math
+from typing import Iterable, Optional
+
+
+def percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    """
+    Nearest-rank percentile: the smallest value with at least pct% of the values at or
+    below it (rank ceil(pct/100 * n), at least 1). None for no values.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
@@ -151,9 +151,56 @@ function displayResults(data) {
                 <pre class="result-output result-formatted-report" role="region">${escapeHtml(data.formatted_report)}</pre>
             </details>
         `;
+    } else if (data.formatted_report_url) {
+        // Compact response: the report stays on the server until the section is opened
+        html += `
+            <details class="result-report-details" id="lazyReport">
+                <summary class="result-report-summary">Technical report (raw command output)</summary>
+                <pre class="result-output result-formatted-report" role="region">Loading…</pre>
+            </details>
+        `;
     }
     
     resultsContainer.innerHTML = html;
+
+    const lazyReport = document.getElementById('lazyReport');
+    if (lazyReport) {
+        lazyReport.addEventListener('toggle', () => loadReportRange(lazyReport, data.formatted_report_url), { once: true });
+    }
+}
+
+// Fetch the stored report in line ranges; "Show more" appends the next range
+async function loadReportRange(details, url, startLine = 0) {
+    const pre = details.querySelector('pre');
+    const pageLines = 2000;
+    try {
+        const response = await fetch(`${url}?lines=${startLine}-${startLine + pageLines}`);
+        const chunk = await response.json();
+        if (!response.ok) {
+            throw new Error(chunk.error || 'Could not load the report');
+        }
+        if (startLine === 0) {
+            pre.textContent = '';
+        }
+        pre.textContent += chunk.data;
+        if (chunk.truncated) {
+            pre.textContent += ' […line cut at the fetch size limit]\n';
+        }
+        const oldButton = details.querySelector('.result-report-more');
+        if (oldButton) {
+            oldButton.remove();
+        }
+        if (!chunk.eof) {
+            const more = document.createElement('button');
+            more.type = 'button';
+            more.className = 'btn btn-secondary result-report-more';
+            more.textContent = 'Show more';
+            more.addEventListener('click', () => loadReportRange(details, url, chunk.end));
+            details.appendChild(more);
+        }
+    } catch (error) {
+        pre.textContent = `The report could not be loaded: ${error.message}`;
+    }
 }
 
 // Escape HTML to prevent XSS